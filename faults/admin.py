@@ -2,7 +2,7 @@ from django.contrib import admin
 
 # Register your models here.
 
-from .models import FaultRecord, TaskStatus
+from .models import FaultRecord, TaskStatus, ArchiveBatch, FaultDailySummary
 
 @admin.register(FaultRecord)
 class FaultRecordAdmin(admin.ModelAdmin):
@@ -15,3 +15,13 @@ class TaskStatusAdmin(admin.ModelAdmin):
     list_display = ("task_id", "name", "status", "timestamp")
     list_filter = ("status", "timestamp")
     search_fields = ("task_id", "name")
+
+@admin.register(ArchiveBatch)
+class ArchiveBatchAdmin(admin.ModelAdmin):
+    list_display = ("kind", "created", "items", "size_bytes", "oldest", "newest", "path")
+    list_filter = ("kind", "created")
+
+@admin.register(FaultDailySummary)
+class FaultDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ("day", "class_index", "fault_name", "status", "count")
+    list_filter = ("status", "day")
@@ -0,0 +1,101 @@
+import time
+import asyncio
+import logging
+import functools
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponseNotAllowed, JsonResponse
+from .queries import fault_queryset, task_queryset, status_counts, build_stats
+from .serializers import FaultRecordSerializer, TaskStatusSerializer
+from .view_cache import acached
+
+logger = logging.getLogger(__name__)
+
+# Seconds a readiness check may take before it counts as failed
+HEALTH_TIMEOUT = 2
+
+
+def require_GET(view):
+    """django.views.decorators.http.require_GET for async views (Django 4.2's is sync only)."""
+    @functools.wraps(view)
+    async def inner(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return HttpResponseNotAllowed(["GET", "HEAD"])
+        return await view(request, *args, **kwargs)
+    return inner
+
+
+# ------------------------------
+# ASYNC API VIEWS
+# ------------------------------
+# Same data as FaultListView, TaskStatusListView and fault_stats, read with
+# the async ORM and cache API. Under ASGI a sync view holds a thread for
+# the whole request; these only borrow one for each query (Django 4.2
+# still runs the query itself in a thread). Served at /api/async/...
+@require_GET
+async def fault_list(request):
+    async def build():
+        faults = [fault async for fault in fault_queryset(request.GET)]
+        return list(FaultRecordSerializer(faults, many=True, context={"request": request}).data)
+
+    data = await acached("fault_list_async", f"api:fault_list_async:{request.build_absolute_uri()}", ("faults",), build)
+    return JsonResponse(data, safe=False)
+
+
+@require_GET
+async def task_list(request):
+    async def build():
+        tasks = [task async for task in task_queryset()]
+        return list(TaskStatusSerializer(tasks, many=True).data)
+
+    data = await acached("task_list_async", f"api:task_list_async:{request.build_absolute_uri()}", ("tasks",), build)
+    return JsonResponse(data, safe=False)
+
+
+@require_GET
+async def fault_stats(request):
+    async def build():
+        faults, tasks = status_counts()
+        return build_stats([row async for row in faults], [row async for row in tasks])
+
+    return JsonResponse(await acached("fault_stats_async", "api:stats", ("faults", "tasks"), build))
+
+
+# ------------------------------
+# HEALTH CHECKS
+# ------------------------------
+@require_GET
+async def health_live(request):
+    """Liveness: the process and its event loop answer. No I/O."""
+    return JsonResponse({"status": "ok"})
+
+
+def _ping_database():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+async def _ping_cache():
+    await cache.aset("health:ping", time.time(), 10)
+    if await cache.aget("health:ping") is None:
+        raise RuntimeError("value not stored")
+
+
+@require_GET
+async def health_ready(request):
+    """Readiness: the DB and the cache (Redis) answer within HEALTH_TIMEOUT. 503 otherwise."""
+    checks = {"database": sync_to_async(_ping_database), "cache": _ping_cache}
+    results = {}
+    for name, check in checks.items():
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(), HEALTH_TIMEOUT)
+            results[name] = {"status": "ok"}
+        except Exception as e:
+            logger.warning("Readiness check failed", extra={"check": name, "error": str(e) or type(e).__name__})
+            results[name] = {"status": "error", "error": str(e) or type(e).__name__}
+        results[name]["ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    ready = all(result["status"] == "ok" for result in results.values())
+    return JsonResponse({"status": "ok" if ready else "error", "checks": results}, status=200 if ready else 503)
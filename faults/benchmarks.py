@@ -0,0 +1,251 @@
+import os
+import json
+import asyncio
+import time
+import resource
+import threading
+import subprocess
+import cv2
+import numpy as np
+from django.conf import settings
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+
+# ----------------------------------------
+# Synthetic videos
+# ----------------------------------------
+DEFECT_COLOR = (0, 0, 255)  # pure red square = "fault" for the stub model
+
+
+def make_synthetic_video(path, frames=300, width=1280, height=720, fps=25, fault_every=10, seed=0):
+    """
+    Write a video of moving sleepers/rails with a red "defect" square on
+    every `fault_every`-th frame. Deterministic for a given seed.
+    """
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    try:
+        base = rng.integers(60, 110, size=(height, width, 3), dtype=np.uint8)
+        for i in range(frames):
+            frame = base.copy()
+            # sleepers scrolling down the frame
+            for y in range((i * 7) % 80, height, 80):
+                cv2.rectangle(frame, (0, y), (width, y + 18), (40, 60, 80), -1)
+            # two rails
+            for x in (width // 3, 2 * width // 3):
+                cv2.rectangle(frame, (x - 8, 0), (x + 8, height), (170, 170, 170), -1)
+            if fault_every and i % fault_every == 0:
+                x = int(rng.integers(0, width - 60))
+                y = int(rng.integers(height // 2, height - 60))
+                cv2.rectangle(frame, (x, y), (x + 48, y + 48), DEFECT_COLOR, -1)
+            writer.write(frame)
+    finally:
+        writer.release()
+    return path
+
+
+class StubDetector:
+    """
+    Deterministic stand-in for inference.Detector: "detects" the red squares
+    drawn by make_synthetic_video with plain NumPy, optionally sleeping to
+    simulate model latency. Same detect() contract as the real detector.
+    """
+
+    profile_name = "stub"
+    model_version = "stub"
+    names = {0: "stub_defect"}
+
+    def __init__(self, infer_ms=0.0):
+        self.infer_ms = infer_ms
+
+    def detect(self, frames, conf=0.5, iou=0.5, camera_config=None):
+        if self.infer_ms:
+            time.sleep(self.infer_ms * len(frames) / 1000)
+
+        results = []
+        for frame in frames:
+            mask = (frame[:, :, 2] > 200) & (frame[:, :, 1] < 60) & (frame[:, :, 0] < 60)
+            ys, xs = np.nonzero(mask)
+            if len(xs) < 100:
+                results.append((
+                    np.empty((0, 4), dtype=np.float32),
+                    np.empty(0, dtype=np.float32),
+                    np.empty(0, dtype=np.int64),
+                ))
+                continue
+            box = np.array([[xs.min(), ys.min(), xs.max(), ys.max()]], dtype=np.float32)
+            results.append((box, np.array([0.9], dtype=np.float32), np.array([0], dtype=np.int64)))
+        return results
+
+
+# ----------------------------------------
+# Measurements
+# ----------------------------------------
+class WriteCounter:
+    """Counts INSERT/UPDATE/DELETE statements on every DB connection, including worker threads."""
+
+    WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+    def __init__(self):
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith(self.WRITE_PREFIXES):
+            with self._lock:
+                self.writes += 1
+        return execute(sql, params, many, context)
+
+    def _attach(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        connection_created.connect(self._attach)
+        for conn in connections.all():
+            self._attach(None, conn)
+        return self
+
+    def __exit__(self, *exc):
+        connection_created.disconnect(self._attach)
+        for conn in connections.all():
+            if self in conn.execute_wrappers:
+                conn.execute_wrappers.remove(self)
+
+
+class RssSampler:
+    """Samples resident memory in a background thread and keeps the peak (bytes)."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.start_rss = current_rss()
+        self.peak_rss = self.start_rss
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, current_rss())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, current_rss())
+
+
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Not Linux: fall back to the lifetime peak
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+# ----------------------------------------
+# Results
+# ----------------------------------------
+def results_dir():
+    path = getattr(settings, "BENCHMARK_RESULTS_DIR", os.path.join(settings.BASE_DIR, "benchmarks", "results"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def save_result(name, result):
+    filename = f"{name}_{time.strftime('%Y%m%d_%H%M%S')}_{result.get('revision', 'unknown')}.json"
+    path = os.path.join(results_dir(), filename)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    return path
+
+
+def previous_result(name, exclude=None):
+    """Most recent stored result for a benchmark, to diff against."""
+    files = sorted(
+        f for f in os.listdir(results_dir())
+        if f.startswith(name + "_") and f.endswith(".json")
+    )
+    files = [f for f in files if os.path.join(results_dir(), f) != exclude]
+    if not files:
+        return None
+    with open(os.path.join(results_dir(), files[-1])) as f:
+        return json.load(f)
+
+
+# ----------------------------------------
+# ASGI
+# ----------------------------------------
+async def asgi_get(app, path, query_string=""):
+    """
+    One GET through an ASGI app in-process, as a server would send it
+    (unlike the test clients, per-request thread handling is the
+    server's). Returns the status code.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    request = [{"type": "http.request", "body": b"", "more_body": False}]
+    status = []
+
+    async def receive():
+        if request:
+            return request.pop()
+        # Nothing more to read: the client stays connected
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0] if status else None
+
+
+class QueryDelay:
+    """Sleeps before every statement on every connection, to stand in for a networked DB."""
+
+    def __init__(self, delay_ms):
+        self.delay = delay_ms / 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.delay)
+        return execute(sql, params, many, context)
+
+    def _attach(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        if self.delay:
+            connection_created.connect(self._attach)
+        return self
+
+    def __exit__(self, *exc):
+        connection_created.disconnect(self._attach)
+        for conn in connections.all():
+            if self in conn.execute_wrappers:
+                conn.execute_wrappers.remove(self)
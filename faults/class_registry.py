@@ -0,0 +1,168 @@
+import os
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+import yaml
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from .models import FaultClass
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "faults:class_registry:version"
+# Bounds staleness when the cache isn't shared between processes (LocMem)
+VERSION_TTL = 30
+
+_lock = threading.Lock()
+_snapshot = {"version": None, "names": []}
+
+
+# ----------------------------------------
+# Paths
+# ----------------------------------------
+def dataset_dir():
+    return str(settings.DATASET_ROOT)
+
+
+def classes_txt():
+    return os.path.join(dataset_dir(), "train", "labels", "classes.txt")
+
+
+def data_yaml():
+    return os.path.join(dataset_dir(), "data.yaml")
+
+
+# ----------------------------------------
+# Versioned snapshot
+# ----------------------------------------
+def _db_version():
+    """Classes are append-only, so count + newest id identifies the list."""
+    stats = FaultClass.objects.aggregate(count=Count("id"), newest=Max("id"))
+    return f"{stats['count']}:{stats['newest'] or 0}"
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = _db_version()
+        cache.set(VERSION_KEY, version, VERSION_TTL)
+    return version
+
+
+def _import_classes_txt():
+    """One-time import of an existing classes.txt into an empty registry."""
+    path = classes_txt()
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        names = [line.strip() for line in f if line.strip()]
+    FaultClass.objects.bulk_create(
+        [FaultClass(index=i, name=name) for i, name in enumerate(names)],
+        ignore_conflicts=True,
+    )
+    logger.info("Imported classes.txt into the class registry", extra={"classes": len(names)})
+
+
+def get_classes():
+    """
+    Class names in index order. Served from the in-process snapshot; the
+    DB is only queried when the registry version changes.
+    """
+    version = current_version()
+    if _snapshot["version"] == version:
+        return list(_snapshot["names"])
+
+    with _lock:
+        if version == "0:0":
+            _import_classes_txt()
+            version = _db_version()
+            cache.set(VERSION_KEY, version, VERSION_TTL)
+        _snapshot["names"] = list(FaultClass.objects.order_by("index").values_list("name", flat=True))
+        _snapshot["version"] = version
+        return list(_snapshot["names"])
+
+
+def add_class(name):
+    """Append a class. Returns (added, class names)."""
+    name = name.strip()
+    get_classes()  # make sure an existing classes.txt has been imported first
+    try:
+        with transaction.atomic():
+            if FaultClass.objects.filter(name=name).exists():
+                return False, get_classes()
+            newest = FaultClass.objects.select_for_update().aggregate(newest=Max("index"))["newest"]
+            FaultClass.objects.create(index=0 if newest is None else newest + 1, name=name)
+    except IntegrityError:
+        # Added concurrently under the same name (or index): retry once against the new state
+        if FaultClass.objects.filter(name=name).exists():
+            return False, get_classes()
+        return add_class(name)
+
+    cache.set(VERSION_KEY, _db_version(), VERSION_TTL)
+    names = get_classes()
+    write_dataset_files()
+    logger.info("Fault class added", extra={"class_name": name, "classes": len(names)})
+    return True, names
+
+
+# ----------------------------------------
+# classes.txt / data.yaml
+# ----------------------------------------
+@contextmanager
+def _files_lock():
+    """Serialize regeneration across threads and (where flock exists) processes."""
+    with _lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(dataset_dir(), exist_ok=True)
+        with open(os.path.join(dataset_dir(), ".classes.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _atomic_write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_dataset_files():
+    """
+    Regenerate classes.txt and data.yaml from the registry, unless they
+    were already written for the current version. Returns True if written.
+    """
+    names = get_classes()
+    version = _snapshot["version"]
+    stamp = os.path.join(dataset_dir(), ".classes_version")
+
+    with _files_lock():
+        if os.path.exists(stamp):
+            with open(stamp, "r") as f:
+                if f.read().strip() == version:
+                    return False
+
+        _atomic_write(classes_txt(), "".join(f"{name}\n" for name in names))
+        _atomic_write(data_yaml(), yaml.safe_dump({
+            "train": "train/images",
+            "val": "val/images",
+            "nc": len(names),
+            "names": names,
+        }, sort_keys=False))
+        _atomic_write(stamp, version)
+
+    logger.info("classes.txt and data.yaml regenerated", extra={"version": version, "classes": len(names)})
+    return True
@@ -0,0 +1,184 @@
+import os
+import logging
+from collections import defaultdict
+from datetime import timedelta
+import imagehash
+from PIL import Image
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from .models import FaultCluster, FaultRecord
+from .view_cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+# New faults arriving within this many seconds share one clustering run
+QUEUE_DELAY = 5
+QUEUED_KEY = "faults:clustering:queued"
+# Held for a whole run so two runs never cluster the same faults twice;
+# expires on its own if a worker dies mid-run
+LOCK_KEY = "faults:clustering:lock"
+LOCK_TIMEOUT = 600
+
+
+# ----------------------------------------
+# Perceptual hashes
+# ----------------------------------------
+def compute_phash(filepath):
+    try:
+        with Image.open(filepath) as image:
+            return imagehash.phash(image)
+    except (OSError, ValueError):
+        return None
+
+
+def phash_hex(filepath):
+    value = compute_phash(filepath)
+    return str(value) if value is not None else None
+
+
+def distance(a, b):
+    """Hamming distance between two hex phashes."""
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def backfill_phashes(records):
+    """Compute and store the phash of records saved without one."""
+    missing = [rec for rec in records if not rec.phash and rec.image]
+    for rec in missing:
+        rec.phash = phash_hex(os.path.join(settings.MEDIA_ROOT, str(rec.image)))
+    FaultRecord.objects.bulk_update([rec for rec in missing if rec.phash], ["phash"], batch_size=500)
+    return len(missing)
+
+
+# ----------------------------------------
+# Clustering
+# ----------------------------------------
+def refresh_clusters():
+    """Drop clusters left empty by confirmations and re-pick lost representatives."""
+    empty = list(
+        FaultCluster.objects.annotate(size=Count("members")).filter(size=0).values_list("id", flat=True)
+    )
+    if empty:
+        FaultCluster.objects.filter(id__in=empty).delete()
+
+    for cluster in FaultCluster.objects.filter(representative__isnull=True):
+        first = cluster.members.filter(phash__isnull=False).order_by("timestamp", "id").first()
+        if first is None:
+            continue
+        cluster.representative, cluster.phash = first, first.phash
+        cluster.save(update_fields=["representative", "phash"])
+    return len(empty)
+
+
+def cluster_pending():
+    """
+    Put every unconfirmed fault without a cluster into one, oldest first. A
+    fault joins a cluster of its class whose representative is within
+    hamming_threshold and whose newest member is within window_seconds of
+    it; otherwise it starts a new cluster as its representative. Returns
+    the number of faults assigned.
+    """
+    options = settings.FAULT_CLUSTERING
+    threshold = options["hamming_threshold"]
+    window = timedelta(seconds=options["window_seconds"])
+
+    pending = list(
+        FaultRecord.objects.filter(confirmed=False, cluster__isnull=True)
+        .only("id", "image", "phash", "class_index", "timestamp")
+        .order_by("timestamp", "id")
+    )
+    backfill_phashes(pending)
+    pending = [rec for rec in pending if rec.phash]
+    if not pending:
+        return 0
+
+    open_clusters = defaultdict(list)
+    for cluster in FaultCluster.objects.filter(last_seen__gte=pending[0].timestamp - window):
+        open_clusters[cluster.class_index].append(cluster)
+
+    members = defaultdict(list)
+    touched = {}
+    with transaction.atomic():
+        for rec in pending:
+            match = None
+            for cluster in open_clusters[rec.class_index]:
+                if abs(rec.timestamp - cluster.last_seen) <= window and distance(rec.phash, cluster.phash) <= threshold:
+                    match = cluster
+                    break
+
+            if match is None:
+                # Saved one by one: bulk_create doesn't return ids on MySQL
+                match = FaultCluster.objects.create(
+                    representative=rec, class_index=rec.class_index, phash=rec.phash,
+                    first_seen=rec.timestamp, last_seen=rec.timestamp,
+                )
+                open_clusters[rec.class_index].append(match)
+            elif rec.timestamp > match.last_seen:
+                match.last_seen = rec.timestamp
+                touched[match.id] = match
+            members[match.id].append(rec.id)
+
+        for cluster_id, ids in members.items():
+            FaultRecord.objects.filter(id__in=ids).update(cluster_id=cluster_id)
+        FaultCluster.objects.bulk_update(list(touched.values()), ["last_seen"])
+    # update() sends no signals
+    invalidate("faults", "tasks")
+
+    logger.info("Faults clustered", extra={"faults": len(pending), "clusters": len(members)})
+    return len(pending)
+
+
+def _eager():
+    from .tasks import cluster_faults
+    return bool(cluster_faults.app.conf.task_always_eager)
+
+
+def run_clustering():
+    """
+    One clustering run, under LOCK_KEY. If another run holds it, queue a
+    new run QUEUE_DELAY seconds later instead of overlapping it (faults it
+    didn't see yet would otherwise get a second cluster). Eager Celery
+    would run that inline, still under the lock, so there the run is only
+    skipped and its faults wait for the next scheduled run. Returns the
+    faults assigned.
+    """
+    if not cache.add(LOCK_KEY, True, LOCK_TIMEOUT):
+        cache.delete(QUEUED_KEY)
+        if not _eager():
+            schedule_clustering()
+        return 0
+    try:
+        cache.delete(QUEUED_KEY)
+        refresh_clusters()
+        return cluster_pending()
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def schedule_clustering():
+    """Queue one clustering run for the faults arriving in the next few seconds."""
+    from .tasks import cluster_faults
+    if not cache.add(QUEUED_KEY, True, QUEUE_DELAY * 4):
+        return False
+    try:
+        cluster_faults.apply_async(countdown=QUEUE_DELAY)
+    except Exception as e:
+        cache.delete(QUEUED_KEY)
+        logger.warning("Could not queue fault clustering: %s", e)
+        return False
+    return True
+
+
+# ----------------------------------------
+# Listing
+# ----------------------------------------
+def cluster_queryset():
+    """Clusters with a representative, newest first, with their pending size."""
+    return (
+        FaultCluster.objects.filter(representative__isnull=False, representative__confirmed=False)
+        .select_related("representative")
+        .annotate(size=Count("members", filter=Q(members__confirmed=False)))
+        .order_by("-last_seen")
+    )
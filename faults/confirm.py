@@ -0,0 +1,221 @@
+import os
+import shutil
+import logging
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from . import metrics
+from .clustering import backfill_phashes, distance
+from .labels import register_images
+from .models import FaultCluster, FaultRecord
+from .train_cache import cache_images
+
+logger = logging.getLogger(__name__)
+
+# Hamming distance (0-64) under which two fault frames count as the same fault
+SIMILARITY_THRESHOLD = 8
+# Records moved and deleted per transaction / progress event
+BATCH_SIZE = 200
+STREAM_GROUP = "faults_stream"
+
+
+class ConfirmError(Exception):
+    """The fault can't be confirmed; `status` is the HTTP status to report."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# ----------------------------------------
+# Progress events (FaultsConsumer)
+# ----------------------------------------
+def publish(payload):
+    """Broadcast to every FaultsConsumer socket; a missing channel layer is not an error."""
+    try:
+        layer = get_channel_layer()
+        if layer is not None:
+            async_to_sync(layer.group_send)(STREAM_GROUP, {"type": "fault.event", "payload": payload})
+    except Exception as e:
+        logger.warning("Could not publish fault event: %s", e)
+
+
+# ----------------------------------------
+# Files
+# ----------------------------------------
+def link_or_copy(src, dst):
+    """
+    Hard-link src to dst when on the same filesystem, else copy it. A
+    frame removed meanwhile (retention, another confirm) is a 404, and dst
+    is left as it was.
+    """
+    if not os.path.exists(src):
+        raise ConfirmError("Image missing", status=404)
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy(src, dst)
+
+
+def dataset_dirs():
+    images = os.path.join(settings.DATASET_ROOT, "train", "images")
+    labels = os.path.join(settings.DATASET_ROOT, "train", "labels")
+    os.makedirs(images, exist_ok=True)
+    os.makedirs(labels, exist_ok=True)
+    return images, labels
+
+
+# ----------------------------------------
+# Confirm
+# ----------------------------------------
+def find_duplicates(fault):
+    """
+    Unconfirmed records whose frame is within SIMILARITY_THRESHOLD of the
+    fault's (the fault included), compared by stored phash; records saved
+    before phashes were stored get theirs computed once here.
+    """
+    backfill_phashes([fault])
+    if not fault.phash:
+        raise ConfirmError("Hash error", status=500)
+
+    duplicates = []
+    with metrics.observe(metrics.CONFIRM_SCAN_SECONDS):
+        records = list(FaultRecord.objects.filter(confirmed=False).only("id", "image", "phash"))
+        backfill_phashes(records)
+        for rec in records:
+            if rec.phash and distance(fault.phash, rec.phash) <= SIMILARITY_THRESHOLD:
+                if os.path.exists(os.path.join(settings.MEDIA_ROOT, str(rec.image))):
+                    duplicates.append(rec)
+    return duplicates
+
+
+def move_into_dataset(records, action, progress=None):
+    """
+    Move the records' frames into the training set and delete the records,
+    BATCH_SIZE at a time. Frames are hard-linked into the dataset, the
+    batch's rows are deleted, then the media copies are unlinked: a rename
+    on the same filesystem that never leaves a record without its image.
+    A record whose frame vanished meanwhile (retention, another confirm)
+    is deleted and skipped; only when nothing could be moved is that an
+    error. Returns (moved ids, moved file names).
+    """
+    images_dir, labels_dir = dataset_dirs()
+    moved_ids, names = [], []
+    done = 0
+    for start in range(0, len(records), BATCH_SIZE):
+        batch = records[start:start + BATCH_SIZE]
+        sources, ids = [], []
+        for rec in batch:
+            src = os.path.join(settings.MEDIA_ROOT, str(rec.image))
+            name = os.path.basename(src)
+            try:
+                link_or_copy(src, os.path.join(images_dir, name))
+            except ConfirmError:
+                logger.warning("Fault frame vanished, skipping it", extra={"fault_id": rec.id, "image": name})
+                continue
+            if action == "no":
+                open(os.path.join(labels_dir, os.path.splitext(name)[0] + ".txt"), "w").close()
+            sources.append(src)
+            ids.append(rec.id)
+            names.append(name)
+
+        # Records without their frame go too
+        FaultRecord.objects.filter(id__in=[rec.id for rec in batch]).delete()
+        for src in sources:
+            try:
+                os.remove(src)
+            except FileNotFoundError:
+                pass
+
+        moved_ids.extend(ids)
+        done += len(batch)
+        if progress:
+            progress(done, len(records))
+
+    if records and not moved_ids:
+        raise ConfirmError("Image missing", status=404)
+    return moved_ids, names
+
+
+def _apply(records, action, progress=None):
+    from .tasks import prelabel_dataset_images
+    from .train_faults import notify_new_labels_for_training
+
+    moved_ids, names = move_into_dataset(
+        records, action, progress=lambda done, total: progress and progress(done, total, stage="move"),
+    )
+    register_images(names)
+    # Resize the new training images now rather than when training starts
+    cache_images(names)
+
+    if action == "yes":
+        # Queue model suggestions so the annotator starts from predicted boxes
+        try:
+            prelabel_dataset_images.delay(names)
+        except Exception as e:
+            logger.warning("Could not queue pre-labelling: %s", e)
+        return {
+            "message": f"{len(moved_ids)} visually similar images sent for annotation.",
+            "count": len(moved_ids),
+            "copied_ids": moved_ids,
+            "redirect": "/annotate/?idx=0",
+        }
+
+    notify_new_labels_for_training()
+    return {
+        "message": f"{len(moved_ids)} visually similar images auto-labeled as background.",
+        "count": len(moved_ids),
+        "copied_ids": moved_ids,
+    }
+
+
+def confirm_fault(fault_id, action, progress=None):
+    """
+    YES: the fault and its visual duplicates go to the dataset for
+    annotation. NO: they go in as background (empty label files) and the
+    training threshold is checked. Returns the summary the dashboard shows.
+    """
+    if action not in ("yes", "no"):
+        raise ConfirmError("Invalid action")
+    try:
+        fault = FaultRecord.objects.get(pk=fault_id)
+    except FaultRecord.DoesNotExist:
+        raise ConfirmError("Fault not found", status=404)
+
+    if not os.path.exists(os.path.join(settings.MEDIA_ROOT, str(fault.image))):
+        fault.delete()
+        raise ConfirmError("Image missing", status=404)
+
+    if progress:
+        progress(0, None, stage="scan")
+    duplicates = find_duplicates(fault)
+    if not duplicates:
+        raise ConfirmError("No visually similar images found", status=404)
+    return _apply(duplicates, action, progress)
+
+
+def confirm_cluster(cluster_id, action, progress=None):
+    """confirm_fault for every pending member of a cluster, without a similarity scan."""
+    if action not in ("yes", "no"):
+        raise ConfirmError("Invalid action")
+    try:
+        cluster = FaultCluster.objects.get(pk=cluster_id)
+    except FaultCluster.DoesNotExist:
+        raise ConfirmError("Cluster not found", status=404)
+
+    records, missing = [], []
+    for rec in cluster.members.filter(confirmed=False).only("id", "image"):
+        exists = os.path.exists(os.path.join(settings.MEDIA_ROOT, str(rec.image)))
+        (records if exists else missing).append(rec)
+    if missing:
+        FaultRecord.objects.filter(id__in=[rec.id for rec in missing]).delete()
+    if not records:
+        cluster.delete()
+        raise ConfirmError("Image missing", status=404)
+
+    result = _apply(records, action, progress)
+    if not cluster.members.exists():
+        cluster.delete()
+    return result
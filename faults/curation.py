@@ -0,0 +1,172 @@
+import os
+import json
+import hashlib
+import logging
+from collections import Counter, defaultdict
+import yaml
+import imagehash
+from PIL import Image
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+BACKGROUND = -1  # images labelled "no fault" (empty label file)
+
+
+# ----------------------------------------
+# Perceptual hashes (cached by mtime)
+# ----------------------------------------
+# Everything curation writes goes under the training cache dir, never
+# into the dataset itself.
+def curation_dir(images_dir):
+    """<training cache dir>/curation/<digest of images_dir>/"""
+    digest = hashlib.sha1(os.path.abspath(images_dir).encode("utf-8")).hexdigest()[:12]
+    path = os.path.join(str(settings.TRAINING_IMAGE_CACHE["dir"]), "curation", digest)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def load_hashes(images_dir, names):
+    """
+    phash of each image; unchanged files reuse the hash from the last run,
+    kept in the images directory's curation_dir().
+    """
+    path = os.path.join(curation_dir(images_dir), "phash.json")
+    cache = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+
+    hashes = {}
+    for name in names:
+        full = os.path.join(images_dir, name)
+        mtime = os.path.getmtime(full)
+        cached = cache.get(name)
+        if cached and cached[0] == mtime:
+            hashes[name] = imagehash.hex_to_hash(cached[1])
+            continue
+        try:
+            with Image.open(full) as image:
+                hashes[name] = imagehash.phash(image)
+        except OSError:
+            logger.warning("Could not hash training image", extra={"image": name})
+            continue
+        cache[name] = [mtime, str(hashes[name])]
+
+    # Drop entries for deleted images so the file doesn't grow forever
+    cache = {name: cache[name] for name in hashes if name in cache}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    return hashes
+
+
+# ----------------------------------------
+# Curation
+# ----------------------------------------
+def _label_classes(label_path):
+    with open(label_path, "r") as f:
+        return [int(float(line.split()[0])) for line in f if line.strip()]
+
+
+def curate(images_dir, labels_dir, max_per_cluster=3, hamming_threshold=8, max_per_class=None):
+    """
+    Pick a representative subset of labelled training images. Images are
+    grouped by their main class (BACKGROUND for empty labels), clustered
+    greedily by perceptual hash within each class, and at most
+    `max_per_cluster` images (those with the most boxes first) are kept per
+    cluster, then at most `max_per_class` per class. Returns (kept image
+    names, report).
+    """
+    names = sorted(
+        n for n in os.listdir(images_dir)
+        if n.lower().endswith(IMAGE_EXTENSIONS)
+        and os.path.exists(os.path.join(labels_dir, os.path.splitext(n)[0] + ".txt"))
+    )
+    hashes = load_hashes(images_dir, names)
+
+    by_class = defaultdict(list)
+    boxes = {}
+    for name in hashes:
+        classes = _label_classes(os.path.join(labels_dir, os.path.splitext(name)[0] + ".txt"))
+        boxes[name] = len(classes)
+        main = Counter(classes).most_common(1)[0][0] if classes else BACKGROUND
+        by_class[main].append(name)
+
+    kept = []
+    report = {"classes": {}, "total_images": len(hashes)}
+    for cls, members in sorted(by_class.items()):
+        # Each cluster is represented by its first image's hash
+        clusters = []
+        for name in members:
+            for representative, cluster in clusters:
+                if hashes[name] - representative <= hamming_threshold:
+                    cluster.append(name)
+                    break
+            else:
+                clusters.append((hashes[name], [name]))
+
+        class_kept = []
+        for _, cluster in clusters:
+            cluster.sort(key=lambda n: (-boxes[n], n))
+            class_kept.extend(cluster[:max_per_cluster])
+        if max_per_class:
+            class_kept = class_kept[:max_per_class]
+
+        kept.extend(class_kept)
+        report["classes"][str(cls)] = {
+            "images": len(members),
+            "clusters": len(clusters),
+            "kept": len(class_kept),
+            "pruned": len(members) - len(class_kept),
+        }
+
+    report["kept_images"] = len(kept)
+    report["pruned_images"] = len(hashes) - len(kept)
+    report["pruned_ratio"] = round(report["pruned_images"] / len(hashes), 3) if hashes else 0.0
+    return sorted(kept), report
+
+
+def write_curated_dataset(data_yaml, options=None):
+    """
+    Curate the train split of `data_yaml` (the training image cache mirror
+    or the original dataset) and write data_curated.yaml to the curation
+    dir, whose train entry is a list of the kept images and whose path
+    still points at the dataset, with curation_report.json next to it.
+    Returns (yaml path, report).
+    """
+    options = options or settings.TRAINING_CURATION
+    root = os.path.dirname(data_yaml)
+    with open(data_yaml, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+
+    images_dir = os.path.join(root, data.get("train", "train/images"))
+    labels_dir = os.path.join(os.path.dirname(images_dir), "labels")
+    kept, report = curate(
+        images_dir, labels_dir,
+        max_per_cluster=options.get("max_per_cluster", 3),
+        hamming_threshold=options.get("hamming_threshold", 8),
+        max_per_class=options.get("max_per_class"),
+    )
+
+    output_dir = curation_dir(images_dir)
+    list_path = os.path.join(output_dir, "train_curated.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.writelines(os.path.join(images_dir, name) + "\n" for name in kept)
+
+    data["train"] = list_path
+    # val/test stay relative to the dataset, not to the curated yaml
+    data.setdefault("path", os.path.abspath(root))
+    curated_yaml = os.path.join(output_dir, "data_curated.yaml")
+    with open(curated_yaml, "w", encoding="utf-8") as f:
+        yaml.safe_dump(data, f, sort_keys=False)
+
+    report_path = os.path.join(output_dir, "curation_report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    logger.info(
+        "Training set curated",
+        extra={k: report[k] for k in ("total_images", "kept_images", "pruned_images", "pruned_ratio")},
+    )
+    return curated_yaml, report
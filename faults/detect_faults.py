@@ -1,11 +1,13 @@
 import os
 import sys
+import time
+import uuid
+import hashlib
+import logging
+import multiprocessing
 import django
 import cv2
 from datetime import datetime
-from ultralytics import YOLO
-from concurrent.futures import ThreadPoolExecutor
-import threading
 # ------------------------------
 # Add project root to path
 # ------------------------------
@@ -19,14 +21,17 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "railway_faults.settings")
 django.setup()
 
 from django.conf import settings
-from faults.models import FaultRecord
+from django.db import IntegrityError, transaction
+from faults.models import FaultRecord, DetectionJob, Detection
 from faults.tasks import notify_fault
+from faults.inference import get_detector, get_profile, model_version
+from faults.roi import get_camera_config
+from faults.save_queue import SaveQueue, SaveItem
+from faults.timing import maybe_stage
+from faults import metrics, result_cache
+from faults.clustering import phash_hex, schedule_clustering
 
-# ------------------------------
-# Load YOLO model
-# ------------------------------
-MODEL_PATH = os.path.join(settings.BASE_DIR, "faults", "runs", "detect", "yolov8n-custom4", "weights", "best.pt")
-model = YOLO(MODEL_PATH)
+logger = logging.getLogger(__name__)
 
 # ------------------------------
 # Video directory (fallback)
@@ -36,7 +41,7 @@ video_dir = os.path.join(settings.BASE_DIR, "faults", "video_feed")
 def get_latest_video(folder):
     files = [os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith((".mp4", ".avi", ".mov"))]
     if not files:
-        print("[ERROR] No video file found in video_feed/")
+        logger.error("No video file found in video_feed/")
         return None
     return max(files, key=os.path.getmtime)
 
@@ -45,86 +50,598 @@ def get_latest_video(folder):
 # ------------------------------
 output_dir = str(settings.MEDIA_ROOT).rstrip()
 os.makedirs(output_dir, exist_ok=True)
-executor = ThreadPoolExecutor(max_workers=2)
-
-def draw_bounding_boxes(frame, results):
-    """Draw bounding boxes and labels on detected frame."""
-    for r in results:
-        for box in r.boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            conf = float(box.conf[0])
-            cls = int(box.cls[0])
-            label = f"{model.names.get(cls, 'Unknown')} ({conf:.2f})"
-            color = (0, 0, 255)
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            cv2.putText(frame, label, (x1, y1 - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-    return frame
-
-def save_fault_and_notify(frame, label, conf, timestamp):
+JPEG_QUALITY = 90
+CONF_THRESHOLD = 0.5
+IOU_THRESHOLD = 0.5
+
+def make_save_queue(timer=None):
+    """One bounded save queue per detection job (see DETECTION_SAVE_QUEUE)."""
+    options = settings.DETECTION_SAVE_QUEUE
+
+    def handler(item):
+        with maybe_stage(timer, "save"):
+            save_fault_and_notify(item)
+
+    return SaveQueue(
+        handler,
+        gauges={
+            "depth": metrics.SAVE_QUEUE_DEPTH,
+            "bytes": metrics.SAVE_QUEUE_BYTES,
+            "dropped": metrics.SAVE_QUEUE_DROPPED,
+        },
+        workers=options.get("workers", 2),
+        max_items=options.get("max_items", 32),
+        max_bytes=options.get("max_bytes", 64 * 1024 * 1024),
+        policy=options.get("policy", "block"),
+        spill_dir=options.get("spill_dir"),
+    )
+
+def save_fault_and_notify(item):
+    """
+    Save one raw image per frame, with every detection of that frame.
+    `item.data` is the already encoded JPEG (or `item.spill_path` if it was
+    spilled to disk); `item.detections` is a list of
+    (label, conf, class_index, [x1, y1, x2, y2]), highest confidence first.
+    The record carries the top detection's class and every box is stored
+    as a Detection row.
+    """
     try:
-        filename = f"{label}_{timestamp}.jpg"
+        filename = item.filename
+        label, conf, class_index, _ = item.detections[0]
+
+        # A resumed job replays frames after its last checkpoint
+        if item.job_id is not None and FaultRecord.objects.filter(job_id=item.job_id, frame_index=item.frame_index).exists():
+            if item.spill_path:
+                os.remove(item.spill_path)
+            logger.info("Frame %s already saved for job %s, skipping", item.frame_index, item.job_id)
+            return
+
         local_path = os.path.join(output_dir, filename)
-        cv2.imwrite(local_path, frame)
+        if item.spill_path:
+            os.replace(item.spill_path, local_path)
+        else:
+            with open(local_path, "wb") as f:
+                f.write(item.data)
 
-        record = FaultRecord.objects.create(
-            image=filename,
-            status="pending",
-            confirmed=False,
-            sent_to_service=False
-        )
+        # Stored so clustering and confirm_fault compare hashes, not images
+        phash = phash_hex(local_path)
+
+        try:
+            with transaction.atomic():
+                record = FaultRecord.objects.create(
+                    image=filename,
+                    phash=phash,
+                    fault_name=label,
+                    class_index=class_index,
+                    status="pending",
+                    confirmed=False,
+                    sent_to_service=False,
+                    job_id=item.job_id,
+                    frame_index=item.frame_index,
+                )
+                Detection.objects.bulk_create([
+                    Detection(
+                        fault=record,
+                        frame_index=item.frame_index,
+                        class_index=cls,
+                        confidence=score,
+                        x1=box[0], y1=box[1], x2=box[2], y2=box[3],
+                        model_version=item.model_version,
+                    )
+                    for _, score, cls, box in item.detections
+                ])
+        except IntegrityError:
+            os.remove(local_path)
+            logger.info("Frame %s already saved for job %s, skipping", item.frame_index, item.job_id)
+            return
+
+        metrics.FAULTS_SAVED.inc()
 
         try:
             notify_fault.delay(record.id, feedback_required=True)
         except Exception as e:
-            print(f"[WARNING] Could not send async notification: {e}")
+            logger.warning("Could not send async notification: %s", e, extra={"fault_id": record.id})
+        schedule_clustering()
+
+        logger.info(
+            "Fault saved: %s", filename,
+            extra={"fault_id": record.id, "detections": len(item.detections), "top_confidence": round(conf, 3)},
+        )
+
+    except Exception:
+        logger.exception("Failed to save fault", extra={"image": item.filename})
+
+# ------------------------------
+# Resumable jobs
+# ------------------------------
+def video_fingerprint(path):
+    """Cheap identity of a video file: path, size and modification time."""
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def start_or_resume_job(video_file, profile_name, version, camera, resume=True):
+    """Continue the unfinished job for this video/model/profile/camera, or start one."""
+    fields = {
+        "video_fingerprint": video_fingerprint(video_file),
+        "model_version": version,
+        "profile": profile_name,
+        "camera": camera or "",
+    }
+    job = None
+    if resume:
+        job = DetectionJob.objects.filter(**fields).exclude(status="completed").first()
+
+    if job:
+        logger.info("Resuming detection job", extra={"job_id": job.id, "from_frame": job.last_frame + 1})
+        job.status = "running"
+        job.save(update_fields=["status", "updated"])
+        return job
+
+    return DetectionJob.objects.create(video_path=os.path.abspath(video_file), **fields)
+
+def job_identity(profile=None, detector=None):
+    """(profile name, model version) of a run, without loading the model."""
+    if detector is not None:
+        return detector.profile_name, detector.model_version
+    return get_profile(profile)[0], model_version()
 
-        print(f"[INFO] Fault saved: {filename} | Confidence: {conf:.2f}")
+def checkpoint(job, save_queue, frame_index, timestamp_ms):
+    """Record progress once every fault up to frame_index has been saved."""
+    save_queue.join()
+    job.last_frame = frame_index - 1
+    job.last_timestamp_ms = timestamp_ms
+    job.save(update_fields=["last_frame", "last_timestamp_ms", "updated"])
 
-    except Exception as e:
-        print(f"[ERROR] Failed to save fault: {e}")
+def read_batch(cap, size):
+    frames = []
+    while len(frames) < size:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    return frames
+
+def fault_image_name(label, timestamp, frame_index):
+    """
+    Unique file name for a saved fault frame. The random part keeps two
+    runs in the same second (or a resumed job) from reusing a name, so
+    /media/ can serve frames as immutable.
+    """
+    return f"{label}_{timestamp}_{uuid.uuid4().hex[:8]}_{frame_index}.jpg"
+
+
+def encode_fault_frame(frame, boxes, scores, classes, names):
+    """
+    JPEG-encode a raw frame for saving, with its detections as data.
+    Returns (jpeg bytes, [(label, conf, class_index, box), ...] highest
+    confidence first), or None if encoding failed. Boxes are not drawn on
+    the image: the UI renders overlays on demand (faults/overlays.py), so
+    the saved frame can go into the training set as is.
+    """
+    order = scores.argsort()[::-1]
+    frame_detections = [
+        (names.get(cls, "Unknown"), conf, cls, box)
+        for cls, conf, box in zip(classes[order].tolist(), scores[order].tolist(), boxes[order].tolist())
+    ]
+    # Queue the compact JPEG bytes, not the raw frame
+    ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        return None
+    return encoded.tobytes(), frame_detections
 
 # ------------------------------
 # Main fault detection
 # ------------------------------
-def run_fault_detection(video_file=None):
+def run_fault_detection(video_file=None, profile=None, camera=None, detector=None, timer=None,
+                        resume=True, workers=None, use_cache=None):
+    """
+    Detect faults in a video file (or the webcam) and save one record per
+    frame with detections. Video files run as a checkpointed DetectionJob;
+    with `resume` an unfinished job for the same file continues from its
+    last checkpoint. With more than one worker (default DETECTION_WORKERS)
+    a video file is split into segments that are detected in parallel.
+    With `use_cache` (default DETECTION_RESULT_CACHE["enabled"]) a video
+    already processed by the current model is not run through it again:
+    its cached detections are replayed through the save queue.
+    `detector` and `timer` are for benchmarks: a stub detector can replace
+    the model and a StageTimer collects per-stage latencies. Returns a
+    summary of the run.
+    """
     if not video_file or not os.path.exists(video_file):
         video_file = get_latest_video(video_dir)
         if not video_file:
-            print("[WARNING] No video available. Falling back to webcam.")
+            logger.warning("No video available. Falling back to webcam.")
             video_file = 0
 
+    camera_config = get_camera_config(camera)
+    use_cache = result_cache.enabled() if use_cache is None else use_cache
+    if use_cache and video_file != 0:
+        profile_name, version = job_identity(profile, detector)
+        cached = result_cache.lookup(video_file, version, profile_name, camera_config, CONF_THRESHOLD, IOU_THRESHOLD)
+        if cached is not None:
+            return replay_cached_detections(video_file, cached, profile_name, version, camera, timer, resume)
+
+    workers = settings.DETECTION_WORKERS if workers is None else workers
+    if workers > 1 and video_file != 0:
+        return run_parallel_detection(video_file, profile, camera, workers, detector, timer, resume, use_cache)
+
+    detector = detector or get_detector(profile)
+    logger.info(
+        "Starting fault detection",
+        extra={"profile": detector.profile_name, "camera": camera or "default"},
+    )
+
     cap = cv2.VideoCapture(video_file)
+    # A live camera is processed frame by frame so alerts are not delayed
+    batch_size = 1 if video_file == 0 else settings.DETECTION_BATCH_SIZE
+    frame_index = start_frame = 0
+    faults_found = 0
+    save_queue = make_save_queue(timer)
+    job = None
+    job_status = "failed"
+    # Detections of the whole run, cached once it completes
+    collected = [] if use_cache and video_file != 0 else None
+    checkpoint_every = settings.DETECTION_CHECKPOINT_EVERY
+    fps_started = time.perf_counter()
+    fps_frames = 0
+    current_fps = 0.0
 
     try:
+        if video_file != 0:
+            job = start_or_resume_job(video_file, detector.profile_name, detector.model_version, camera, resume)
+            job.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+            if job.last_frame >= 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, job.last_frame + 1)
+                # Seeking may land on an earlier keyframe; replayed frames are deduplicated
+                frame_index = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        start_frame = frame_index
+        next_checkpoint = frame_index + checkpoint_every
+
         while True:
-            ret, frame = cap.read()
-            if not ret:
-                print("[INFO] End of video OR Camera not returning frames")
+            with maybe_stage(timer, "decode"):
+                frames = read_batch(cap, batch_size)
+            if not frames:
+                logger.info("End of video OR Camera not returning frames")
+                job_status = "completed"
                 break
 
-            results = model(frame, conf=0.5, iou=0.5)
-            annotated_frame = draw_bounding_boxes(frame.copy(), results)
+            with maybe_stage(timer, "infer"), metrics.observe(metrics.INFERENCE_LATENCY, profile=detector.profile_name):
+                detections = detector.detect(frames, conf=CONF_THRESHOLD, iou=IOU_THRESHOLD, camera_config=camera_config)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+            for frame, (boxes, scores, classes) in zip(frames, detections):
+                if len(boxes):
+                    if collected is not None:
+                        collected.append((frame_index, boxes, scores, classes))
+                    with maybe_stage(timer, "encode"):
+                        encoded = encode_fault_frame(frame, boxes, scores, classes, detector.names)
+                    if encoded:
+                        data, frame_detections = encoded
+                        label, conf = frame_detections[0][:2]
+                        item = SaveItem(
+                            fault_image_name(label, timestamp, frame_index),
+                            data,
+                            frame_detections,
+                            priority=conf,
+                            job_id=job.id if job else None,
+                            frame_index=frame_index if job else None,
+                            model_version=detector.model_version,
+                        )
+                        with maybe_stage(timer, "queue_wait"):
+                            if save_queue.submit(item):
+                                faults_found += 1
+                frame_index += 1
+
+            metrics.FRAMES_PROCESSED.inc(len(frames))
+            fps_frames += len(frames)
+            elapsed = time.perf_counter() - fps_started
+            if elapsed >= 5:
+                metrics.DECODE_FPS.dec(current_fps)
+                current_fps = fps_frames / elapsed
+                metrics.DECODE_FPS.inc(current_fps)
+                fps_started, fps_frames = time.perf_counter(), 0
+
+            if job and frame_index >= next_checkpoint:
+                checkpoint(job, save_queue, frame_index, cap.get(cv2.CAP_PROP_POS_MSEC))
+                next_checkpoint = frame_index + checkpoint_every
+
+            if frame_index % 500 < batch_size:
+                logger.info("Detection progress", extra={"frame": frame_index, "fps": round(current_fps, 2), **save_queue.stats()})
+
+    except KeyboardInterrupt:
+        logger.info("Interrupted by user")
+        job_status = "interrupted"
+
+    finally:
+        save_queue.close(wait=True)
+        if job:
+            # Every queued fault is saved now, so the whole processed range is done
+            job.last_frame = frame_index - 1
+            job.last_timestamp_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            job.status = job_status
+            job.save()
+        cap.release()
+        metrics.DECODE_FPS.dec(current_fps)
+        logger.info("Detection complete, resources released", extra={"frames": frame_index, **save_queue.stats()})
+
+    # A resumed run only saw part of the video, so only full runs are cached
+    if collected is not None and job_status == "completed" and start_frame == 0:
+        result_cache.store(
+            video_file, detector.model_version, detector.profile_name, camera_config,
+            CONF_THRESHOLD, IOU_THRESHOLD, detector.names, frame_index, collected,
+        )
+
+    return {
+        "job_id": job.id if job else None,
+        "start_frame": start_frame,
+        "frames": frame_index - start_frame,
+        "faults": faults_found,
+        "cached": False,
+        "save_queue": save_queue.stats(),
+    }
+
+# ------------------------------
+# Cached results
+# ------------------------------
+def replay_cached_detections(video_file, cached, profile_name, version, camera=None, timer=None, resume=True):
+    """
+    Save and notify the faults of a video whose detections are cached,
+    without loading the model. Only frames with detections are decoded
+    and encoded; the others are skipped with grab().
+    """
+    job = start_or_resume_job(video_file, profile_name, version, camera, resume)
+    job.total_frames = cached.entry.frames or None
+    start_frame = job.last_frame + 1
+    cap = cv2.VideoCapture(video_file)
+    save_queue = make_save_queue(timer)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    faults_found = 0
+    frame_index = 0
+    job_status = "failed"
 
-            for r in results:
-                for box in r.boxes:
-                    cls = int(box.cls[0])
-                    label = model.names.get(cls, "Unknown")
-                    conf = float(box.conf[0])
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    executor.submit(save_fault_and_notify, annotated_frame.copy(), label, conf, timestamp)
+    try:
+        for index in cached.frame_indices.tolist():
+            if index < start_frame:
+                continue
+            with maybe_stage(timer, "decode"):
+                while frame_index < index and cap.grab():
+                    frame_index += 1
+                ret, frame = cap.read() if frame_index == index else (False, None)
+            if not ret:
+                logger.warning("Cached video ended early, stopping replay", extra={"frame": frame_index})
+                break
+            frame_index += 1
+
+            boxes, scores, classes = cached.get(index)
+            with maybe_stage(timer, "encode"):
+                encoded = encode_fault_frame(frame, boxes, scores, classes, cached.names)
+            if encoded:
+                data, frame_detections = encoded
+                label, conf = frame_detections[0][:2]
+                item = SaveItem(
+                    fault_image_name(label, timestamp, index),
+                    data,
+                    frame_detections,
+                    priority=conf,
+                    job_id=job.id,
+                    frame_index=index,
+                    model_version=version,
+                )
+                with maybe_stage(timer, "queue_wait"):
+                    if save_queue.submit(item):
+                        faults_found += 1
+        else:
+            job_status = "completed"
 
     except KeyboardInterrupt:
-        print("[INFO] Interrupted by user")
+        logger.info("Interrupted by user")
+        job_status = "interrupted"
+
+    finally:
+        save_queue.close(wait=True)
+        job.last_frame = cached.entry.frames - 1 if job_status == "completed" else frame_index - 1
+        job.status = job_status
+        job.save()
+        cap.release()
+        logger.info("Replayed cached detections", extra={"faults": faults_found, **save_queue.stats()})
+
+    return {
+        "job_id": job.id,
+        "start_frame": start_frame,
+        "frames": max(job.last_frame + 1 - start_frame, 0),
+        "faults": faults_found,
+        "cached": True,
+        "save_queue": save_queue.stats(),
+    }
+
+# ------------------------------
+# Parallel segment detection
+# ------------------------------
+# Each pool process loads its own detector once, in _init_segment_worker
+_segment_detector = None
+
+def _init_segment_worker(profile, detector):
+    global _segment_detector
+    _segment_detector = detector or get_detector(profile)
+
+def split_segments(start, total, size):
+    """Consecutive [start, end) frame ranges of at most `size` frames."""
+    return [(s, min(s + size, total)) for s in range(start, total, size)]
+
+def detect_segment(args):
+    """
+    Detect faults in frames [start, end) of a video, in a pool process.
+    Returns the encoded JPEGs and detections of frames with detections;
+    the parent process saves them so DB writes and notifications stay in
+    one place.
+    """
+    video_file, start, end, camera_config, batch_size = args
+    detector = _segment_detector
+    cap = cv2.VideoCapture(video_file)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+
+    # Seeking may land on an earlier keyframe: decode forward without inference
+    while position < start and cap.grab():
+        position += 1
+    if position > start:
+        logger.warning("Seek overshot segment start", extra={"start": start, "position": position})
+
+    faults = []
+    infer_s = 0.0
+    try:
+        while position < end:
+            frames = read_batch(cap, min(batch_size, end - position))
+            if not frames:
+                break
 
+            started = time.perf_counter()
+            detections = detector.detect(frames, conf=CONF_THRESHOLD, iou=IOU_THRESHOLD, camera_config=camera_config)
+            infer_s += time.perf_counter() - started
+
+            for frame, (boxes, scores, classes) in zip(frames, detections):
+                if len(boxes):
+                    encoded = encode_fault_frame(frame, boxes, scores, classes, detector.names)
+                    if encoded:
+                        faults.append((position, *encoded, boxes, scores, classes))
+                position += 1
     finally:
         cap.release()
-        executor.shutdown(wait=True)
-        print("[INFO] Detection complete, resources released.")
+
+    return {"start": start, "end": position, "faults": faults, "infer_s": infer_s, "names": detector.names}
+
+def run_parallel_detection(video_file, profile=None, camera=None, workers=2, detector=None, timer=None,
+                           resume=True, use_cache=False):
+    """
+    Split a video file into DETECTION_SEGMENT_FRAMES-long segments and
+    detect them in a pool of `workers` processes, each holding a model.
+    Segments come back in time order and are saved through the usual save
+    queue, skipping any frame already handed over (segments overlap when a
+    seek lands early), and the job is checkpointed after each segment.
+    """
+    profile_name, version = job_identity(profile, detector)
+    camera_config = get_camera_config(camera)
+    logger.info(
+        "Starting parallel fault detection",
+        extra={"profile": profile_name, "camera": camera or "default", "workers": workers},
+    )
+
+    cap = cv2.VideoCapture(video_file)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    cap.release()
+    if total_frames <= 0:
+        logger.warning("Video has no frame count, cannot split it; detecting sequentially")
+        return run_fault_detection(video_file, profile, camera, detector, timer, resume, workers=1, use_cache=use_cache)
+
+    job = start_or_resume_job(video_file, profile_name, version, camera, resume)
+    job.total_frames = total_frames or None
+    start_frame = frame_index = job.last_frame + 1
+    segments = split_segments(start_frame, total_frames, settings.DETECTION_SEGMENT_FRAMES)
+
+    save_queue = make_save_queue(timer)
+    faults_found = 0
+    names = {}
+    collected = [] if use_cache else None
+    last_submitted = start_frame - 1
+    job_status = "failed"
+    checkpoint_every = settings.DETECTION_CHECKPOINT_EVERY
+    next_checkpoint = start_frame + checkpoint_every
+    started = time.perf_counter()
+
+    # "spawn" so every worker starts clean instead of forking a process
+    # that may already hold a model, DB connections and save-queue threads
+    context = multiprocessing.get_context("spawn")
+    pool = context.Pool(workers, initializer=_init_segment_worker, initargs=(profile, detector))
+    try:
+        tasks = [(video_file, start, end, camera_config, settings.DETECTION_BATCH_SIZE) for start, end in segments]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # imap keeps segment order, so faults are saved in time order
+        for result in pool.imap(detect_segment, tasks):
+            names = result["names"]
+            for index, data, frame_detections, boxes, scores, classes in result["faults"]:
+                if index <= last_submitted:
+                    continue
+                if collected is not None:
+                    collected.append((index, boxes, scores, classes))
+                label, conf = frame_detections[0][:2]
+                item = SaveItem(
+                    fault_image_name(label, timestamp, index),
+                    data,
+                    frame_detections,
+                    priority=conf,
+                    job_id=job.id,
+                    frame_index=index,
+                    model_version=version,
+                )
+                with maybe_stage(timer, "queue_wait"):
+                    if save_queue.submit(item):
+                        faults_found += 1
+                last_submitted = index
+
+            if timer:
+                timer.record("segment_infer", result["infer_s"])
+            metrics.FRAMES_PROCESSED.inc(result["end"] - result["start"])
+            frame_index = result["end"]
+
+            if frame_index >= next_checkpoint:
+                checkpoint(job, save_queue, frame_index, frame_index * 1000 / fps)
+                next_checkpoint = frame_index + checkpoint_every
+
+        logger.info("End of video")
+        job_status = "completed"
+        pool.close()
+
+    except KeyboardInterrupt:
+        logger.info("Interrupted by user")
+        job_status = "interrupted"
+        pool.terminate()
+
+    except Exception:
+        logger.exception("Parallel detection failed")
+        pool.terminate()
+
+    finally:
+        pool.join()
+        save_queue.close(wait=True)
+        job.last_frame = frame_index - 1
+        job.last_timestamp_ms = frame_index * 1000 / fps
+        job.status = job_status
+        job.save()
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "Detection complete, resources released",
+            extra={
+                "frames": frame_index,
+                "workers": workers,
+                "fps": round((frame_index - start_frame) / elapsed, 2) if elapsed else None,
+                **save_queue.stats(),
+            },
+        )
+
+    if collected is not None and job_status == "completed" and start_frame == 0:
+        result_cache.store(
+            video_file, version, profile_name, camera_config,
+            CONF_THRESHOLD, IOU_THRESHOLD, names, frame_index, collected,
+        )
+
+    return {
+        "job_id": job.id,
+        "start_frame": start_frame,
+        "frames": frame_index - start_frame,
+        "faults": faults_found,
+        "cached": False,
+        "save_queue": save_queue.stats(),
+    }
 
 # ------------------------------
 # Run script directly
 # ------------------------------
 if __name__ == "__main__":
     video_arg = sys.argv[1] if len(sys.argv) > 1 else None
-    run_fault_detection(video_arg)
+    profile_arg = sys.argv[2] if len(sys.argv) > 2 else None
+    camera_arg = sys.argv[3] if len(sys.argv) > 3 else None
+    workers_arg = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] else None
+    run_fault_detection(video_arg, profile_arg, camera_arg, workers=workers_arg)
@@ -0,0 +1,183 @@
+import os
+import re
+import stat
+import mimetypes
+import posixpath
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+# ----------------------------------------
+# Mounts
+# ----------------------------------------
+def mounts():
+    """
+    URL prefix -> (root directory, immutable, login required). Fault
+    frames are written once under unique names (detect_faults.
+    fault_image_name), so they are cached as immutable; dataset images and
+    labels are edited in place and are revalidated with the ETag. Recorded
+    videos are only served to signed-in users.
+    """
+    return {
+        "media": (str(settings.MEDIA_ROOT), True, False),
+        "dataset": (str(settings.DATASET_ROOT), False, False),
+        "videos": (str(settings.VIDEO_UPLOAD_DIR), False, True),
+    }
+
+
+def resolve(root, path):
+    """
+    (absolute path, normalized relative path) of `path` under `root`.
+    Hidden files/dirs (overlays, spill files, caches) and escapes are 404.
+    """
+    path = posixpath.normpath(path).lstrip("/")
+    if any(part.startswith(".") for part in path.split("/")):
+        raise Http404("Not found")
+    try:
+        return safe_join(root, path), path
+    except ValueError:
+        raise Http404("Not found")
+
+
+# ----------------------------------------
+# Headers
+# ----------------------------------------
+def etag_for(st):
+    """Strong validator: any rewrite changes the inode, size or mtime."""
+    return f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single "bytes=" range, None to send the
+    whole file (no/multi/malformed range), or False if unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:  # suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _accel_response(path, mount, relative, content_type):
+    """Empty response telling the front server to send the file itself."""
+    options = settings.FILE_SERVING
+    response = HttpResponse(content_type=content_type)
+    if options["accel"] == "nginx":
+        response["X-Accel-Redirect"] = quote(posixpath.join(options["internal_prefix"], mount, relative))
+    else:
+        response["X-Sendfile"] = path
+    return response
+
+
+# ----------------------------------------
+# Serving
+# ----------------------------------------
+def serve_path(request, path, immutable=False, mount=None, relative=None):
+    """
+    Serve a file with ETag/Last-Modified, conditional requests (304) and
+    single byte ranges (206). With FILE_SERVING["accel"] set and a `mount`
+    given (`relative` being the path under it), the bytes are left to the
+    front server via X-Accel-Redirect or X-Sendfile; otherwise the file
+    object goes to the WSGI file wrapper (sendfile() under gunicorn).
+    Immutable files are cached for FILE_SERVING["immutable_max_age"],
+    anything else is revalidated on every use (no-cache).
+    """
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("Not found")
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404("Not found")
+
+    etag = etag_for(st)
+    last_modified = int(st.st_mtime)
+    options = settings.FILE_SERVING
+    if immutable:
+        cache_control = f"public, max-age={options['immutable_max_age']}, immutable"
+    else:
+        cache_control = "no-cache"
+
+    def finish(response):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = cache_control
+        response["Accept-Ranges"] = "bytes"
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return finish(not_modified)
+
+    content_type, encoding = mimetypes.guess_type(path)
+    content_type = content_type or "application/octet-stream"
+
+    if options["accel"] and mount:
+        # The front server handles Range itself
+        return finish(_accel_response(path, mount, relative, content_type))
+
+    byte_range = None
+    if request.method == "GET" and st.st_size:
+        if_range = request.headers.get("If-Range")
+        if not if_range or if_range == etag:
+            byte_range = parse_range(request.headers.get("Range"), st.st_size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{st.st_size}"
+        return finish(response)
+
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(_read_range(path, start, length), status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+        response["Content-Length"] = str(length)
+        return finish(response)
+
+    response = FileResponse(open(path, "rb"), content_type=content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return finish(response)
+
+
+def serve(request, mount, path):
+    """View for /media/, /dataset/ and /videos/ (see railway_faults/urls.py)."""
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponse(status=405, headers={"Allow": "GET, HEAD"})
+    try:
+        root, immutable, login_required = mounts()[mount]
+    except KeyError:
+        raise Http404("Not found")
+    if login_required and not request.user.is_authenticated:
+        raise PermissionDenied
+    full_path, relative = resolve(root, path)
+    return serve_path(request, full_path, immutable=immutable, mount=mount, relative=relative)
@@ -0,0 +1,567 @@
+import os
+import json
+import glob
+import shutil
+import time
+import hashlib
+import logging
+import threading
+import importlib.util
+import numpy as np
+import torch
+from django.conf import settings
+from ultralytics import YOLO
+from ultralytics.utils.metrics import ap_per_class, box_iou
+from .roi import apply_roi, tile_windows, nms
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------------------
+# CONFIG
+# ----------------------------------------
+WEIGHTS_DIR = os.path.join(
+    settings.BASE_DIR,
+    "faults", "runs", "detect", "yolov8n-custom4", "weights"
+)
+BEST_PT = os.path.join(WEIGHTS_DIR, "best.pt")
+DATA_YAML = os.path.join(settings.DATASET_ROOT, "data.yaml")
+EXPORT_MANIFEST = os.path.join(WEIGHTS_DIR, "export_manifest.json")
+
+# Fallback order when the export manifest has no timings (exports made
+# before they were recorded). export_models() times every usable backend
+# on the sample images and available_backends() orders by that.
+BACKEND_PRIORITY = ["openvino", "onnx", "pytorch"]
+
+# Python module that must be importable for each runtime
+BACKEND_RUNTIMES = {
+    "openvino": "openvino",
+    "onnx": "onnxruntime",
+    "pytorch": "torch",
+    "int8": "openvino",
+}
+
+# Exported model must agree with the .pt model within these limits
+PARITY_BOX_TOLERANCE = 2.0    # pixels
+PARITY_CONF_TOLERANCE = 0.02
+PARITY_SAMPLE_IMAGES = 8
+TIMING_WARMUP = 2
+
+
+def backend_weights_path(backend, weights=BEST_PT):
+    """Path ultralytics expects for the given backend's artifact."""
+    stem = os.path.splitext(weights)[0]
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "openvino":
+        return stem + "_openvino_model"
+    if backend == "int8":
+        return stem + "_int8_openvino_model"
+    return weights
+
+
+def runtime_installed(backend):
+    return importlib.util.find_spec(BACKEND_RUNTIMES[backend]) is not None
+
+
+def _load_manifest():
+    if not os.path.exists(EXPORT_MANIFEST):
+        return {}
+    try:
+        with open(EXPORT_MANIFEST, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest):
+    tmp_path = EXPORT_MANIFEST + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, EXPORT_MANIFEST)
+
+
+def available_backends(weights=BEST_PT):
+    """
+    Backends usable right now, fastest first.
+    An exported backend only counts if its runtime is installed, it was
+    exported from the current .pt file and it passed the parity check.
+    They are ordered by the latency measured at export when every one of
+    them has a timing for the current weights, else by BACKEND_PRIORITY.
+    """
+    manifest = _load_manifest()
+    source_mtime = os.path.getmtime(weights) if os.path.exists(weights) else None
+
+    backends = []
+    for backend in BACKEND_PRIORITY:
+        if not runtime_installed(backend):
+            continue
+        if backend == "pytorch":
+            backends.append(backend)
+            continue
+
+        entry = manifest.get(backend)
+        if not entry or not entry.get("parity"):
+            continue
+        if entry.get("source_mtime") != source_mtime:
+            continue
+        if not os.path.exists(backend_weights_path(backend, weights)):
+            continue
+        backends.append(backend)
+
+    latencies = {}
+    for backend in backends:
+        entry = manifest.get(backend) or {}
+        if entry.get("source_mtime") == source_mtime and entry.get("latency_ms") is not None:
+            latencies[backend] = entry["latency_ms"]
+    if len(latencies) == len(backends):
+        backends.sort(key=latencies.get)
+
+    return backends
+
+
+def int8_available(weights=BEST_PT):
+    """INT8 is lossy, so it is never picked by "auto" and has no parity check."""
+    entry = _load_manifest().get("int8")
+    return bool(
+        entry
+        and runtime_installed("int8")
+        and os.path.exists(weights)
+        and entry.get("source_mtime") == os.path.getmtime(weights)
+        and os.path.exists(backend_weights_path("int8", weights))
+    )
+
+
+def resolve_backend(requested=None, weights=BEST_PT):
+    """
+    Pick the backend for detection.
+    "auto" (the default) picks the fastest available one; an explicit
+    backend that is not available falls back to PyTorch.
+    """
+    requested = requested or getattr(settings, "DETECTION_BACKEND", "auto")
+
+    if requested == "int8":
+        if int8_available(weights):
+            return "int8"
+        logger.warning("No INT8 export for the current weights, using full precision")
+        requested = "auto"
+
+    backends = available_backends(weights)
+
+    if requested == "auto":
+        return backends[0] if backends else "pytorch"
+
+    if requested not in backends:
+        logger.warning("Backend '%s' not available, using pytorch", requested)
+        return "pytorch"
+
+    return requested
+
+
+_model_versions = {}
+
+
+def model_version(weights=BEST_PT):
+    """
+    Short content hash of the weights file. Every training run changes it,
+    so it identifies which model produced a detection.
+    """
+    stat = os.stat(weights)
+    key = (weights, stat.st_mtime_ns, stat.st_size)
+    if key not in _model_versions:
+        digest = hashlib.sha1()
+        with open(weights, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        _model_versions[key] = digest.hexdigest()[:16]
+    return _model_versions[key]
+
+
+def load_detection_model(backend=None, weights=BEST_PT):
+    backend = resolve_backend(backend, weights)
+    path = backend_weights_path(backend, weights)
+    logger.info("Loading detection model", extra={"backend": backend, "path": path})
+    model = YOLO(path, task="detect")
+    model.backend = backend
+    return model
+
+
+# ----------------------------------------
+# Export after training
+# ----------------------------------------
+def _sample_images(limit=PARITY_SAMPLE_IMAGES):
+    patterns = [
+        os.path.join(settings.DATASET_ROOT, "val", "images", "*"),
+        os.path.join(settings.DATASET_ROOT, "train", "images", "*"),
+    ]
+    images = []
+    for pattern in patterns:
+        images += sorted(
+            f for f in glob.glob(pattern)
+            if f.lower().endswith((".jpg", ".jpeg", ".png"))
+        )
+    return images[:limit]
+
+
+def _boxes(result):
+    """(xyxy, conf, cls) rows sorted so two models can be compared row by row."""
+    rows = zip(
+        result.boxes.xyxy.cpu().tolist(),
+        result.boxes.conf.cpu().tolist(),
+        result.boxes.cls.cpu().tolist(),
+    )
+    return sorted(rows, key=lambda r: (int(r[2]), -r[1]))
+
+
+def check_parity(reference, candidate, images, conf=0.5, iou=0.5):
+    """
+    True if the candidate model returns the same detections as the
+    reference. Without sample images nothing is proven, so that is False.
+    """
+    if not images:
+        logger.warning("Parity: no sample images in the dataset, not trusting the export")
+        return False
+
+    for image in images:
+        ref = _boxes(reference(image, conf=conf, iou=iou, verbose=False)[0])
+        got = _boxes(candidate(image, conf=conf, iou=iou, verbose=False)[0])
+
+        if len(ref) != len(got):
+            logger.warning("Parity: %s has %d vs %d boxes", os.path.basename(image), len(ref), len(got))
+            return False
+
+        for (ref_xyxy, ref_conf, ref_cls), (xyxy, conf_, cls) in zip(ref, got):
+            if int(ref_cls) != int(cls):
+                return False
+            if abs(ref_conf - conf_) > PARITY_CONF_TOLERANCE:
+                return False
+            if max(abs(a - b) for a, b in zip(ref_xyxy, xyxy)) > PARITY_BOX_TOLERANCE:
+                return False
+
+    return True
+
+
+def time_backend(model, images, conf=0.5, iou=0.5):
+    """Mean milliseconds per image over `images`, after a short warm-up."""
+    for image in images[:TIMING_WARMUP]:
+        model(image, conf=conf, iou=iou, verbose=False)
+    start = time.perf_counter()
+    for image in images:
+        model(image, conf=conf, iou=iou, verbose=False)
+    return round((time.perf_counter() - start) * 1000 / len(images), 2)
+
+
+def export_models(weights=BEST_PT, formats=None, imgsz=640):
+    """
+    Export the trained .pt weights to CPU runtimes and record which ones
+    reproduce the PyTorch detections. Returns the updated manifest.
+    The "int8" format is a quantized OpenVINO export calibrated on the
+    dataset; it is recorded without a parity check. Every usable backend
+    (PyTorch included) is timed on the sample images, so "auto" picks the
+    one that is fastest on this machine.
+    """
+    formats = formats or getattr(settings, "DETECTION_EXPORT_FORMATS", ["onnx"])
+    manifest = _load_manifest()
+    source_mtime = os.path.getmtime(weights)
+    reference = YOLO(weights)
+    images = _sample_images()
+    if images:
+        manifest["pytorch"] = {"source_mtime": source_mtime, "latency_ms": time_backend(reference, images)}
+
+    for fmt in formats:
+        if not runtime_installed(fmt):
+            logger.info("Skipping %s export: runtime not installed", fmt)
+            continue
+
+        try:
+            logger.info("Exporting %s model", fmt)
+            if fmt == "int8":
+                YOLO(weights).export(format="openvino", imgsz=imgsz, int8=True, data=DATA_YAML)
+                manifest[fmt] = {
+                    "path": backend_weights_path(fmt, weights),
+                    "source_mtime": source_mtime,
+                    "parity": None,
+                }
+                continue
+
+            YOLO(weights).export(format=fmt, imgsz=imgsz, dynamic=True)
+
+            exported = backend_weights_path(fmt, weights)
+            candidate = YOLO(exported, task="detect")
+            parity = check_parity(reference, candidate, images)
+            if not parity:
+                logger.warning("%s output differs from PyTorch, not using it", fmt)
+                if os.path.isdir(exported):
+                    shutil.rmtree(exported, ignore_errors=True)
+
+            manifest[fmt] = {
+                "path": exported,
+                "source_mtime": source_mtime,
+                "parity": parity,
+                "checked_images": len(images),
+                "latency_ms": time_backend(candidate, images) if parity else None,
+            }
+
+        except Exception:
+            logger.exception("%s export failed", fmt)
+            manifest.pop(fmt, None)
+
+    _save_manifest(manifest)
+    return manifest
+
+
+# ----------------------------------------
+# Inference profiles
+# ----------------------------------------
+def get_profile(name=None):
+    """Return (name, options) for a named profile from INFERENCE_PROFILES."""
+    profiles = settings.INFERENCE_PROFILES
+    name = name or getattr(settings, "DEFAULT_INFERENCE_PROFILE", "default")
+    if name not in profiles:
+        logger.warning("Unknown inference profile '%s', using default", name)
+        name = "default"
+    return name, profiles[name]
+
+
+class Detector:
+    """
+    A loaded model plus the profile it runs with.
+    Cascade profiles run every frame at a low resolution with a permissive
+    threshold and re-check only frames with candidates at full resolution.
+    """
+
+    def __init__(self, profile=None):
+        self.profile_name, self.profile = get_profile(profile)
+        backend = "int8" if self.profile.get("int8") else None
+        self.model = load_detection_model(backend)
+        self.model_version = model_version()
+        self.names = self.model.names
+        self.imgsz = self.profile.get("imgsz", 640)
+        self.confirm_imgsz = self.profile.get("confirm_imgsz")
+        self.candidate_conf = self.profile.get("candidate_conf", 0.25)
+
+    def predict(self, frames, conf=0.5, iou=0.5):
+        """Run the profile on one frame or a list of frames; returns ultralytics Results."""
+        if not self.confirm_imgsz:
+            return self.model(frames, conf=conf, iou=iou, imgsz=self.imgsz, verbose=False)
+
+        batch = frames if isinstance(frames, list) else [frames]
+        results = self.model(batch, conf=self.candidate_conf, iou=iou, imgsz=self.imgsz, verbose=False)
+        candidates = [i for i, r in enumerate(results) if len(r.boxes)]
+
+        if candidates:
+            confirmed = self.model(
+                [batch[i] for i in candidates],
+                conf=conf, iou=iou, imgsz=self.confirm_imgsz, verbose=False
+            )
+            for i, result in zip(candidates, confirmed):
+                results[i] = result
+
+        return results
+
+    def detect(self, frames, conf=0.5, iou=0.5, camera_config=None):
+        """
+        Run the profile on a list of full frames, honouring the camera's ROI
+        and tiling settings. Returns one (boxes, scores, classes) tuple of
+        NumPy arrays per frame, with boxes in full-frame xyxy pixels.
+        """
+        camera_config = camera_config or {}
+        views, offsets = [], []
+        for frame in frames:
+            view, offset = apply_roi(frame, camera_config)
+            views.append(view)
+            offsets.append(offset)
+
+        tile = camera_config.get("tile")
+        if not tile:
+            results = self.predict(views, conf=conf, iou=iou)
+            return [
+                _shift(arrays, ox, oy)
+                for arrays, (ox, oy) in zip(batch_arrays(results), offsets)
+            ]
+
+        # Tiled: every tile of every frame goes through the model in one batch
+        crops, owners = [], []
+        for index, view in enumerate(views):
+            height, width = view.shape[:2]
+            for x1, y1, x2, y2 in tile_windows(width, height, tile["size"], tile.get("overlap", 0.2)):
+                crops.append(view[y1:y2, x1:x2])
+                owners.append((index, x1 + offsets[index][0], y1 + offsets[index][1]))
+
+        per_frame = [[] for _ in frames]
+        tile_arrays = batch_arrays(self.predict(crops, conf=conf, iou=iou))
+        for arrays, (index, ox, oy) in zip(tile_arrays, owners):
+            per_frame[index].append(_shift(arrays, ox, oy))
+
+        merged = []
+        for parts in per_frame:
+            boxes = np.concatenate([p[0] for p in parts])
+            scores = np.concatenate([p[1] for p in parts])
+            classes = np.concatenate([p[2] for p in parts])
+            keep = nms(boxes, scores, classes, iou)
+            merged.append((boxes[keep], scores[keep], classes[keep]))
+        return merged
+
+
+def batch_arrays(results):
+    """
+    Convert a batch of ultralytics Results to NumPy in one transfer.
+    Returns one (boxes Nx4 float32, scores N float32, classes N int64)
+    tuple per result.
+    """
+    counts = [len(r.boxes) for r in results]
+    if not sum(counts):
+        data = np.empty((0, 6), dtype=np.float32)
+    else:
+        # boxes.data rows are x1, y1, x2, y2, [track id,] conf, cls
+        data = torch.cat([r.boxes.data[:, [0, 1, 2, 3, -2, -1]] for r in results]).cpu().numpy()
+
+    arrays = []
+    for chunk in np.split(data, np.cumsum(counts)[:-1]):
+        arrays.append((
+            chunk[:, :4].astype(np.float32),
+            chunk[:, 4].astype(np.float32),
+            chunk[:, 5].astype(np.int64),
+        ))
+    return arrays
+
+
+def _shift(arrays, dx, dy):
+    boxes, scores, classes = arrays
+    if dx or dy:
+        boxes = boxes + np.array([dx, dy, dx, dy], dtype=np.float32)
+    return boxes, scores, classes
+
+
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+
+def get_detector(profile=None):
+    """Detectors are cached per profile so each model is loaded once per process."""
+    name, _ = get_profile(profile)
+    with _detectors_lock:
+        if name not in _detectors:
+            _detectors[name] = Detector(name)
+        return _detectors[name]
+
+
+def clear_detectors():
+    """Drop cached detectors so the next job loads freshly trained weights."""
+    with _detectors_lock:
+        _detectors.clear()
+
+
+# ----------------------------------------
+# Profile evaluation (accuracy vs speed)
+# ----------------------------------------
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+def read_yolo_labels(path, width, height):
+    """(classes, xyxy pixel boxes) from a YOLO label file; empty when there is none."""
+    rows = []
+    if os.path.exists(path):
+        with open(path) as f:
+            rows = [line.split() for line in f if line.strip()]
+    classes = np.array([int(r[0]) for r in rows], dtype=np.int64)
+    cx, cy, w, h = np.array([[float(v) for v in r[1:5]] for r in rows], dtype=np.float32).reshape(-1, 4).T
+    boxes = np.stack([(cx - w / 2) * width, (cy - h / 2) * height, (cx + w / 2) * width, (cy + h / 2) * height], axis=1)
+    return classes, boxes
+
+
+def match_detections(boxes, scores, classes, true_boxes, true_classes):
+    """
+    Detections x IOU_THRESHOLDS matrix of true positives. Detections claim
+    the best unclaimed label of their class, highest confidence first.
+    """
+    correct = np.zeros((len(boxes), len(IOU_THRESHOLDS)), dtype=bool)
+    if not len(boxes) or not len(true_boxes):
+        return correct
+    iou = box_iou(torch.from_numpy(true_boxes), torch.from_numpy(boxes)).numpy()
+    iou = iou * (true_classes[:, None] == classes[None, :])
+    levels = range(len(IOU_THRESHOLDS))
+    claimed = np.zeros((len(true_boxes), len(IOU_THRESHOLDS)), dtype=bool)
+    for j in np.argsort(-scores):
+        available = np.where(claimed, 0, iou[:, j, None])
+        best = available.argmax(0)
+        correct[j] = available[best, levels] >= IOU_THRESHOLDS
+        claimed[best, levels] |= correct[j]
+    return correct
+
+
+def detection_map(detector, frames, labels, conf=0.001, iou=0.6):
+    """
+    (mAP50, mAP50-95) of detector.predict on `frames` against `labels`
+    [(classes, boxes)], i.e. through the same path detection takes: for a
+    cascade, frames the low-res pass drops count as misses.
+    """
+    tp, scores, pred_classes, true_classes = [], [], [], []
+    for frame, (classes, boxes) in zip(frames, labels):
+        found = batch_arrays(detector.predict([frame], conf=conf, iou=iou))[0]
+        tp.append(match_detections(*found, boxes, classes))
+        scores.append(found[1])
+        pred_classes.append(found[2])
+        true_classes.append(classes)
+
+    if not sum(len(c) for c in true_classes):
+        return 0.0, 0.0
+    ap = ap_per_class(
+        np.concatenate(tp), np.concatenate(scores), np.concatenate(pred_classes), np.concatenate(true_classes),
+    )[5]
+    return float(ap[:, 0].mean()), float(ap.mean())
+
+
+def evaluate_profile(profile, data_yaml=DATA_YAML, split="val", max_images=200):
+    """
+    Report mAP and frames/sec for one profile on up to max_images labelled
+    images. mAP is measured on Detector.predict, so for cascade profiles
+    it covers both stages; candidate_recall shows how many frames with
+    detections the low-res pass forwarded (1.0 means the cascade loses
+    nothing).
+    """
+    import cv2
+
+    detector = Detector(profile)
+
+    split_dir = os.path.join(os.path.dirname(data_yaml), split)
+    images_dir = os.path.join(split_dir, "images")
+    images = sorted(
+        os.path.join(images_dir, f) for f in os.listdir(images_dir)
+        if f.lower().endswith((".jpg", ".jpeg", ".png"))
+    )[:max_images]
+    frames, labels = [], []
+    for path in images:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        stem = os.path.splitext(os.path.basename(path))[0]
+        height, width = frame.shape[:2]
+        frames.append(frame)
+        labels.append(read_yolo_labels(os.path.join(split_dir, "labels", stem + ".txt"), width, height))
+
+    map50, map50_95 = detection_map(detector, frames, labels)
+    report = {
+        "profile": detector.profile_name,
+        "backend": detector.model.backend,
+        "imgsz": detector.imgsz,
+        "map50": round(map50, 4),
+        "map50_95": round(map50_95, 4),
+        "images": len(frames),
+    }
+
+    start = time.perf_counter()
+    for frame in frames:
+        detector.predict(frame)
+    elapsed = time.perf_counter() - start
+    report["fps"] = round(len(frames) / elapsed, 2) if elapsed else None
+
+    if detector.confirm_imgsz and frames:
+        full = [len(detector.model(f, conf=0.5, imgsz=detector.confirm_imgsz, verbose=False)[0].boxes) > 0 for f in frames]
+        coarse = [len(detector.model(f, conf=detector.candidate_conf, imgsz=detector.imgsz, verbose=False)[0].boxes) > 0 for f in frames]
+        positives = sum(full)
+        caught = sum(1 for f, c in zip(full, coarse) if f and c)
+        report["confirm_imgsz"] = detector.confirm_imgsz
+        report["candidate_rate"] = round(sum(coarse) / len(frames), 4)
+        report["candidate_recall"] = round(caught / positives, 4) if positives else 1.0
+
+    return report
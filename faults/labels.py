@@ -0,0 +1,242 @@
+import os
+import uuid
+import logging
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from .class_registry import get_classes
+from .inference import model_version
+from .models import DatasetImage, LabelSuggestion
+from .prelabel import IMAGE_EXTENSIONS, dataset_dirs
+
+logger = logging.getLogger(__name__)
+
+BOX_FIELDS = ("x_center", "y_center", "width", "height")
+MAX_BATCH = 500
+MAX_WINDOW = 20
+
+
+# ----------------------------------------
+# Validation
+# ----------------------------------------
+def validate_boxes(boxes, num_classes):
+    """Error messages for one image's boxes; empty if they are all valid."""
+    if not isinstance(boxes, list):
+        return ["boxes must be a list"]
+    errors = []
+    for i, box in enumerate(boxes):
+        if not isinstance(box, dict):
+            errors.append(f"box {i}: not an object")
+            continue
+        cls = box.get("cls")
+        if isinstance(cls, bool) or not isinstance(cls, int) or not 0 <= cls < num_classes:
+            errors.append(f"box {i}: unknown class {cls!r}")
+        for field in BOX_FIELDS:
+            value = box.get(field)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 1:
+                errors.append(f"box {i}: {field} must be between 0 and 1")
+    return errors
+
+
+def validate_batch(items, images_dir=None):
+    """
+    Check every item of a batch against the class registry and the dataset
+    before anything is written. Returns {image_name: [errors]} for the
+    invalid ones.
+    """
+    images_dir = images_dir or dataset_dirs()[0]
+    num_classes = len(get_classes())
+    errors = {}
+    for i, item in enumerate(items):
+        name = item.get("image_name") if isinstance(item, dict) else None
+        if not isinstance(name, str) or not name or os.path.basename(name) != name:
+            errors[f"#{i}"] = ["image_name must be a plain file name"]
+            continue
+        if not os.path.exists(os.path.join(images_dir, name)):
+            errors[name] = ["image not found in the dataset"]
+            continue
+        item_errors = validate_boxes(item.get("boxes"), num_classes)
+        if item_errors:
+            errors[name] = item_errors
+    return errors
+
+
+# ----------------------------------------
+# Writing
+# ----------------------------------------
+def label_path(image_name, labels_dir=None):
+    labels_dir = labels_dir or dataset_dirs()[1]
+    return os.path.join(labels_dir, os.path.splitext(image_name)[0] + ".txt")
+
+
+def write_label_file(path, boxes):
+    """Write a YOLO label file via a temp file + rename, so readers never see half of it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        for b in boxes:
+            f.write(f"{b['cls']} {b['x_center']} {b['y_center']} {b['width']} {b['height']}\n")
+    os.replace(tmp_path, path)
+
+
+def read_label_file(path):
+    """Boxes of a YOLO label file in the annotate UI's format."""
+    boxes = []
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            cls, xc, yc, w, h = map(float, line.split())
+            boxes.append({"cls": int(cls), "x_center": xc, "y_center": yc, "width": w, "height": h})
+    return boxes
+
+
+def _mtime(path):
+    return datetime.fromtimestamp(os.path.getmtime(path), tz=dt_timezone.utc)
+
+
+def _upsert(entries, update_fields):
+    """
+    Insert or update manifest rows by name in one statement. MySQL's ON
+    DUPLICATE KEY UPDATE keys on the unique index itself and rejects an
+    explicit conflict target, so unique_fields is only passed where the
+    backend takes one (SQLite, PostgreSQL).
+    """
+    options = {"update_conflicts": True, "update_fields": update_fields}
+    if connection.features.supports_update_conflicts_with_target:
+        options["unique_fields"] = ["name"]
+    DatasetImage.objects.bulk_create(entries, **options)
+
+
+def save_label_batch(items, labels_dir=None, images_dir=None):
+    """
+    Write the label files of an already validated batch and record them in
+    the DatasetImage manifest with one upsert. Returns the number saved.
+    """
+    default_images, default_labels = dataset_dirs()
+    images_dir, labels_dir = images_dir or default_images, labels_dir or default_labels
+    now = timezone.now()
+    entries = {}
+    for item in items:
+        name, boxes = item["image_name"], item["boxes"]
+        write_label_file(label_path(name, labels_dir), boxes)
+        image = os.path.join(images_dir, name)
+        # Last one wins if the same image appears twice, as on disk
+        entries[name] = DatasetImage(
+            name=name,
+            box_count=len(boxes),
+            classes=sorted({b["cls"] for b in boxes}),
+            boxes=boxes,
+            labelled_at=now,
+            added_at=_mtime(image) if os.path.exists(image) else now,
+        )
+
+    with transaction.atomic():
+        _upsert(list(entries.values()), ["box_count", "classes", "boxes", "labelled_at", "updated"])
+
+    logger.info("Label batch saved", extra={"images": len(entries)})
+    return len(entries)
+
+
+# ----------------------------------------
+# Manifest
+# ----------------------------------------
+def _manifest_entry(name, images_dir, labels_dir):
+    path = label_path(name, labels_dir)
+    boxes, labelled_at = [], None
+    if os.path.exists(path):
+        boxes, labelled_at = read_label_file(path), _mtime(path)
+    return DatasetImage(
+        name=name,
+        box_count=len(boxes),
+        classes=sorted({b["cls"] for b in boxes}),
+        boxes=boxes,
+        labelled_at=labelled_at,
+        added_at=_mtime(os.path.join(images_dir, name)),
+    )
+
+
+def register_images(names, images_dir=None, labels_dir=None):
+    """Add or refresh manifest rows for images just copied into the dataset."""
+    default_images, default_labels = dataset_dirs()
+    images_dir, labels_dir = images_dir or default_images, labels_dir or default_labels
+    entries = [
+        _manifest_entry(name, images_dir, labels_dir)
+        for name in dict.fromkeys(names)
+        if os.path.exists(os.path.join(images_dir, name))
+    ]
+    _upsert(entries, ["box_count", "classes", "boxes", "labelled_at", "added_at", "updated"])
+    return len(entries)
+
+
+def sync_manifest(images_dir=None, labels_dir=None):
+    """
+    Reconcile the manifest with the images directory: one listing plus one
+    query when nothing changed. Catches images added or removed outside
+    the app. Returns (added, removed).
+    """
+    default_images, default_labels = dataset_dirs()
+    images_dir, labels_dir = images_dir or default_images, labels_dir or default_labels
+    on_disk = set()
+    if os.path.isdir(images_dir):
+        on_disk = {n for n in os.listdir(images_dir) if n.lower().endswith(IMAGE_EXTENSIONS)}
+    known = set(DatasetImage.objects.values_list("name", flat=True))
+
+    added = on_disk - known
+    removed = known - on_disk
+    if added:
+        register_images(sorted(added), images_dir, labels_dir)
+    if removed:
+        DatasetImage.objects.filter(name__in=removed).delete()
+    if added or removed:
+        logger.info("Dataset manifest synced", extra={"added": len(added), "removed": len(removed)})
+    return len(added), len(removed)
+
+
+def dataset_version():
+    """Changes whenever an image is added, removed or relabelled."""
+    stats = DatasetImage.objects.aggregate(count=Count("id"), updated=Max("updated"))
+    updated = stats["updated"].timestamp() if stats["updated"] else 0
+    return f"{stats['count']}:{updated:.6f}"
+
+
+# ----------------------------------------
+# Annotation window
+# ----------------------------------------
+def annotation_window(start, size):
+    """
+    Manifest entries start..start+size-1 in annotate order, as the annotate
+    UI consumes them. Unlabelled images carry the current model's
+    suggested boxes, if any.
+    """
+    size = max(1, min(size, MAX_WINDOW))
+    rows = list(DatasetImage.objects.order_by("-added_at", "name")[start:start + size])
+
+    suggestions = {}
+    unlabelled = [row.name for row in rows if row.labelled_at is None]
+    if unlabelled:
+        try:
+            version = model_version()
+        except OSError:
+            version = None
+        if version:
+            for name, boxes in (
+                LabelSuggestion.objects.filter(image_name__in=unlabelled, model_version=version)
+                .order_by("created").values_list("image_name", "boxes")
+            ):
+                suggestions[name] = boxes
+
+    window = []
+    for offset, row in enumerate(rows):
+        suggested = row.labelled_at is None and bool(suggestions.get(row.name))
+        window.append({
+            "idx": start + offset,
+            "name": row.name,
+            "url": settings.DATASET_URL + f"train/images/{row.name}",
+            "boxes": suggestions[row.name] if suggested else row.boxes,
+            "suggested": suggested,
+            "labelled": row.labelled_at is not None,
+        })
+    return window
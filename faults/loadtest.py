@@ -0,0 +1,256 @@
+import os
+import time
+import random
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from .benchmarks import DEFECT_COLOR
+from .confirm import link_or_copy
+from .models import Detection, FaultRecord, TaskStatus
+
+# Seeded faults live under MEDIA_ROOT/<SEED_DIR>/ and are recognised by it
+SEED_DIR = "loadtest"
+STATUS_WEIGHTS = (("pending", 0.7), ("assigned", 0.2), ("resolved", 0.1))
+SEED_BATCH = 1000
+
+
+# ----------------------------------------
+# Seeding
+# ----------------------------------------
+def make_fault_image(path, rng, width=320, height=240):
+    """A small rail-like frame with a red "defect" square."""
+    frame = rng.integers(60, 110, size=(height, width, 3), dtype=np.uint8)
+    for x in (width // 3, 2 * width // 3):
+        cv2.rectangle(frame, (x - 4, 0), (x + 4, height), (170, 170, 170), -1)
+    x, y = int(rng.integers(0, width - 30)), int(rng.integers(height // 2, height - 30))
+    cv2.rectangle(frame, (x, y), (x + 24, y + 24), DEFECT_COLOR, -1)
+    cv2.imwrite(path, frame)
+    return (x, y, x + 24, y + 24)
+
+
+def seeded_count():
+    return FaultRecord.objects.filter(image__startswith=f"{SEED_DIR}/").count()
+
+
+def clear_seed():
+    """Remove seeded faults (their tasks and detections cascade) and their frames."""
+    FaultRecord.objects.filter(image__startswith=f"{SEED_DIR}/").delete()
+    TaskStatus.objects.filter(task_id__startswith="load-").delete()
+    directory = os.path.join(settings.MEDIA_ROOT, SEED_DIR)
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+
+
+def seed_faults(count, images=50, classes=4, seed=0, progress=None):
+    """
+    Insert `count` synthetic faults with a task and a detection each, in
+    bulk. Their frames are hard links to `images` distinct JPEGs, so
+    100k faults cost 100k inodes, not 100k encodes. Deterministic for a
+    given seed. Rows are read back by image name rather than relying on
+    bulk_create returning ids (MySQL doesn't).
+    """
+    rng = np.random.default_rng(seed)
+    directory = os.path.join(settings.MEDIA_ROOT, SEED_DIR)
+    os.makedirs(directory, exist_ok=True)
+    sources = []
+    for i in range(images):
+        path = os.path.join(directory, f"source_{i}.jpg")
+        sources.append((path, make_fault_image(path, rng)))
+
+    statuses, weights = zip(*STATUS_WEIGHTS)
+    for start in range(0, count, SEED_BATCH):
+        batch = range(start, min(start + SEED_BATCH, count))
+        records = []
+        boxes = {}
+        for n in batch:
+            source, box = sources[n % images]
+            name = f"{SEED_DIR}/fault_{n}.jpg"
+            link_or_copy(source, os.path.join(settings.MEDIA_ROOT, name))
+            boxes[name] = box
+            records.append(FaultRecord(
+                image=name,
+                fault_name=f"class_{n % classes}",
+                class_index=n % classes,
+                status=str(rng.choice(statuses, p=weights)),
+                frame_index=n,
+            ))
+
+        with transaction.atomic():
+            # bulk_create skips the signal that creates each fault's task
+            FaultRecord.objects.bulk_create(records)
+            saved = list(FaultRecord.objects.filter(image__in=list(boxes)).values_list("id", "image", "status", "class_index"))
+            TaskStatus.objects.bulk_create([
+                TaskStatus(fault_id=pk, task_id=f"load-{pk}", name=f"Fault #{pk}", status=status)
+                for pk, _, status, _ in saved
+            ])
+            Detection.objects.bulk_create([
+                Detection(
+                    fault_id=pk, frame_index=0, class_index=cls, confidence=round(float(rng.uniform(0.5, 1)), 3),
+                    x1=boxes[image][0], y1=boxes[image][1], x2=boxes[image][2], y2=boxes[image][3],
+                    model_version="loadtest",
+                )
+                for pk, image, _, cls in saved
+            ])
+        if progress:
+            progress(batch.stop, count)
+    return count
+
+
+# ----------------------------------------
+# Scenarios
+# ----------------------------------------
+def _fault_ids():
+    return list(FaultRecord.objects.filter(confirmed=False).values_list("id", flat=True)[:1000])
+
+
+def scenarios(total_faults):
+    """
+    name -> request(client, rng). Page numbers are drawn across the whole
+    seeded range, so a run doesn't only ever read page 1.
+    """
+    fault_pages = max(1, total_faults // 20)
+    task_pages = max(1, total_faults // 10)
+    fault_ids = _fault_ids()
+
+    def confirm(client, rng):
+        pk = rng.choice(fault_ids) if fault_ids else 0
+        return client.post(
+            reverse("faults:confirm_fault", args=[pk]), {"action": "yes"}, content_type="application/json",
+        )
+
+    return {
+        "dashboard": lambda client, rng: client.get(
+            reverse("faults:dashboard"), {"fault_page": rng.randint(1, fault_pages)},
+        ),
+        "task_status": lambda client, rng: client.get(
+            reverse("faults:task_status"), {"task_page": rng.randint(1, task_pages)},
+        ),
+        "fault_list": lambda client, rng: client.get(reverse("faults:fault_list")),
+        "fault_list_filtered": lambda client, rng: client.get(
+            reverse("faults:fault_list"), {"class_index": rng.randint(0, 3), "min_confidence": 0.9},
+        ),
+        "confirm_fault": confirm,
+    }
+
+
+@contextmanager
+def queue_only():
+    """
+    Send Celery jobs to an in-memory broker nobody consumes, so
+    confirm_fault is measured as the web tier sees it (validate, queue,
+    202) without moving the seeded faults into the dataset.
+    """
+    from railway_faults.celery import app
+
+    def configure(values):
+        # Set under both names: the app reads its config from the CELERY_ settings
+        app.conf.update({**values, **{f"CELERY_{key.upper()}": value for key, value in values.items()}})
+        # Drop pooled connections to the previous broker
+        app._pool = None
+        app.amqp._producer_pool = None
+
+    saved = {key: app.conf[key] for key in ("task_always_eager", "broker_url", "result_backend")}
+    configure({"task_always_eager": False, "broker_url": "memory://", "result_backend": "cache+memory://"})
+    try:
+        yield
+    finally:
+        configure(saved)
+
+
+# ----------------------------------------
+# Driver
+# ----------------------------------------
+class QueryCounter:
+    """Counts the statements run on the current thread's connection."""
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def run_scenario(request, requests=200, concurrency=8, warmup=5, seed=0):
+    """
+    Send `requests` requests from `concurrency` threads, each with its own
+    test Client and DB connection. Returns latency percentiles (ms),
+    statements per request, error count and throughput.
+    """
+    local = threading.local()
+    samples = []
+    lock = threading.Lock()
+
+    def one(n):
+        if not hasattr(local, "client"):
+            local.client = Client()
+        # Seeded per request, so a rerun asks for the same pages
+        rng = random.Random(seed * 1000003 + n)
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = request(local.client, rng)
+        elapsed = time.perf_counter() - start
+        with lock:
+            samples.append((elapsed, counter.queries, response.status_code))
+
+    barrier = threading.Barrier(concurrency)
+
+    def close(_):
+        # Every worker waits here, so each closes its own connection
+        barrier.wait()
+        connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(-warmup, 0)))
+        samples.clear()
+        start = time.perf_counter()
+        list(pool.map(one, range(requests)))
+        wall = time.perf_counter() - start
+        list(pool.map(close, range(concurrency)))
+
+    latencies = [s[0] * 1000 for s in samples]
+    queries = [s[1] for s in samples]
+    return {
+        "requests": len(samples),
+        "concurrency": concurrency,
+        "errors": sum(1 for s in samples if s[2] >= 400),
+        "status_codes": dict(Counter(s[2] for s in samples)),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+        "queries_mean": round(sum(queries) / len(queries), 1),
+        "queries_max": max(queries),
+        "throughput_rps": round(len(samples) / wall, 1) if wall else None,
+    }
+
+
+def run_load_test(names=None, requests=200, concurrency=8, use_cache=True, seed=0):
+    """Run the named scenarios (all by default) against the current data; {name: stats}."""
+    from django.core.cache import cache
+    available = scenarios(seeded_count())
+    unknown = set(names or ()) - set(available)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = {}
+    with override_settings(VIEW_CACHE={**settings.VIEW_CACHE, "enabled": use_cache}), queue_only():
+        for name in names or available:
+            cache.clear()
+            results[name] = run_scenario(available[name], requests, concurrency, seed=seed)
+    return results
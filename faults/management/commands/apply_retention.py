@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from faults.retention import apply_retention
+
+
+class Command(BaseCommand):
+    help = "Archive faults (with their tasks) and videos past their RETENTION policy (what the scheduled job runs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-batches", type=int, help="Batches per policy (default: RETENTION['max_batches'])")
+
+    def handle(self, *args, **options):
+        policy = dict(settings.RETENTION)
+        if options["max_batches"]:
+            policy["max_batches"] = options["max_batches"]
+        stats = apply_retention(policy)
+        for name, count in stats.items():
+            self.stdout.write(f"{name}: {count} archived")
@@ -0,0 +1,114 @@
+import time
+import asyncio
+import threading
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+from faults.benchmarks import QueryDelay, asgi_get, git_revision, save_result
+from faults.loadtest import clear_seed, percentile, seed_faults, seeded_count
+
+# (endpoint, query string, sync route, async route)
+ENDPOINTS = (
+    ("stats", "", "faults:fault_stats", "faults:fault_stats_async"),
+    ("tasks", "", "faults:task_list", "faults:task_list_async"),
+    ("faults", "class_index=1&min_confidence=0.95", "faults:fault_list", "faults:fault_list_async"),
+)
+
+
+async def drive(app, path, query_string, concurrency, requests):
+    """`requests` GETs with at most `concurrency` in flight; latencies, statuses, wall time, peak threads."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], []
+    peak_threads = threading.active_count()
+    done = asyncio.Event()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while not done.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.005)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            statuses.append(await asgi_get(app, path, query_string))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    sampler = asyncio.ensure_future(sample_threads())
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    wall = time.perf_counter() - start
+    done.set()
+    await sampler
+    return latencies, statuses, wall, peak_threads
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync and async (ASGI) list/stats APIs at increasing concurrency, "
+        "through Django's ASGI handler in-process. Run with "
+        "--settings=railway_faults.settings_bench to use SQLite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--faults", type=int, default=2000, help="Seeded faults (see load_test)")
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint, mode and level")
+        parser.add_argument("--query-delay-ms", type=float, default=2.0, help="Added to every SQL statement, as a networked MySQL would")
+        parser.add_argument("--cache", action="store_true", help="Keep the view cache on (off so every request reads the DB)")
+        parser.add_argument("--endpoint", action="append", dest="endpoints", help="Only this endpoint (stats, tasks, faults)")
+        parser.add_argument("--name", default="async_views", help="Result file prefix")
+
+    def handle(self, *args, **options):
+        if settings.DATABASES["default"]["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("Refusing to seed a non-SQLite DB; use --settings=railway_faults.settings_bench")
+
+        call_command("migrate", verbosity=0, interactive=False)
+        if seeded_count() != options["faults"]:
+            clear_seed()
+            self.stdout.write(f"Seeding {options['faults']} faults…")
+            seed_faults(options["faults"])
+
+        endpoints = [e for e in ENDPOINTS if not options["endpoints"] or e[0] in options["endpoints"]]
+        if not endpoints:
+            raise CommandError("Unknown endpoint; choose from " + ", ".join(e[0] for e in ENDPOINTS))
+
+        app = ASGIHandler()
+        results = {}
+        cache_options = {**settings.VIEW_CACHE, "enabled": options["cache"]}
+        with override_settings(VIEW_CACHE=cache_options), QueryDelay(options["query_delay_ms"]):
+            for name, query_string, sync_route, async_route in endpoints:
+                for mode, route in (("sync", sync_route), ("async", async_route)):
+                    path = reverse(route)
+                    asyncio.run(drive(app, path, query_string, 1, 3))  # warm up
+                    for concurrency in options["concurrency"]:
+                        latencies, statuses, wall, peak_threads = asyncio.run(
+                            drive(app, path, query_string, concurrency, options["requests"])
+                        )
+                        stats = {
+                            "p50_ms": round(percentile(latencies, 50), 2),
+                            "p95_ms": round(percentile(latencies, 95), 2),
+                            "p99_ms": round(percentile(latencies, 99), 2),
+                            "throughput_rps": round(len(latencies) / wall, 1),
+                            "errors": sum(1 for s in statuses if s is None or s >= 400),
+                            "peak_threads": peak_threads,
+                        }
+                        results.setdefault(name, {}).setdefault(mode, {})[str(concurrency)] = stats
+                        self.stdout.write(
+                            f"{name:<7} {mode:<5} c={concurrency:<4} {stats['throughput_rps']:>8} req/s "
+                            f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms "
+                            f"threads={peak_threads} errors={stats['errors']}"
+                        )
+
+        result = {
+            "revision": git_revision(),
+            "faults": seeded_count(),
+            "query_delay_ms": options["query_delay_ms"],
+            "view_cache": options["cache"],
+            "endpoints": results,
+        }
+        path = save_result(options["name"], result)
+        self.stdout.write(f"Result written to {path}")
@@ -0,0 +1,88 @@
+import time
+import json
+import statistics
+import cv2
+from django.core.management.base import BaseCommand, CommandError
+from faults.inference import available_backends, load_detection_model
+
+
+def read_frames(video_path, limit):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    try:
+        while len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+    finally:
+        cap.release()
+    return frames
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Compare latency and throughput of every available inference backend on the same clips."
+
+    def add_arguments(self, parser):
+        parser.add_argument("videos", nargs="+", help="Video clips to run every backend on")
+        parser.add_argument("--frames", type=int, default=200, help="Frames read from each clip")
+        parser.add_argument("--batch", type=int, default=8, help="Batch size for the throughput run")
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+
+    def handle(self, *args, **options):
+        frames = []
+        for video in options["videos"]:
+            frames += read_frames(video, options["frames"])
+        if not frames:
+            raise CommandError("No frames could be read from the given clips")
+
+        results = {}
+        for backend in available_backends():
+            model = load_detection_model(backend)
+
+            for frame in frames[:options["warmup"]]:
+                model(frame, conf=0.5, iou=0.5, verbose=False)
+
+            # Latency: one frame per call
+            latencies = []
+            detections = 0
+            for frame in frames:
+                start = time.perf_counter()
+                result = model(frame, conf=0.5, iou=0.5, verbose=False)
+                latencies.append((time.perf_counter() - start) * 1000)
+                detections += len(result[0].boxes)
+
+            # Throughput: batched calls
+            batch = options["batch"]
+            start = time.perf_counter()
+            for i in range(0, len(frames), batch):
+                model(frames[i:i + batch], conf=0.5, iou=0.5, verbose=False)
+            throughput = len(frames) / (time.perf_counter() - start)
+
+            results[backend] = {
+                "frames": len(frames),
+                "detections": detections,
+                "latency_ms_p50": round(statistics.median(latencies), 2),
+                "latency_ms_p95": round(percentile(latencies, 95), 2),
+                "latency_fps": round(1000 / statistics.mean(latencies), 2),
+                "throughput_fps": round(throughput, 2),
+            }
+
+            self.stdout.write(
+                f"{backend:<10} p50={results[backend]['latency_ms_p50']}ms "
+                f"p95={results[backend]['latency_ms_p95']}ms "
+                f"fps={results[backend]['latency_fps']} "
+                f"batched_fps={results[backend]['throughput_fps']} "
+                f"detections={detections}"
+            )
+
+        if options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump(results, f, indent=2)
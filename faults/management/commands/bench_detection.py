@@ -0,0 +1,101 @@
+import os
+import time
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from faults.benchmarks import (
+    StubDetector, WriteCounter, RssSampler, make_synthetic_video,
+    git_revision, save_result, previous_result,
+)
+from faults.timing import StageTimer
+
+COMPARED_KEYS = ("fps", "peak_rss_mb", "db_writes_per_frame")
+
+
+class Command(BaseCommand):
+    help = (
+        "End-to-end benchmark of run_fault_detection on a synthetic video. "
+        "Run with --settings=railway_faults.settings_bench to use SQLite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--frames", type=int, default=300)
+        parser.add_argument("--width", type=int, default=1280)
+        parser.add_argument("--height", type=int, default=720)
+        parser.add_argument("--fault-every", type=int, default=10, help="Draw a defect every N frames")
+        parser.add_argument("--video", help="Use this video instead of generating one")
+        parser.add_argument("--stub", action="store_true", help="Use the deterministic stub model instead of real weights")
+        parser.add_argument("--stub-ms", type=float, default=0.0, help="Simulated stub inference time per frame")
+        parser.add_argument("--profile", help="Inference profile for real weights")
+        parser.add_argument("--camera", help="Camera ROI configuration")
+        parser.add_argument("--workers", type=int, default=1, help="Detect the video in N parallel segment processes")
+        parser.add_argument("--cache", action="store_true", help="Allow the detection result cache (off so every run measures inference)")
+        parser.add_argument("--name", default="detection", help="Result file prefix")
+
+    def handle(self, *args, **options):
+        if settings.DATABASES["default"]["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("Refusing to benchmark against a non-SQLite DB; use --settings=railway_faults.settings_bench")
+
+        call_command("migrate", verbosity=0, interactive=False)
+
+        # Imported here: the module loads Django models and the save pipeline
+        from faults.detect_faults import run_fault_detection
+        from faults.models import FaultRecord
+
+        video = options["video"]
+        if not video:
+            video = os.path.join(settings.BENCH_DIR, f"synthetic_{options['width']}x{options['height']}_{options['frames']}.mp4")
+            if not os.path.exists(video):
+                self.stdout.write(f"Generating {video}…")
+                make_synthetic_video(
+                    video, options["frames"], options["width"], options["height"],
+                    fault_every=options["fault_every"],
+                )
+
+        detector = StubDetector(options["stub_ms"]) if options["stub"] else None
+        timer = StageTimer()
+        faults_before = FaultRecord.objects.count()
+
+        with WriteCounter() as writes, RssSampler() as rss:
+            start = time.perf_counter()
+            summary = run_fault_detection(
+                video, profile=options["profile"], camera=options["camera"],
+                detector=detector, timer=timer, resume=False, workers=options["workers"],
+                use_cache=options["cache"],
+            )
+            elapsed = time.perf_counter() - start
+
+        frames = summary["frames"] or 1
+        result = {
+            "revision": git_revision(),
+            "video": os.path.basename(video),
+            "resolution": [options["width"], options["height"]],
+            "model": "stub" if options["stub"] else (options["profile"] or settings.DEFAULT_INFERENCE_PROFILE),
+            "workers": options["workers"],
+            "frames": summary["frames"],
+            "faults_saved": FaultRecord.objects.count() - faults_before,
+            "elapsed_s": round(elapsed, 3),
+            "fps": round(summary["frames"] / elapsed, 2) if elapsed else None,
+            "stages": timer.summary(),
+            "start_rss_mb": round(rss.start_rss / 2**20, 1),
+            "peak_rss_mb": round(rss.peak_rss / 2**20, 1),
+            "db_writes": writes.writes,
+            "db_writes_per_frame": round(writes.writes / frames, 4),
+            "save_queue": summary["save_queue"],
+        }
+
+        path = save_result(options["name"], result)
+        self.stdout.write(
+            f"{result['frames']} frames in {result['elapsed_s']}s → {result['fps']} fps | "
+            f"peak RSS {result['peak_rss_mb']} MB | {result['db_writes_per_frame']} DB writes/frame"
+        )
+        for stage, stats in result["stages"].items():
+            self.stdout.write(f"  {stage:<11} n={stats['count']:<6} p50={stats['p50_ms']}ms p90={stats['p90_ms']}ms p99={stats['p99_ms']}ms")
+
+        previous = previous_result(options["name"], exclude=path)
+        if previous:
+            self.stdout.write(f"Compared with {previous['revision']}:")
+            for key in COMPARED_KEYS:
+                self.stdout.write(f"  {key}: {previous.get(key)} → {result.get(key)}")
+
+        self.stdout.write(f"Result written to {path}")
@@ -0,0 +1,39 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from faults.curation import write_curated_dataset
+from faults.train_cache import sync_training_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Prune near-duplicate training images as the next training run will, "
+        "and print how much was pruned per class."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-per-cluster", type=int, default=settings.TRAINING_CURATION["max_per_cluster"])
+        parser.add_argument("--hamming", type=int, default=settings.TRAINING_CURATION["hamming_threshold"])
+        parser.add_argument("--max-per-class", type=int, default=settings.TRAINING_CURATION["max_per_class"])
+
+    def handle(self, *args, **options):
+        data_yaml = os.path.join(settings.DATASET_ROOT, "data.yaml")
+        if settings.TRAINING_IMAGE_CACHE.get("enabled"):
+            data_yaml, _ = sync_training_cache(data_yaml=data_yaml)
+
+        curated_yaml, report = write_curated_dataset(data_yaml, {
+            "max_per_cluster": options["max_per_cluster"],
+            "hamming_threshold": options["hamming"],
+            "max_per_class": options["max_per_class"],
+        })
+
+        for cls, stats in report["classes"].items():
+            name = "background" if cls == "-1" else f"class {cls}"
+            self.stdout.write(
+                f"{name:<12} {stats['images']:>6} images  {stats['clusters']:>5} clusters  "
+                f"kept {stats['kept']:>5}  pruned {stats['pruned']:>5}"
+            )
+        self.stdout.write(
+            f"Kept {report['kept_images']} of {report['total_images']} images "
+            f"({report['pruned_ratio']:.0%} pruned) → {curated_yaml}"
+        )
@@ -0,0 +1,40 @@
+import os
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from faults.inference import DATA_YAML, evaluate_profile
+
+
+class Command(BaseCommand):
+    help = "Report mAP and frames/sec for each inference profile against the labelled dataset."
+
+    def add_arguments(self, parser):
+        parser.add_argument("profiles", nargs="*", help="Profiles to evaluate (default: all)")
+        parser.add_argument("--data", default=DATA_YAML, help="Dataset yaml to validate on")
+        parser.add_argument("--split", default="val")
+        parser.add_argument("--max-images", type=int, default=200, help="Images evaluated and timed")
+        parser.add_argument(
+            "--output",
+            default=os.path.join(settings.BASE_DIR, "faults", "runs", "profile_report.json"),
+        )
+
+    def handle(self, *args, **options):
+        profiles = options["profiles"] or list(settings.INFERENCE_PROFILES)
+        reports = []
+
+        for profile in profiles:
+            report = evaluate_profile(profile, options["data"], options["split"], options["max_images"])
+            reports.append(report)
+
+            line = (
+                f"{report['profile']:<10} backend={report['backend']:<9} imgsz={report['imgsz']:<4} "
+                f"mAP50={report['map50']:.3f} mAP50-95={report['map50_95']:.3f} fps={report['fps']}"
+            )
+            if "candidate_recall" in report:
+                line += f" candidate_rate={report['candidate_rate']} candidate_recall={report['candidate_recall']}"
+            self.stdout.write(line)
+
+        os.makedirs(os.path.dirname(options["output"]), exist_ok=True)
+        with open(options["output"], "w") as f:
+            json.dump(reports, f, indent=2)
+        self.stdout.write(f"Report written to {options['output']}")
@@ -0,0 +1,80 @@
+import time
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from faults.benchmarks import git_revision, save_result, previous_result
+from faults.loadtest import clear_seed, run_load_test, seed_faults, seeded_count
+
+COMPARED_KEYS = ("p95_ms", "queries_mean", "throughput_rps")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic faults and drive the dashboard, task_status, fault list and "
+        "confirm_fault views with concurrent clients. Run with "
+        "--settings=railway_faults.settings_bench to use SQLite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--faults", type=int, default=10000, help="Seeded faults to test against")
+        parser.add_argument("--images", type=int, default=50, help="Distinct JPEGs the seeded faults link to")
+        parser.add_argument("--reseed", action="store_true", help="Drop and reseed even if the count matches")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+        parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+        parser.add_argument("--scenario", action="append", dest="scenarios", help="Only this scenario (repeatable)")
+        parser.add_argument("--no-cache", action="store_true", help="Disable the view cache for the run")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--name", default="load", help="Result file prefix")
+
+    def handle(self, *args, **options):
+        if settings.DATABASES["default"]["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("Refusing to seed a non-SQLite DB; use --settings=railway_faults.settings_bench")
+
+        call_command("migrate", verbosity=0, interactive=False)
+
+        # The same seed is reused across runs so results stay comparable
+        if options["reseed"] or seeded_count() != options["faults"]:
+            clear_seed()
+            self.stdout.write(f"Seeding {options['faults']} faults…")
+            start = time.perf_counter()
+            seed_faults(
+                options["faults"], images=options["images"], seed=options["seed"],
+                progress=lambda done, total: self.stdout.write(f"  {done}/{total}") if done % 10000 == 0 else None,
+            )
+            self.stdout.write(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+        try:
+            scenarios = run_load_test(
+                options["scenarios"], requests=options["requests"], concurrency=options["concurrency"],
+                use_cache=not options["no_cache"], seed=options["seed"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        result = {
+            "revision": git_revision(),
+            "faults": seeded_count(),
+            "concurrency": options["concurrency"],
+            "view_cache": not options["no_cache"],
+            "scenarios": scenarios,
+        }
+        path = save_result(options["name"], result)
+
+        self.stdout.write(f"{result['faults']} faults, {options['concurrency']} clients, view cache {'on' if result['view_cache'] else 'off'}")
+        for name, stats in scenarios.items():
+            self.stdout.write(
+                f"  {name:<20} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms "
+                f"queries={stats['queries_mean']} (max {stats['queries_max']}) "
+                f"{stats['throughput_rps']} req/s errors={stats['errors']}"
+            )
+
+        previous = previous_result(options["name"], exclude=path)
+        if previous:
+            self.stdout.write(f"Compared with {previous['revision']} ({previous.get('faults')} faults):")
+            for name, stats in scenarios.items():
+                before = previous.get("scenarios", {}).get(name)
+                if before:
+                    changes = ", ".join(f"{key}: {before.get(key)} → {stats.get(key)}" for key in COMPARED_KEYS)
+                    self.stdout.write(f"  {name:<20} {changes}")
+
+        self.stdout.write(f"Result written to {path}")
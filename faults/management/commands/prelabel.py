@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from faults.prelabel import prelabel_images, unlabeled_images
+
+
+class Command(BaseCommand):
+    help = "Predict boxes for unlabeled dataset images so the annotate page can suggest them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("images", nargs="*", help="Image file names in dataset/train/images (default: all unlabeled)")
+        parser.add_argument("--batch-size", type=int, default=16)
+        parser.add_argument("--async", dest="run_async", action="store_true", help="Queue the job on Celery instead")
+
+    def handle(self, *args, **options):
+        names = options["images"] or unlabeled_images()
+        if options["run_async"]:
+            from faults.tasks import prelabel_dataset_images
+            prelabel_dataset_images.delay(names)
+            self.stdout.write(f"Queued pre-labelling of {len(names)} images")
+            return
+
+        created = prelabel_images(names, batch_size=options["batch_size"])
+        self.stdout.write(f"{created} new suggestions for {len(names)} unlabeled images")
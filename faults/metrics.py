@@ -0,0 +1,94 @@
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    Counter, Gauge, Histogram, CollectorRegistry, REGISTRY,
+    generate_latest, CONTENT_TYPE_LATEST,
+)
+from prometheus_client import multiprocess
+from django.http import HttpResponse
+
+# ----------------------------------------
+# Metrics
+# ----------------------------------------
+# With PROMETHEUS_MULTIPROC_DIR set (see settings), every process — web,
+# Celery workers, detection scripts — writes its samples to files in that
+# directory and /metrics aggregates them. Gauges therefore need a
+# multiprocess_mode saying how per-process values are combined.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600, 7200)
+
+INFERENCE_LATENCY = Histogram(
+    "faults_inference_seconds", "Model inference time per batch",
+    ["profile"], buckets=LATENCY_BUCKETS,
+)
+DECODE_FPS = Gauge(
+    "faults_detection_fps", "Frames decoded and processed per second by running detection jobs",
+    multiprocess_mode="livesum",
+)
+FRAMES_PROCESSED = Counter("faults_frames_processed_total", "Video frames run through detection")
+SAVE_QUEUE_DEPTH = Gauge(
+    "faults_save_queue_depth", "Fault images waiting to be written",
+    multiprocess_mode="livesum",
+)
+SAVE_QUEUE_BYTES = Gauge(
+    "faults_save_queue_bytes", "Encoded image bytes held by the save queue",
+    multiprocess_mode="livesum",
+)
+SAVE_QUEUE_DROPPED = Counter("faults_save_queue_dropped_total", "Fault images dropped by the save queue policy")
+FAULTS_SAVED = Counter("faults_saved_total", "Fault records written by detection")
+NOTIFICATION_LATENCY = Histogram(
+    "faults_notification_seconds", "Time to send a fault notification",
+    ["channel"], buckets=LATENCY_BUCKETS,
+)
+TRAINING_DURATION = Histogram(
+    "faults_training_seconds", "Duration of a YOLO training run",
+    ["outcome"], buckets=SLOW_BUCKETS,
+)
+TRAINING_EPOCH_SECONDS = Histogram(
+    "faults_training_epoch_seconds", "Duration of one training epoch, with and without the image cache",
+    ["image_cache"], buckets=SLOW_BUCKETS,
+)
+CONFIRM_SCAN_SECONDS = Histogram(
+    "faults_confirm_scan_seconds", "Duplicate scan time in confirm_fault",
+    buckets=LATENCY_BUCKETS,
+)
+DASHBOARD_QUERY_SECONDS = Histogram(
+    "faults_dashboard_query_seconds", "Time to build the dashboard data",
+    ["view"], buckets=LATENCY_BUCKETS,
+)
+# Hit ratio: sum(rate(...{result=~"hit|wait"})) / sum(rate(...))
+VIEW_CACHE_REQUESTS = Counter(
+    "faults_view_cache_requests_total", "View cache lookups by outcome (hit, miss, wait, timeout, error)",
+    ["view", "result"],
+)
+
+
+@contextmanager
+def observe(histogram, **labels):
+    """Time a block into a histogram (with labels if given)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        target = histogram.labels(**labels) if labels else histogram
+        target.observe(time.perf_counter() - start)
+
+
+def mark_process_dead(pid):
+    """Drop an exited process's live gauges (gunicorn child_exit hook, Celery worker shutdown)."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+# ----------------------------------------
+# /metrics endpoint
+# ----------------------------------------
+def metrics_view(request):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
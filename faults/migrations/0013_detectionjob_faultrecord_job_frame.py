@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faults', '0012_remove_faultrecord_ready_for_training'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DetectionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_path', models.CharField(max_length=500)),
+                ('video_fingerprint', models.CharField(db_index=True, max_length=64)),
+                ('model_version', models.CharField(max_length=64)),
+                ('profile', models.CharField(blank=True, default='', max_length=50)),
+                ('camera', models.CharField(blank=True, default='', max_length=50)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('interrupted', 'Interrupted'), ('failed', 'Failed'), ('completed', 'Completed')], default='running', max_length=20)),
+                ('last_frame', models.IntegerField(default=-1)),
+                ('last_timestamp_ms', models.FloatField(blank=True, null=True)),
+                ('total_frames', models.IntegerField(blank=True, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-updated'],
+            },
+        ),
+        migrations.AddField(
+            model_name='faultrecord',
+            name='frame_index',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='faultrecord',
+            name='job',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='faults', to='faults.detectionjob'),
+        ),
+        migrations.AddConstraint(
+            model_name='faultrecord',
+            constraint=models.UniqueConstraint(fields=('job', 'frame_index'), name='unique_fault_per_job_frame'),
+        ),
+    ]
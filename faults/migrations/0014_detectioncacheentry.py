@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faults', '0013_detectionjob_faultrecord_job_frame'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DetectionCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('model_version', models.CharField(max_length=64)),
+                ('params_hash', models.CharField(max_length=40)),
+                ('names', models.JSONField(default=dict)),
+                ('path', models.CharField(max_length=500)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('frames', models.IntegerField(default=0)),
+                ('fault_frames', models.IntegerField(default=0)),
+                ('hits', models.IntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('last_used', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='detectioncacheentry',
+            constraint=models.UniqueConstraint(fields=('content_hash', 'model_version', 'params_hash'), name='unique_detection_cache_entry'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faults', '0014_detectioncacheentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='faultrecord',
+            name='class_index',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='Detection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frame_index', models.IntegerField(blank=True, null=True)),
+                ('class_index', models.IntegerField()),
+                ('confidence', models.FloatField()),
+                ('x1', models.FloatField()),
+                ('y1', models.FloatField()),
+                ('x2', models.FloatField()),
+                ('y2', models.FloatField()),
+                ('model_version', models.CharField(blank=True, db_index=True, default='', max_length=64)),
+                ('fault', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='detections', to='faults.faultrecord')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['class_index', 'confidence'], name='detection_class_conf_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faults', '0015_detection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabelSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_hash', models.CharField(max_length=40)),
+                ('model_version', models.CharField(max_length=64)),
+                ('image_name', models.CharField(db_index=True, max_length=255)),
+                ('boxes', models.JSONField(default=list)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='labelsuggestion',
+            constraint=models.UniqueConstraint(fields=('image_hash', 'model_version'), name='unique_label_suggestion'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faults', '0016_labelsuggestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaultClass',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField(unique=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['index'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faults', '0017_faultclass'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('box_count', models.PositiveIntegerField(default=0)),
+                ('classes', models.JSONField(default=list)),
+                ('labelled_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
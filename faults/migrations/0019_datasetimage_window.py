@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:42
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faults', '0018_datasetimage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasetimage',
+            name='added_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='datasetimage',
+            name='boxes',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='datasetimage',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='datasetimage',
+            name='labelled_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='datasetimage',
+            index=models.Index(fields=['-added_at', 'name'], name='dataset_image_order_idx'),
+        ),
+    ]
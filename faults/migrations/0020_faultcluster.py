@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faults', '0019_datasetimage_window'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='faultrecord',
+            name='phash',
+            field=models.CharField(blank=True, max_length=16, null=True),
+        ),
+        migrations.CreateModel(
+            name='FaultCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('class_index', models.IntegerField(blank=True, null=True)),
+                ('phash', models.CharField(max_length=16)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField(db_index=True)),
+                ('representative', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='faults.faultrecord')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='faultrecord',
+            name='cluster',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='members', to='faults.faultcluster'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faults', '0020_faultcluster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('faults', 'Faults'), ('tasks', 'Tasks'), ('videos', 'Videos')], max_length=20)),
+                ('path', models.CharField(max_length=500)),
+                ('items', models.IntegerField(default=0)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('oldest', models.DateTimeField(blank=True, null=True)),
+                ('newest', models.DateTimeField(blank=True, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FaultDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('class_index', models.IntegerField(blank=True, null=True)),
+                ('status', models.CharField(max_length=20)),
+                ('fault_name', models.CharField(blank=True, default='', max_length=255)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='faultrecord',
+            index=models.Index(fields=['status', 'timestamp'], name='fault_status_time_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='faultdailysummary',
+            constraint=models.UniqueConstraint(fields=('day', 'class_index', 'status'), name='unique_fault_daily_summary'),
+        ),
+    ]
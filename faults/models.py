@@ -1,3 +1,4 @@
+import os
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -12,7 +13,7 @@ class FaultRecord(models.Model):
     image = models.ImageField(upload_to="", blank=True, null=True)
 
     fault_name = models.CharField(max_length=255, blank=True, null=True)  # Fault type/name
-    class_index = models.IntegerField(blank=True, null=True)
+    class_index = models.IntegerField(blank=True, null=True, db_index=True)
 
     timestamp = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
@@ -23,6 +24,24 @@ class FaultRecord(models.Model):
     duplicate_images_removed = models.BooleanField(default=False)  # True if similar images removed
     sent_to_service = models.BooleanField(default=False)  # Alert sent via WhatsApp/Email
 
+    # Where the detector found it: (job, frame_index) is unique so a
+    # resumed job that replays frames cannot insert duplicates
+    job = models.ForeignKey("DetectionJob", on_delete=models.SET_NULL, null=True, blank=True, related_name="faults")
+    frame_index = models.IntegerField(blank=True, null=True)
+
+    # 64-bit perceptual hash of the frame (hex), and the near-duplicate
+    # cluster it was grouped into; see faults/clustering.py
+    phash = models.CharField(max_length=16, blank=True, null=True)
+    cluster = models.ForeignKey("FaultCluster", on_delete=models.SET_NULL, null=True, blank=True, related_name="members")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["job", "frame_index"], name="unique_fault_per_job_frame"),
+        ]
+        indexes = [
+            models.Index(fields=["status", "timestamp"], name="fault_status_time_idx"),  # retention sweeps
+        ]
+
     def __str__(self):
         return f"Fault #{self.id} - {self.status}"
 
@@ -41,3 +60,218 @@ class TaskStatus(models.Model):
 
     def __str__(self):
         return f"Task {self.task_id} for Fault #{self.fault.id if self.fault else 'N/A'} - {self.status}"
+
+
+class DetectionJob(models.Model):
+    """
+    Progress of one detection run over a video file. The detector
+    checkpoints last_frame periodically, so a restarted run over the same
+    file, model and settings continues from there instead of frame 0.
+    """
+    STATUS_CHOICES = [
+        ("running", "Running"),
+        ("interrupted", "Interrupted"),
+        ("failed", "Failed"),
+        ("completed", "Completed"),
+    ]
+
+    video_path = models.CharField(max_length=500)
+    video_fingerprint = models.CharField(max_length=64, db_index=True)  # path + size + mtime
+    model_version = models.CharField(max_length=64)
+    profile = models.CharField(max_length=50, blank=True, default="")
+    camera = models.CharField(max_length=50, blank=True, default="")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="running")
+    last_frame = models.IntegerField(default=-1)  # last frame whose faults are saved
+    last_timestamp_ms = models.FloatField(blank=True, null=True)
+    total_frames = models.IntegerField(blank=True, null=True)
+
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-updated"]
+
+    def __str__(self):
+        return f"Job #{self.id} {os.path.basename(self.video_path)} @ {self.last_frame} - {self.status}"
+
+
+class DetectionCacheEntry(models.Model):
+    """
+    Detections of one video file (by content hash) for one model version
+    and detection settings. The arrays live in an .npz file under
+    DETECTION_RESULT_CACHE["dir"]; see faults/result_cache.py.
+    """
+    content_hash = models.CharField(max_length=64, db_index=True)  # sha256 of the video bytes
+    model_version = models.CharField(max_length=64)
+    params_hash = models.CharField(max_length=40)  # profile, ROI and thresholds
+    names = models.JSONField(default=dict)  # class index -> name at detection time
+
+    path = models.CharField(max_length=500)
+    size_bytes = models.BigIntegerField(default=0)
+    frames = models.IntegerField(default=0)
+    fault_frames = models.IntegerField(default=0)
+    hits = models.IntegerField(default=0)
+
+    created = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_hash", "model_version", "params_hash"], name="unique_detection_cache_entry",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Cache {self.content_hash[:12]} @ {self.model_version} ({self.fault_frames} fault frames)"
+
+
+class Detection(models.Model):
+    """
+    One box the detector found in a fault's frame. Written in bulk with the
+    FaultRecord so class/confidence filtering and analytics are plain SQL.
+    Coordinates are pixels in the full (uncropped) frame.
+    """
+    fault = models.ForeignKey(FaultRecord, on_delete=models.CASCADE, related_name="detections")
+    frame_index = models.IntegerField(blank=True, null=True)
+    class_index = models.IntegerField()
+    confidence = models.FloatField()
+    x1 = models.FloatField()
+    y1 = models.FloatField()
+    x2 = models.FloatField()
+    y2 = models.FloatField()
+    model_version = models.CharField(max_length=64, blank=True, default="", db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["class_index", "confidence"], name="detection_class_conf_idx"),
+        ]
+
+    def __str__(self):
+        return f"Detection {self.class_index} ({self.confidence:.2f}) on fault #{self.fault_id}"
+
+
+class LabelSuggestion(models.Model):
+    """
+    Model predictions for one dataset image, offered in the annotate UI
+    until someone saves real labels. Keyed by image content and model
+    version so a retrained model suggests again and renamed files don't.
+    """
+    image_hash = models.CharField(max_length=40)  # sha1 of the image bytes
+    model_version = models.CharField(max_length=64)
+    image_name = models.CharField(max_length=255, db_index=True)
+    boxes = models.JSONField(default=list)  # [{"cls", "x_center", "y_center", "width", "height", "conf"}]
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["image_hash", "model_version"], name="unique_label_suggestion"),
+        ]
+
+    def __str__(self):
+        return f"{self.image_name} @ {self.model_version} ({len(self.boxes)} boxes)"
+
+
+class FaultClass(models.Model):
+    """
+    One entry of the class registry. `index` is the YOLO class id, so
+    classes are only ever appended. classes.txt and data.yaml are generated
+    from this table; see faults/class_registry.py.
+    """
+    index = models.PositiveIntegerField(unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["index"]
+
+    def __str__(self):
+        return f"{self.index}: {self.name}"
+
+
+class DatasetImage(models.Model):
+    """
+    Manifest of the training images, newest first in the annotate UI. Label
+    saves update it once per batch, so the UI and label counts read one
+    indexed table instead of listing directories and parsing label files.
+    labelled_at is null until the image has a label file; an empty label
+    file (background) has box_count 0.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    box_count = models.PositiveIntegerField(default=0)
+    classes = models.JSONField(default=list)  # distinct class indexes in the label file
+    boxes = models.JSONField(default=list)  # [{"cls", "x_center", "y_center", "width", "height"}]
+    labelled_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    added_at = models.DateTimeField()  # image mtime
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-added_at", "name"], name="dataset_image_order_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.box_count} boxes)"
+
+
+class FaultCluster(models.Model):
+    """
+    Unconfirmed faults of one class whose frames look alike (perceptual
+    hash) and were seen close together in time. The dashboard shows only
+    the representative, and the whole cluster is confirmed in one go.
+    """
+    representative = models.ForeignKey(
+        FaultRecord, on_delete=models.SET_NULL, null=True, blank=True, related_name="+",
+    )
+    class_index = models.IntegerField(blank=True, null=True)
+    phash = models.CharField(max_length=16)  # the representative's
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Cluster #{self.id} (class {self.class_index}, rep #{self.representative_id})"
+
+
+class ArchiveBatch(models.Model):
+    """
+    One compressed archive written by the retention job: the rows (as
+    JSON lines) and files it moved out of the hot tables and directories.
+    See faults/retention.py.
+    """
+    KIND_CHOICES = [
+        ("faults", "Faults"),
+        ("tasks", "Tasks"),
+        ("videos", "Videos"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    path = models.CharField(max_length=500)
+    items = models.IntegerField(default=0)
+    size_bytes = models.BigIntegerField(default=0)
+    oldest = models.DateTimeField(blank=True, null=True)
+    newest = models.DateTimeField(blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["-created"]
+
+    def __str__(self):
+        return f"{self.kind} archive {os.path.basename(self.path)} ({self.items} items)"
+
+
+class FaultDailySummary(models.Model):
+    """Per day, class and status counts of archived faults, so history survives compaction."""
+    day = models.DateField()
+    class_index = models.IntegerField(blank=True, null=True)
+    status = models.CharField(max_length=20)
+    fault_name = models.CharField(max_length=255, blank=True, default="")
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "class_index", "status"], name="unique_fault_daily_summary"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} class {self.class_index} {self.status}: {self.count}"
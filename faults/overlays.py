@@ -0,0 +1,94 @@
+import os
+import uuid
+import logging
+import cv2
+import numpy as np
+from django.conf import settings
+from .class_registry import get_classes
+
+logger = logging.getLogger(__name__)
+
+# Rendered overlays live next to the raw frames, one JPEG per fault
+OVERLAY_SUBDIR = ".overlays"
+JPEG_QUALITY = 90
+
+
+# ----------------------------------------
+# Drawing
+# ----------------------------------------
+def draw_bounding_boxes(frame, boxes, scores, classes, names):
+    """Draw all bounding boxes and labels of a frame in place, once."""
+    color = (0, 0, 255)
+    for (x1, y1, x2, y2), conf, cls in zip(boxes.astype(int).tolist(), scores.tolist(), classes.tolist()):
+        label = f"{names.get(cls, 'Unknown')} ({conf:.2f})"
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, label, (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return frame
+
+
+def class_names(fault):
+    """class index -> name, from the class registry plus the fault's own top class."""
+    names = dict(enumerate(get_classes()))
+    if fault.class_index is not None and fault.fault_name:
+        names[fault.class_index] = fault.fault_name
+    return names
+
+
+# ----------------------------------------
+# Cached overlays
+# ----------------------------------------
+def overlay_path(fault_id):
+    return os.path.join(settings.MEDIA_ROOT, OVERLAY_SUBDIR, f"{fault_id}.jpg")
+
+
+def render_overlay(fault):
+    """
+    Path of the fault's image with its detections drawn on, rendered on
+    first request and reused until the raw frame changes. Records without
+    Detection rows (saved before raw frames were kept) already have their
+    boxes burned in, so their image is returned as is. None if the image
+    is missing.
+    """
+    source = os.path.join(settings.MEDIA_ROOT, str(fault.image))
+    if not fault.image or not os.path.exists(source):
+        return None
+
+    detections = list(fault.detections.all())
+    if not detections:
+        return source
+
+    path = overlay_path(fault.id)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+        return path
+
+    frame = cv2.imread(source)
+    if frame is None:
+        logger.warning("Could not read fault image", extra={"fault_id": fault.id, "image": str(fault.image)})
+        return source
+
+    draw_bounding_boxes(
+        frame,
+        np.array([[d.x1, d.y1, d.x2, d.y2] for d in detections], dtype=np.float32),
+        np.array([d.confidence for d in detections], dtype=np.float32),
+        np.array([d.class_index for d in detections], dtype=np.int64),
+        class_names(fault),
+    )
+
+    # Write to a temp name first so concurrent requests never serve half a file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        return source
+    with open(tmp_path, "wb") as f:
+        f.write(encoded.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+def remove_overlay(fault_id):
+    try:
+        os.remove(overlay_path(fault_id))
+    except FileNotFoundError:
+        pass
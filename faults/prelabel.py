@@ -0,0 +1,112 @@
+import os
+import hashlib
+import logging
+import cv2
+from django.conf import settings
+from .inference import get_detector
+from .models import LabelSuggestion
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+# Lower than the detection threshold: a suggestion is cheap to delete, a missed box is not
+SUGGESTION_CONF = 0.25
+
+
+def dataset_dirs():
+    base = os.path.join(settings.DATASET_ROOT, "train")
+    return os.path.join(base, "images"), os.path.join(base, "labels")
+
+
+def labels_dir_for(images_dir):
+    """The labels/ directory YOLO pairs with an images/ directory."""
+    return os.path.join(os.path.dirname(os.path.normpath(images_dir)), "labels")
+
+
+def image_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def unlabeled_images(images_dir=None, labels_dir=None):
+    """Dataset images without a label file (an empty file means 'background')."""
+    images_dir = images_dir or dataset_dirs()[0]
+    labels_dir = labels_dir or labels_dir_for(images_dir)
+    if not os.path.isdir(images_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(images_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+        and not os.path.exists(os.path.join(labels_dir, os.path.splitext(name)[0] + ".txt"))
+    )
+
+
+def to_yolo_boxes(boxes, scores, classes, width, height):
+    """Pixel xyxy detections -> normalized YOLO boxes as the annotate UI expects them."""
+    return [
+        {
+            "cls": cls,
+            "x_center": (x1 + x2) / 2 / width,
+            "y_center": (y1 + y2) / 2 / height,
+            "width": (x2 - x1) / width,
+            "height": (y2 - y1) / height,
+            "conf": round(conf, 3),
+        }
+        for (x1, y1, x2, y2), conf, cls in zip(boxes.tolist(), scores.tolist(), classes.tolist())
+    ]
+
+
+def prelabel_images(names=None, images_dir=None, batch_size=16, detector=None, labels_dir=None):
+    """
+    Predict boxes for unlabeled dataset images in batches with the cached
+    detector, skipping images that already have a suggestion from the
+    current model. `names` limits the run to those files; otherwise
+    labels are looked up in labels_dir (default: the one paired with
+    images_dir). Returns the number of new suggestions.
+    """
+    images_dir = images_dir or dataset_dirs()[0]
+    names = unlabeled_images(images_dir, labels_dir) if names is None else names
+    detector = detector or get_detector()
+    version = detector.model_version
+
+    pending = {}
+    for name in names:
+        path = os.path.join(images_dir, name)
+        if os.path.exists(path):
+            pending[image_hash(path)] = name
+    done = set(
+        LabelSuggestion.objects.filter(image_hash__in=pending, model_version=version)
+        .values_list("image_hash", flat=True)
+    )
+    todo = [(h, n) for h, n in pending.items() if h not in done]
+
+    created = 0
+    for start in range(0, len(todo), batch_size):
+        batch = []
+        for digest, name in todo[start:start + batch_size]:
+            frame = cv2.imread(os.path.join(images_dir, name))
+            if frame is None:
+                logger.warning("Could not read dataset image", extra={"image": name})
+                continue
+            batch.append((digest, name, frame))
+        if not batch:
+            continue
+
+        detections = detector.detect([frame for _, _, frame in batch], conf=SUGGESTION_CONF)
+        suggestions = [
+            LabelSuggestion(
+                image_hash=digest,
+                model_version=version,
+                image_name=name,
+                boxes=to_yolo_boxes(boxes, scores, classes, frame.shape[1], frame.shape[0]),
+            )
+            for (digest, name, frame), (boxes, scores, classes) in zip(batch, detections)
+        ]
+        LabelSuggestion.objects.bulk_create(suggestions, ignore_conflicts=True)
+        created += len(suggestions)
+
+    logger.info("Pre-labelled dataset images", extra={"images": len(pending), "new": created, "model_version": version})
+    return created
@@ -0,0 +1,45 @@
+from django.db.models import Count
+from .models import FaultRecord, TaskStatus
+
+STATUSES = [status for status, _ in FaultRecord.STATUS_CHOICES]
+
+
+# ----------------------------------------
+# List and stats queries, shared by the sync views and faults/async_views.py
+# ----------------------------------------
+def fault_queryset(params):
+    """
+    Faults, newest first. Optional filters: ?class_index=N and
+    ?min_confidence=0.8 (any detection of the fault at or above it).
+    Everything the serializer reads is fetched up front, so it can run
+    from async code without touching the DB.
+    """
+    queryset = FaultRecord.objects.select_related("assigned_to").prefetch_related("detections").order_by("-timestamp")
+    class_index = params.get("class_index")
+    min_confidence = params.get("min_confidence")
+    if class_index not in (None, ""):
+        queryset = queryset.filter(class_index=class_index)
+    if min_confidence not in (None, ""):
+        queryset = queryset.filter(detections__confidence__gte=min_confidence).distinct()
+    return queryset
+
+
+def task_queryset():
+    return TaskStatus.objects.order_by("-timestamp")
+
+
+def status_counts():
+    """(pending faults by status, tasks by status) as GROUP BY queries."""
+    faults = FaultRecord.objects.filter(confirmed=False).values("status").annotate(count=Count("id")).order_by()
+    tasks = TaskStatus.objects.values("status").annotate(count=Count("id")).order_by()
+    return faults, tasks
+
+
+def build_stats(fault_rows, task_rows):
+    def totals(rows):
+        counts = dict.fromkeys(STATUSES, 0)
+        for row in rows:
+            counts[row["status"]] = row["count"]
+        return {"total": sum(counts.values()), **counts}
+
+    return {"faults": totals(fault_rows), "tasks": totals(task_rows)}
@@ -0,0 +1,186 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import DetectionCacheEntry
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+
+
+# ----------------------------------------
+# Keys
+# ----------------------------------------
+_content_hashes = {}
+
+
+def content_hash(path):
+    """
+    sha256 of the video bytes, read in 1 MB chunks so large files never
+    sit in memory. Cached per (path, size, mtime) for this process.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _content_hashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        _content_hashes[key] = digest.hexdigest()
+    return _content_hashes[key]
+
+
+def params_hash(profile, camera_config, conf, iou):
+    """Everything besides the video and the weights that changes the detections."""
+    params = {"profile": profile, "camera": camera_config or {}, "conf": conf, "iou": iou}
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def enabled():
+    return getattr(settings, "DETECTION_RESULT_CACHE", {}).get("enabled", False)
+
+
+def cache_dir():
+    path = str(settings.DETECTION_RESULT_CACHE["dir"])
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+# ----------------------------------------
+# Lookup / store
+# ----------------------------------------
+class CachedDetections:
+    """Per-frame detections of a cached video, indexed by frame number."""
+
+    def __init__(self, entry, frame_indices, counts, boxes, scores, classes):
+        self.entry = entry
+        self.names = {int(k): v for k, v in entry.names.items()}
+        self.frame_indices = frame_indices
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        self._by_frame = {
+            int(index): (boxes[start:end], scores[start:end], classes[start:end])
+            for index, start, end in zip(frame_indices, offsets[:-1], offsets[1:])
+        }
+
+    def __len__(self):
+        return len(self._by_frame)
+
+    def get(self, frame_index):
+        return self._by_frame.get(frame_index)
+
+
+def lookup(video_file, version, profile, camera_config, conf, iou):
+    """
+    Cached detections for this video, model and settings, or None. Entries
+    of other models are left alone; train_faults drops them when the
+    deployed model changes (invalidate_stale).
+    """
+    entry = DetectionCacheEntry.objects.filter(
+        content_hash=content_hash(video_file),
+        model_version=version,
+        params_hash=params_hash(profile, camera_config, conf, iou),
+    ).first()
+    if entry is None:
+        return None
+
+    try:
+        with np.load(entry.path) as data:
+            cached = CachedDetections(
+                entry, data["frame_indices"], data["counts"], data["boxes"], data["scores"], data["classes"],
+            )
+    except (OSError, KeyError, ValueError):
+        logger.warning("Detection cache file unreadable, dropping entry", extra={"path": entry.path})
+        _delete([entry])
+        return None
+
+    DetectionCacheEntry.objects.filter(id=entry.id).update(hits=F("hits") + 1, last_used=timezone.now())
+    logger.info(
+        "Detection cache hit",
+        extra={"video": os.path.basename(video_file), "model_version": version, "fault_frames": len(cached)},
+    )
+    return cached
+
+
+def store(video_file, version, profile, camera_config, conf, iou, names, frames, detections):
+    """
+    Cache the detections of a complete run. `detections` is a list of
+    (frame_index, boxes, scores, classes) for frames with detections.
+    """
+    detections = sorted(detections, key=lambda d: d[0])
+    key = {
+        "content_hash": content_hash(video_file),
+        "model_version": version,
+        "params_hash": params_hash(profile, camera_config, conf, iou),
+    }
+    path = os.path.join(cache_dir(), f"{key['content_hash'][:24]}_{version}_{key['params_hash'][:12]}.npz")
+
+    np.savez_compressed(
+        path,
+        frame_indices=np.array([d[0] for d in detections], dtype=np.int64),
+        counts=np.array([len(d[1]) for d in detections], dtype=np.int64),
+        boxes=np.concatenate([d[1] for d in detections]) if detections else np.empty((0, 4), dtype=np.float32),
+        scores=np.concatenate([d[2] for d in detections]) if detections else np.empty(0, dtype=np.float32),
+        classes=np.concatenate([d[3] for d in detections]) if detections else np.empty(0, dtype=np.int64),
+    )
+
+    try:
+        DetectionCacheEntry.objects.update_or_create(
+            **key,
+            defaults={
+                "names": {str(k): v for k, v in names.items()},
+                "path": path,
+                "size_bytes": os.path.getsize(path),
+                "frames": frames,
+                "fault_frames": len(detections),
+                "last_used": timezone.now(),
+            },
+        )
+    except IntegrityError:
+        # Another run cached the same video concurrently; its entry is just as good
+        pass
+
+    evict(settings.DETECTION_RESULT_CACHE.get("max_bytes"))
+
+
+# ----------------------------------------
+# Eviction / invalidation
+# ----------------------------------------
+def _delete(entries):
+    for entry in entries:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+    DetectionCacheEntry.objects.filter(id__in=[e.id for e in entries]).delete()
+
+
+def evict(max_bytes):
+    """Drop least recently used entries until the cache fits in max_bytes."""
+    if not max_bytes:
+        return 0
+    total = DetectionCacheEntry.objects.aggregate(total=Sum("size_bytes"))["total"] or 0
+    evicted = []
+    for entry in DetectionCacheEntry.objects.order_by("last_used"):
+        if total <= max_bytes:
+            break
+        evicted.append(entry)
+        total -= entry.size_bytes
+    if evicted:
+        _delete(evicted)
+        logger.info("Evicted detection cache entries", extra={"entries": len(evicted), "cache_bytes": total})
+    return len(evicted)
+
+
+def invalidate_stale(version):
+    """Entries from any other model version can never be hit again."""
+    stale = list(DetectionCacheEntry.objects.exclude(model_version=version))
+    if stale:
+        _delete(stale)
+        logger.info("Invalidated detection cache for old models", extra={"entries": len(stale)})
+    return len(stale)
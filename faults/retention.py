@@ -0,0 +1,190 @@
+import io
+import os
+import time
+import uuid
+import shutil
+import logging
+import tarfile
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core import serializers
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import ArchiveBatch, DetectionJob, FaultDailySummary, FaultRecord, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov")
+
+
+# ----------------------------------------
+# Archives
+# ----------------------------------------
+def archive_path(kind):
+    """<archive dir>/<kind>/<YYYY>/<MM>/<kind>-<timestamp>-<id>.tar.gz"""
+    now = timezone.localtime()
+    directory = os.path.join(str(settings.RETENTION["archive_dir"]), kind, f"{now:%Y}", f"{now:%m}")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{kind}-{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.tar.gz")
+
+
+def write_archive(path, rows, files=()):
+    """
+    Write rows (Django JSON lines) and files [(path, name in archive)] to a
+    .tar.gz, via a temp name so a crash never leaves a truncated archive.
+    Returns its size in bytes.
+    """
+    tmp_path = f"{path}.tmp"
+    with tarfile.open(tmp_path, "w:gz") as tar:
+        data = rows.encode("utf-8")
+        info = tarfile.TarInfo("rows.jsonl")
+        info.size = len(data)
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(data))
+        for source, name in files:
+            if os.path.exists(source):
+                tar.add(source, arcname=name)
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def _remove(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# ----------------------------------------
+# Rows
+# ----------------------------------------
+def _summarize(records):
+    """Add the archived faults to the per day/class/status counts."""
+    counts = Counter()
+    names = {}
+    for rec in records:
+        key = (timezone.localdate(rec.timestamp), rec.class_index, rec.status)
+        counts[key] += 1
+        names[key] = rec.fault_name or names.get(key, "")
+    for (day, class_index, status), count in counts.items():
+        summary, created = FaultDailySummary.objects.get_or_create(
+            day=day, class_index=class_index, status=status,
+            defaults={"count": count, "fault_name": names[(day, class_index, status)]},
+        )
+        if not created:
+            FaultDailySummary.objects.filter(pk=summary.pk).update(count=F("count") + count)
+
+
+def archive_faults(status, days, batch_size):
+    """
+    Archive one batch of `status` faults older than `days`: rows with
+    their detections and tasks, plus their frames. Returns the number of
+    faults archived (0 when nothing is due).
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    ids = list(
+        FaultRecord.objects.filter(status=status, timestamp__lt=cutoff)
+        .order_by("timestamp", "id").values_list("id", flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+
+    records = list(FaultRecord.objects.filter(id__in=ids).prefetch_related("detections"))
+    detections = [d for rec in records for d in rec.detections.all()]
+    tasks = list(TaskStatus.objects.filter(fault_id__in=ids))
+    images = [
+        (os.path.join(settings.MEDIA_ROOT, str(rec.image)), f"media/{rec.image}")
+        for rec in records if rec.image
+    ]
+
+    path = archive_path("faults")
+    size = write_archive(path, serializers.serialize("jsonl", records + detections + tasks), images)
+    with transaction.atomic():
+        ArchiveBatch.objects.create(
+            kind="faults", path=path, items=len(records), size_bytes=size,
+            oldest=min(rec.timestamp for rec in records), newest=max(rec.timestamp for rec in records),
+        )
+        _summarize(records)
+        # Detections and tasks cascade
+        FaultRecord.objects.filter(id__in=ids).delete()
+        # Frames go only once the rows are gone for good
+        sources = [source for source, _ in images]
+        transaction.on_commit(lambda: _remove(sources))
+
+    logger.info("Faults archived", extra={"status": status, "faults": len(records), "archive": path})
+    return len(records)
+
+
+# ----------------------------------------
+# Videos
+# ----------------------------------------
+def tier_videos(days, batch_size):
+    """
+    Move recorded videos older than `days` out of the upload directory into
+    the archive (they are already compressed, so moved as is), skipping
+    videos a detection job is still running on. Returns the number moved.
+    """
+    video_dir = str(settings.VIDEO_UPLOAD_DIR)
+    if not os.path.isdir(video_dir):
+        return 0
+    cutoff = time.time() - days * 86400
+    busy = set(DetectionJob.objects.filter(status="running").values_list("video_path", flat=True))
+
+    due = []
+    for entry in os.scandir(video_dir):
+        if not entry.is_file() or not entry.name.lower().endswith(VIDEO_EXTENSIONS):
+            continue
+        mtime = entry.stat().st_mtime
+        if mtime < cutoff and entry.path not in busy:
+            due.append((mtime, entry.path))
+    due = sorted(due)[:batch_size]
+    if not due:
+        return 0
+
+    target_dir = archive_path("videos")[:-len(".tar.gz")]
+    os.makedirs(target_dir, exist_ok=True)
+    size = 0
+    for _, source in due:
+        size += os.path.getsize(source)
+        shutil.move(source, os.path.join(target_dir, os.path.basename(source)))
+
+    ArchiveBatch.objects.create(
+        kind="videos", path=target_dir, items=len(due), size_bytes=size,
+        oldest=datetime.fromtimestamp(due[0][0], tz=dt_timezone.utc),
+        newest=datetime.fromtimestamp(due[-1][0], tz=dt_timezone.utc),
+    )
+    logger.info("Videos moved to the archive", extra={"videos": len(due), "archive": target_dir})
+    return len(due)
+
+
+# ----------------------------------------
+# Policy run
+# ----------------------------------------
+def apply_retention(options=None):
+    """
+    Apply every RETENTION policy in batches of batch_size, at most
+    max_batches batches per policy, so one run stays bounded and the next
+    scheduled run picks up the rest. Returns {policy: items archived}.
+    """
+    options = options or settings.RETENTION
+    batch_size, max_batches = options["batch_size"], options["max_batches"]
+    stats = {}
+    for status, days in options["faults"].items():
+        if days is None:
+            continue
+        total = 0
+        for _ in range(max_batches):
+            archived = archive_faults(status, days, batch_size)
+            total += archived
+            if archived < batch_size:
+                break
+        stats[f"faults:{status}"] = total
+
+    if options.get("videos_days") is not None:
+        stats["videos"] = tier_videos(options["videos_days"], batch_size)
+
+    logger.info("Retention applied", extra=stats)
+    return stats
@@ -0,0 +1,114 @@
+import logging
+import cv2
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Per-camera configuration
+# ----------------------------------------
+def get_camera_config(camera=None):
+    """ROI/tiling settings for a camera from CAMERA_ROIS (empty = full frame)."""
+    cameras = getattr(settings, "CAMERA_ROIS", {})
+    if camera and camera in cameras:
+        return cameras[camera]
+    if camera:
+        logger.warning("No ROI configured for camera '%s', using default", camera)
+    return cameras.get("default", {})
+
+
+def _to_pixels(points, width, height):
+    return np.array([[x * width, y * height] for x, y in points], dtype=np.int32)
+
+
+def roi_rect(frame_shape, config):
+    """Pixel rectangle (x1, y1, x2, y2) covering the camera's ROI."""
+    height, width = frame_shape[:2]
+
+    if config.get("polygon"):
+        pts = _to_pixels(config["polygon"], width, height)
+        x1, y1 = pts.min(axis=0)
+        x2, y2 = pts.max(axis=0)
+    elif config.get("roi"):
+        fx1, fy1, fx2, fy2 = config["roi"]
+        x1, y1, x2, y2 = fx1 * width, fy1 * height, fx2 * width, fy2 * height
+    else:
+        return 0, 0, width, height
+
+    x1, y1 = max(0, int(x1)), max(0, int(y1))
+    x2, y2 = min(width, int(x2)), min(height, int(y2))
+    return x1, y1, x2, y2
+
+
+def apply_roi(frame, config):
+    """
+    Cut the ROI out of a frame. Returns (view, (offset_x, offset_y)).
+    "crop" returns a slice of the original frame (no copy); "mask" also
+    blacks out everything outside the polygon, so it needs a copy.
+    """
+    x1, y1, x2, y2 = roi_rect(frame.shape, config)
+    view = frame[y1:y2, x1:x2]
+
+    if config.get("mode") == "mask" and config.get("polygon"):
+        height, width = frame.shape[:2]
+        pts = _to_pixels(config["polygon"], width, height) - [x1, y1]
+        mask = np.zeros(view.shape[:2], dtype=np.uint8)
+        cv2.fillPoly(mask, [pts], 255)
+        view = cv2.bitwise_and(view, view, mask=mask)
+
+    return view, (x1, y1)
+
+
+# ----------------------------------------
+# Tiling
+# ----------------------------------------
+def _starts(length, size, stride):
+    if length <= size:
+        return [0]
+    starts = list(range(0, length - size + 1, stride))
+    if starts[-1] + size < length:
+        starts.append(length - size)
+    return starts
+
+
+def tile_windows(width, height, size, overlap=0.2):
+    """Overlapping (x1, y1, x2, y2) windows covering a width x height image."""
+    stride = max(1, int(size * (1 - overlap)))
+    return [
+        (x, y, min(x + size, width), min(y + size, height))
+        for y in _starts(height, size, stride)
+        for x in _starts(width, size, stride)
+    ]
+
+
+def nms(boxes, scores, classes, iou=0.5):
+    """
+    Class-aware non-maximum suppression on NumPy arrays.
+    Returns the indices to keep, highest score first.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Shift each class into its own coordinate range so classes never suppress each other
+    shifted = boxes + classes.astype(np.float32)[:, None] * (boxes.max() + 1)
+    areas = (shifted[:, 2] - shifted[:, 0]) * (shifted[:, 3] - shifted[:, 1])
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        xx1 = np.maximum(shifted[i, 0], shifted[rest, 0])
+        yy1 = np.maximum(shifted[i, 1], shifted[rest, 1])
+        xx2 = np.minimum(shifted[i, 2], shifted[rest, 2])
+        yy2 = np.minimum(shifted[i, 3], shifted[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        overlap = inter / (areas[i] + areas[rest] - inter + 1e-9)
+
+        order = rest[overlap <= iou]
+
+    return np.array(keep, dtype=np.int64)
@@ -0,0 +1,206 @@
+import os
+import uuid
+import logging
+import threading
+from collections import deque
+
+POLICIES = ("block", "drop_lowest", "spill")
+
+logger = logging.getLogger(__name__)
+
+
+class SaveItem:
+    """One encoded fault image waiting to be written, plus its detections."""
+
+    def __init__(self, filename, data, detections, priority=0.0, job_id=None, frame_index=None, model_version=""):
+        self.filename = filename
+        self.data = data                # encoded JPEG bytes (None once spilled)
+        self.spill_path = None          # set when the bytes were spilled to disk
+        self.detections = detections
+        self.priority = priority        # top confidence, used by drop_lowest
+        self.nbytes = len(data)
+        self.job_id = job_id            # (job_id, frame_index) keys the FaultRecord
+        self.frame_index = frame_index
+        self.model_version = model_version
+
+
+class SaveQueue:
+    """
+    Bounded hand-off between the detection loop and the threads that write
+    JPEGs and insert FaultRecords. It holds at most `max_items` items and
+    `max_bytes` of encoded image data. When full, the policy decides:
+
+      block        the detection loop waits for a free slot
+      drop_lowest  the lowest-confidence item (queued or incoming) is dropped
+      spill        the incoming bytes go to `spill_dir` instead of memory;
+                   once `max_items` are queued it waits like block
+
+    `gauges` optionally maps "depth", "bytes" and "dropped" to Prometheus
+    metrics that are kept in step with the queue.
+    """
+
+    def __init__(self, handler, workers=2, max_items=32, max_bytes=64 * 1024 * 1024,
+                 policy="block", spill_dir=None, gauges=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown save queue policy '{policy}', expected one of {POLICIES}")
+        if policy == "spill" and not spill_dir:
+            raise ValueError("The spill policy needs a spill_dir")
+
+        self.handler = handler
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+        self._items = deque()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._gauges = gauges or {}
+
+        # Gauges / counters
+        self.bytes_held = 0
+        self.peak_depth = 0
+        self.peak_bytes = 0
+        self.submitted = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed = 0
+
+        self._threads = [
+            threading.Thread(target=self._worker, daemon=True, name=f"save-queue-{i}")
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _track(self, items, nbytes, dropped=0):
+        if "depth" in self._gauges and items:
+            self._gauges["depth"].inc(items)
+        if "bytes" in self._gauges and nbytes:
+            self._gauges["bytes"].inc(nbytes)
+        if "dropped" in self._gauges and dropped:
+            self._gauges["dropped"].inc(dropped)
+
+    @property
+    def depth(self):
+        return len(self._items)
+
+    def _full(self, nbytes):
+        if not self._items:
+            return False  # always accept one item, however large
+        return len(self._items) >= self.max_items or self.bytes_held + nbytes > self.max_bytes
+
+    def submit(self, item):
+        """Queue an item. Returns False if the drop_lowest policy discarded it."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("SaveQueue is closed")
+
+            spill = False
+            while self._full(item.nbytes):
+                if self.policy == "block":
+                    self._cond.wait()
+                    continue
+
+                if self.policy == "drop_lowest":
+                    lowest = min(self._items, key=lambda i: i.priority)
+                    if item.priority <= lowest.priority:
+                        self.dropped += 1
+                        self._track(0, 0, dropped=1)
+                        return False
+                    self._items.remove(lowest)
+                    self.bytes_held -= lowest.nbytes
+                    self.dropped += 1
+                    self._track(-1, -lowest.nbytes, dropped=1)
+                    continue
+
+                # spill: only the bytes leave memory, the item count stays capped
+                if len(self._items) >= self.max_items:
+                    self._cond.wait()
+                    continue
+                spill = True
+                break
+
+            if not spill:
+                self._append(item)
+                return True
+
+        # Written outside the lock, so the workers keep draining meanwhile
+        self._spill(item)
+        with self._cond:
+            while self._items and len(self._items) >= self.max_items:
+                self._cond.wait()
+            self.spilled += 1
+            self._append(item)
+        return True
+
+    def _append(self, item):
+        self._items.append(item)
+        self.bytes_held += item.nbytes
+        self._track(1, item.nbytes)
+        self.submitted += 1
+        self.peak_depth = max(self.peak_depth, len(self._items))
+        self.peak_bytes = max(self.peak_bytes, self.bytes_held)
+        self._cond.notify_all()
+
+    def _spill(self, item):
+        path = os.path.join(self.spill_dir, f"{uuid.uuid4().hex}.jpg")
+        with open(path, "wb") as f:
+            f.write(item.data)
+        item.spill_path = path
+        item.data = None
+        item.nbytes = 0
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._items and not self._closed:
+                    self._cond.wait()
+                if not self._items:
+                    return
+                item = self._items.popleft()
+                self.bytes_held -= item.nbytes
+                self._track(-1, -item.nbytes)
+                self._in_flight += 1
+                self._cond.notify_all()
+
+            try:
+                self.handler(item)
+            except Exception:
+                with self._cond:
+                    self.failed += 1
+                logger.exception("Save queue handler failed", extra={"image": item.filename})
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def join(self):
+        """Wait until every submitted item has been fully handled."""
+        with self._cond:
+            while self._items or self._in_flight:
+                self._cond.wait()
+
+    def close(self, wait=True):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def stats(self):
+        return {
+            "policy": self.policy,
+            "depth": self.depth,
+            "bytes_held": self.bytes_held,
+            "peak_depth": self.peak_depth,
+            "peak_bytes": self.peak_bytes,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "failed": self.failed,
+        }
@@ -1,22 +1,42 @@
 from rest_framework import serializers
-from .models import FaultRecord, TaskStatus
+from .models import FaultRecord, FaultCluster, TaskStatus, Detection
+
+class DetectionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Detection
+        fields = ["class_index", "confidence", "x1", "y1", "x2", "y2", "frame_index", "model_version"]
+
 
 class FaultRecordSerializer(serializers.ModelSerializer):
     assigned_to = serializers.StringRelatedField()
+    detections = DetectionSerializer(many=True, read_only=True)
 
     class Meta:
         model = FaultRecord
         fields = [
             "id",
             "image",
+            "fault_name",
+            "class_index",
             "timestamp",
             "status",
             "assigned_to",
             "confirmed",       # Added for self-training
             "sent_to_service",  # Added for notifications
+            "cluster",
+            "detections",
         ]
 
 
+class FaultClusterSerializer(serializers.ModelSerializer):
+    representative = FaultRecordSerializer(read_only=True)
+    size = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = FaultCluster
+        fields = ["id", "class_index", "size", "first_seen", "last_seen", "representative"]
+
+
 class TaskStatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = TaskStatus
@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import FaultRecord, TaskStatus
+from .models import FaultCluster, FaultRecord, TaskStatus
+from .overlays import remove_overlay
+from .view_cache import invalidate
 
 
 @receiver(post_save, sender=FaultRecord)
@@ -15,3 +17,26 @@ def create_task_for_fault(sender, instance, created, **kwargs):
             name=instance.fault_name or f"Fault #{instance.id}",
             status=instance.status
         )
+
+
+@receiver(post_delete, sender=FaultRecord)
+def remove_fault_overlay(sender, instance, **kwargs):
+    """
+    Drop the cached overlay of a deleted fault.
+    """
+    remove_overlay(instance.id)
+
+
+@receiver([post_save, post_delete], sender=FaultRecord)
+@receiver([post_save, post_delete], sender=FaultCluster)
+def invalidate_fault_views(sender, **kwargs):
+    """
+    Drop cached dashboard pages and API lists built from faults. Task
+    pages show their fault, so they go too.
+    """
+    invalidate("faults", "tasks")
+
+
+@receiver([post_save, post_delete], sender=TaskStatus)
+def invalidate_task_views(sender, **kwargs):
+    invalidate("tasks")
@@ -2,9 +2,13 @@ from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
 from faults.models import FaultRecord, TaskStatus
+from faults import metrics
 import subprocess
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # 🔔 Notify Fault Task
 @shared_task
 def notify_fault(fault_id, feedback_required=False):
@@ -30,21 +34,22 @@ def notify_fault(fault_id, feedback_required=False):
             fault.save()
 
         # ✅ Example Email Notification (optional)
-        send_mail(
-            subject="⚠ New Railway Fault Detected",
-            message=f"A new fault has been detected!\n\nFault ID: {fault.id}\nStatus: {fault.status}\nFeedback Required: {feedback_required}",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=["admin@example.com"],  # update email list
-            fail_silently=True,
-        )
+        with metrics.observe(metrics.NOTIFICATION_LATENCY, channel="email"):
+            send_mail(
+                subject="⚠ New Railway Fault Detected",
+                message=f"A new fault has been detected!\n\nFault ID: {fault.id}\nStatus: {fault.status}\nFeedback Required: {feedback_required}",
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=["admin@example.com"],  # update email list
+                fail_silently=True,
+            )
 
-        print(
-            f"[NOTIFY] Fault {fault.id} notified. "
-            f"Feedback Required: {feedback_required}"
+        logger.info(
+            "Fault notified",
+            extra={"fault_id": fault.id, "feedback_required": feedback_required},
         )
 
     except FaultRecord.DoesNotExist:
-        print(f"[ERROR] Fault with ID {fault_id} not found")
+        logger.error("Fault with ID %s not found", fault_id)
 
 
 # -------------------------------------------------
@@ -60,26 +65,29 @@ def run_capture_video():
     """
     script_path = os.path.join(BASE_DIR, "faults", "capture_video.py")
     if os.path.exists(script_path):
-        print("[TASK] Running capture_video.py ...")
+        logger.info("Running capture_video.py")
         subprocess.Popen(["python", script_path])
         return "Capture video started"
     else:
-        print("[ERROR] capture_video.py not found")
+        logger.error("capture_video.py not found")
         return "Error: capture_video.py not found"
 
 
 @shared_task
-def run_detect_faults():
+def run_detect_faults(video_file=None, profile=None, camera=None, workers=None):
     """
     Run detect_faults.py in a separate process
     """
     script_path = os.path.join(BASE_DIR, "faults", "detect_faults.py")
     if os.path.exists(script_path):
-        print("[TASK] Running detect_faults.py ...")
-        subprocess.Popen(["python", script_path])
+        logger.info("Running detect_faults.py")
+        args = ["python", script_path]
+        if video_file or profile or camera or workers:
+            args += [video_file or "", profile or "", camera or "", str(workers or "")]
+        subprocess.Popen(args)
         return "Fault detection started"
     else:
-        print("[ERROR] detect_faults.py not found")
+        logger.error("detect_faults.py not found")
         return "Error: detect_faults.py not found"
 
 
@@ -90,9 +98,75 @@ def run_train_faults():
     """
     script_path = os.path.join(BASE_DIR, "faults", "train_faults.py")
     if os.path.exists(script_path):
-        print("[TASK] Running train_faults.py ...")
+        logger.info("Running train_faults.py")
         subprocess.Popen(["python", script_path])
         return "Training started"
     else:
-        print("[ERROR] train_faults.py not found")
+        logger.error("train_faults.py not found")
         return "Error: train_faults.py not found"
+
+
+@shared_task
+def prelabel_dataset_images(names=None):
+    """
+    Pre-label unlabeled dataset images (or just `names`) with the current
+    model. Runs in the worker, so the detector stays loaded between batches.
+    """
+    from faults.prelabel import prelabel_images
+    return prelabel_images(names)
+
+
+def _confirm_progress(task, **target):
+    def progress(done, total, stage):
+        meta = {"stage": stage, "done": done, "total": total}
+        if not task.request.is_eager:
+            task.update_state(state="PROGRESS", meta=meta)
+        from faults.confirm import publish
+        publish({"event": "confirm.progress", "job_id": task.request.id, **target, **meta})
+    return progress
+
+
+def _run_confirm(task, confirm, target_id, action, **target):
+    from faults.confirm import ConfirmError, publish
+    try:
+        result = confirm(target_id, action, progress=_confirm_progress(task, **target))
+    except ConfirmError as e:
+        result = {"error": str(e), "status": e.status}
+    logger.info(
+        "Fault confirmation finished",
+        extra={**target, "action": action, "count": result.get("count", 0), "error": result.get("error")},
+    )
+    publish({"event": "confirm.done", "job_id": task.request.id, **target, **result})
+    return result
+
+
+@shared_task(bind=True)
+def confirm_fault_job(self, fault_id, action):
+    """
+    Confirm a fault (YES/NO) and move its duplicates into the dataset off
+    the request path. Progress goes to the task state and to every
+    FaultsConsumer socket as "confirm.progress" / "confirm.done" events.
+    """
+    from faults.confirm import confirm_fault
+    return _run_confirm(self, confirm_fault, fault_id, action, fault_id=fault_id)
+
+
+@shared_task(bind=True)
+def confirm_cluster_job(self, cluster_id, action):
+    """confirm_fault_job for a whole near-duplicate cluster."""
+    from faults.confirm import confirm_cluster
+    return _run_confirm(self, confirm_cluster, cluster_id, action, cluster_id=cluster_id)
+
+
+@shared_task
+def cluster_faults():
+    """Group new unconfirmed faults into near-duplicate clusters."""
+    from faults.clustering import run_clustering
+    return run_clustering()
+
+
+@shared_task
+def apply_retention():
+    """Archive old resolved faults (with their tasks) and recorded videos (scheduled by Celery Beat)."""
+    from faults.retention import apply_retention as run
+    return run()
@@ -25,3 +25,1061 @@ class DashboardViewTest(TestCase):
         response = self.client.get("/dashboard/")
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "Fault Detection")
+
+import os
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase
+from . import inference
+
+class InferenceBackendTest(SimpleTestCase):
+    def test_auto_picks_fastest_available(self):
+        with mock.patch.object(inference, "available_backends", return_value=["onnx", "pytorch"]):
+            self.assertEqual(inference.resolve_backend("auto"), "onnx")
+
+    def test_unavailable_backend_falls_back_to_pytorch(self):
+        with mock.patch.object(inference, "available_backends", return_value=["pytorch"]):
+            self.assertEqual(inference.resolve_backend("openvino"), "pytorch")
+
+    def test_available_backends_ordered_by_measured_latency(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            weights = os.path.join(tmp, "best.pt")
+            open(weights, "wb").close()
+            os.makedirs(inference.backend_weights_path("openvino", weights))
+            open(inference.backend_weights_path("onnx", weights), "wb").close()
+            mtime = os.path.getmtime(weights)
+            manifest = {
+                "openvino": {"source_mtime": mtime, "parity": True, "latency_ms": 9.0},
+                "onnx": {"source_mtime": mtime, "parity": True, "latency_ms": 4.0},
+                "pytorch": {"source_mtime": mtime, "latency_ms": 12.0},
+            }
+            with mock.patch.object(inference, "_load_manifest", return_value=manifest), \
+                    mock.patch.object(inference, "runtime_installed", return_value=True):
+                self.assertEqual(inference.available_backends(weights), ["onnx", "openvino", "pytorch"])
+                # Without a timing for every backend the static order applies
+                del manifest["pytorch"]
+                self.assertEqual(inference.available_backends(weights), ["openvino", "onnx", "pytorch"])
+
+    def test_parity_needs_sample_images(self):
+        model = mock.Mock()
+        self.assertFalse(inference.check_parity(model, model, []))
+        model.assert_not_called()
+
+    def test_exported_artifact_paths(self):
+        self.assertTrue(inference.backend_weights_path("onnx", "/w/best.pt").endswith("best.onnx"))
+        self.assertTrue(inference.backend_weights_path("openvino", "/w/best.pt").endswith("best_openvino_model"))
+
+class InferenceProfileTest(SimpleTestCase):
+    def test_unknown_profile_falls_back_to_default(self):
+        name, options = inference.get_profile("does-not-exist")
+        self.assertEqual(name, "default")
+        self.assertIn("imgsz", options)
+
+    def test_cascade_rechecks_only_candidate_frames(self):
+        def fake_result(n_boxes):
+            result = mock.Mock()
+            result.boxes = [object()] * n_boxes
+            return result
+
+        model = mock.Mock()
+        model.names = {0: "OHE_wire"}
+        model.side_effect = [
+            [fake_result(0), fake_result(1), fake_result(0)],  # low-res pass
+            [fake_result(2)],                                  # full-res re-check
+        ]
+
+        with mock.patch.object(inference, "load_detection_model", return_value=model):
+            detector = inference.Detector("cascade")
+            results = detector.predict(["f0", "f1", "f2"])
+
+        self.assertEqual([len(r.boxes) for r in results], [0, 2, 0])
+        self.assertEqual(model.call_args_list[1].args[0], ["f1"])
+
+    def test_map_follows_the_detector_path(self):
+        import numpy as np
+
+        true_boxes = np.array([[10, 10, 50, 50], [60, 60, 90, 90]], dtype=np.float32)
+        labels = [(np.array([0, 1]), true_boxes)]
+        detector = mock.Mock()
+        found = (true_boxes.copy(), np.array([0.9, 0.8], dtype=np.float32), np.array([0, 1]))
+        with mock.patch.object(inference, "batch_arrays", return_value=[found]):
+            map50, map50_95 = inference.detection_map(detector, ["frame"], labels)
+        self.assertGreater(map50, 0.99)
+        self.assertGreater(map50_95, 0.99)
+        self.assertEqual(detector.predict.call_args.args[0], ["frame"])
+
+        # A frame the cascade drops is a miss
+        empty = (np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64))
+        with mock.patch.object(inference, "batch_arrays", return_value=[empty]):
+            self.assertEqual(inference.detection_map(detector, ["frame"], labels), (0.0, 0.0))
+
+    def test_yolo_labels_to_pixels(self):
+        import numpy as np
+
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("2 0.5 0.5 0.2 0.4\n")
+        try:
+            classes, boxes = inference.read_yolo_labels(f.name, 100, 50)
+        finally:
+            os.remove(f.name)
+        self.assertEqual(classes.tolist(), [2])
+        np.testing.assert_allclose(boxes, [[40, 15, 60, 35]], atol=1e-4)
+        self.assertEqual(inference.read_yolo_labels("/missing.txt", 100, 50)[1].shape, (0, 4))
+
+import numpy as np
+from . import roi
+
+class RoiTilingTest(SimpleTestCase):
+    def test_crop_returns_band_and_offset(self):
+        frame = np.zeros((100, 200, 3), dtype=np.uint8)
+        view, offset = roi.apply_roi(frame, {"roi": [0.0, 0.5, 1.0, 1.0], "mode": "crop"})
+        self.assertEqual(view.shape[:2], (50, 200))
+        self.assertEqual(offset, (0, 50))
+
+    def test_tiles_cover_whole_image(self):
+        windows = roi.tile_windows(1500, 700, 640, overlap=0.2)
+        self.assertEqual(max(w[2] for w in windows), 1500)
+        self.assertEqual(max(w[3] for w in windows), 700)
+        self.assertTrue(all(w[2] - w[0] <= 640 and w[3] - w[1] <= 640 for w in windows))
+
+    def test_nms_merges_tile_duplicates_per_class(self):
+        boxes = np.array([[10, 10, 50, 50], [12, 11, 51, 50], [10, 10, 50, 50]], dtype=np.float32)
+        scores = np.array([0.9, 0.8, 0.7], dtype=np.float32)
+        classes = np.array([0, 0, 1])
+        keep = roi.nms(boxes, scores, classes, iou=0.5)
+        self.assertEqual(sorted(keep.tolist()), [0, 2])
+
+class BatchArraysTest(SimpleTestCase):
+    def test_one_array_per_result_in_order(self):
+        import torch
+
+        def fake_result(rows):
+            result = mock.Mock()
+            result.boxes = mock.MagicMock()
+            result.boxes.__len__.return_value = len(rows)
+            result.boxes.data = torch.tensor(rows, dtype=torch.float32).reshape(-1, 6)
+            return result
+
+        results = [
+            fake_result([[0, 0, 10, 10, 0.9, 1], [5, 5, 20, 20, 0.6, 0]]),
+            fake_result([]),
+            fake_result([[1, 2, 3, 4, 0.7, 2]]),
+        ]
+        arrays = inference.batch_arrays(results)
+
+        self.assertEqual([len(a[0]) for a in arrays], [2, 0, 1])
+        self.assertEqual(arrays[0][2].tolist(), [1, 0])
+        self.assertAlmostEqual(float(arrays[2][1][0]), 0.7, places=5)
+
+import tempfile
+import threading
+from .save_queue import SaveQueue, SaveItem
+
+class SaveQueueTest(SimpleTestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.handled = []
+
+    def handler(self, item):
+        self.release.wait(5)
+        self.handled.append(item)
+
+    def fill(self, queue, priorities):
+        # first item is picked up by the single worker and blocks there
+        queue.submit(SaveItem("busy.jpg", b"x" * 10, [("busy", 1.0)], priority=1.0))
+        while queue.depth:
+            pass
+        return [queue.submit(SaveItem(f"{p}.jpg", b"x" * 10, [("f", p)], priority=p)) for p in priorities]
+
+    def test_drop_lowest_keeps_highest_confidence(self):
+        queue = SaveQueue(self.handler, workers=1, max_items=2, policy="drop_lowest")
+        accepted = self.fill(queue, [0.6, 0.9, 0.55, 0.7])
+        self.assertEqual(accepted, [True, True, False, True])
+        self.assertEqual(queue.depth, 2)
+        self.assertEqual(queue.dropped, 2)
+        self.release.set()
+        queue.close()
+        self.assertEqual(sorted(i.priority for i in self.handled), [0.7, 0.9, 1.0])
+
+    def test_spill_moves_bytes_out_of_memory(self):
+        with tempfile.TemporaryDirectory() as spill_dir:
+            queue = SaveQueue(self.handler, workers=1, max_items=3, max_bytes=15, policy="spill", spill_dir=spill_dir)
+            self.assertEqual(self.fill(queue, [0.5, 0.6, 0.7]), [True, True, True])
+            self.assertEqual(queue.spilled, 2)
+            self.assertEqual(queue.bytes_held, 10)
+
+            # max_items still holds: the next submit waits for a free slot
+            extra = threading.Thread(target=queue.submit, args=(SaveItem("extra.jpg", b"x" * 10, [], priority=0.8),))
+            extra.start()
+            extra.join(0.2)
+            self.assertTrue(extra.is_alive())
+            self.assertEqual(queue.depth, 3)
+
+            self.release.set()
+            extra.join(5)
+            queue.close()
+            self.assertEqual(queue.peak_depth, 3)
+            self.assertEqual(len(self.handled), 5)
+            spilled = [i for i in self.handled if i.spill_path]
+            self.assertEqual(len(spilled), queue.spilled)
+            self.assertIsNone(spilled[0].data)
+
+from .timing import StageTimer
+
+class StageTimerTest(SimpleTestCase):
+    def test_summary_percentiles(self):
+        timer = StageTimer()
+        for ms in range(1, 101):
+            timer.record("infer", ms / 1000)
+        summary = timer.summary()["infer"]
+        self.assertEqual(summary["count"], 100)
+        self.assertEqual(summary["p50_ms"], 51.0)
+        self.assertEqual(summary["p99_ms"], 100.0)
+
+class StubDetectorTest(SimpleTestCase):
+    def test_finds_red_defect_square(self):
+        from .benchmarks import StubDetector
+        frame = np.full((120, 160, 3), 90, dtype=np.uint8)
+        frame[40:80, 50:100] = (0, 0, 255)
+        boxes, scores, classes = StubDetector().detect([frame, np.zeros_like(frame)])[0]
+        self.assertEqual(boxes.tolist(), [[50, 40, 99, 79]])
+        self.assertEqual(len(StubDetector().detect([np.zeros_like(frame)])[0][0]), 0)
+
+import json as json_lib
+import logging
+from .log_format import JsonFormatter
+
+class StructuredLoggingTest(SimpleTestCase):
+    def test_extra_fields_are_emitted_as_json(self):
+        record = logging.LogRecord("faults.detect_faults", logging.INFO, __file__, 1, "Fault saved: %s", ("a.jpg",), None)
+        record.fault_id = 7
+        entry = json_lib.loads(JsonFormatter().format(record))
+        self.assertEqual(entry["message"], "Fault saved: a.jpg")
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["fault_id"], 7)
+
+
+class MetricsEndpointTest(TestCase):
+    def test_metrics_endpoint_exposes_detection_metrics(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "faults_saved_total")
+
+import os
+import shutil
+from django.test import override_settings, TransactionTestCase
+from .models import DetectionJob
+from .benchmarks import StubDetector, make_synthetic_video
+
+class ResumableDetectionTest(TransactionTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.video = make_synthetic_video(os.path.join(self.tmp, "clip.mp4"), frames=40, width=320, height=240, fault_every=5)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_resumed_job_continues_from_checkpoint_without_duplicates(self):
+        from . import detect_faults
+
+        with override_settings(MEDIA_ROOT=self.tmp), mock.patch.object(detect_faults, "output_dir", self.tmp), \
+                mock.patch.object(detect_faults.notify_fault, "delay"):
+            first = detect_faults.run_fault_detection(self.video, detector=StubDetector())
+            saved = FaultRecord.objects.filter(job_id=first["job_id"]).count()
+            self.assertEqual(saved, 8)
+
+            # Simulate a crash after frame 19: roll the checkpoint back and mark the job unfinished
+            DetectionJob.objects.filter(id=first["job_id"]).update(status="failed", last_frame=19)
+            second = detect_faults.run_fault_detection(self.video, detector=StubDetector())
+
+        self.assertEqual(second["job_id"], first["job_id"])
+        self.assertEqual(second["start_frame"], 20)
+        self.assertEqual(FaultRecord.objects.filter(job_id=first["job_id"]).count(), saved)
+        self.assertEqual(DetectionJob.objects.get(id=first["job_id"]).status, "completed")
+
+    def test_parallel_segments_match_sequential_run(self):
+        from . import detect_faults
+
+        self.assertEqual(detect_faults.split_segments(20, 40, 7), [(20, 27), (27, 34), (34, 40)])
+
+        with override_settings(MEDIA_ROOT=self.tmp, DETECTION_SEGMENT_FRAMES=7), \
+                mock.patch.object(detect_faults, "output_dir", self.tmp), \
+                mock.patch.object(detect_faults.notify_fault, "delay"):
+            summary = detect_faults.run_fault_detection(self.video, detector=StubDetector(), workers=2)
+
+        frames = FaultRecord.objects.filter(job_id=summary["job_id"]).order_by("frame_index")
+        self.assertEqual(summary["frames"], 40)
+        self.assertEqual(list(frames.values_list("frame_index", flat=True)), list(range(0, 40, 5)))
+        self.assertEqual(DetectionJob.objects.get(id=summary["job_id"]).status, "completed")
+
+from .models import DetectionCacheEntry
+from . import result_cache
+
+class ResultCacheTest(TransactionTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.video = make_synthetic_video(os.path.join(self.tmp, "clip.mp4"), frames=30, width=320, height=240, fault_every=5)
+        self.cache = override_settings(DETECTION_RESULT_CACHE={"enabled": True, "dir": os.path.join(self.tmp, "cache"), "max_bytes": 0})
+        self.cache.enable()
+
+    def tearDown(self):
+        self.cache.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_rerun_replays_cached_detections_without_the_model(self):
+        from . import detect_faults
+
+        with override_settings(MEDIA_ROOT=self.tmp), mock.patch.object(detect_faults, "output_dir", self.tmp), \
+                mock.patch.object(detect_faults.notify_fault, "delay"):
+            first = detect_faults.run_fault_detection(self.video, detector=StubDetector())
+            self.assertFalse(first["cached"])
+            self.assertEqual(DetectionCacheEntry.objects.get().fault_frames, 6)
+
+            detector = StubDetector()
+            with mock.patch.object(detector, "detect") as detect:
+                second = detect_faults.run_fault_detection(self.video, detector=detector)
+            detect.assert_not_called()
+
+        self.assertTrue(second["cached"])
+        self.assertNotEqual(second["job_id"], first["job_id"])
+        self.assertEqual(FaultRecord.objects.filter(job_id=second["job_id"]).count(), 6)
+
+    def test_model_change_invalidates_entries(self):
+        from . import detect_faults
+
+        with override_settings(MEDIA_ROOT=self.tmp), mock.patch.object(detect_faults, "output_dir", self.tmp), \
+                mock.patch.object(detect_faults.notify_fault, "delay"):
+            detect_faults.run_fault_detection(self.video, detector=StubDetector())
+        path = DetectionCacheEntry.objects.get().path
+
+        # A lookup for another model misses without touching the entry
+        self.assertIsNone(result_cache.lookup(self.video, "retrained", "default", None, 0.25, 0.45))
+        self.assertTrue(DetectionCacheEntry.objects.exists())
+
+        self.assertEqual(result_cache.invalidate_stale("retrained"), 1)
+        self.assertFalse(DetectionCacheEntry.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+import cv2
+from .models import Detection
+
+class DetectionRowsTest(TransactionTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.video = make_synthetic_video(os.path.join(self.tmp, "clip.mp4"), frames=10, width=320, height=240, fault_every=5)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_faults_store_class_and_boxes(self):
+        from . import detect_faults
+
+        with override_settings(MEDIA_ROOT=self.tmp), mock.patch.object(detect_faults, "output_dir", self.tmp), \
+                mock.patch.object(detect_faults.notify_fault, "delay"):
+            detect_faults.run_fault_detection(self.video, detector=StubDetector(), use_cache=False)
+
+        fault = FaultRecord.objects.order_by("frame_index").first()
+        self.assertEqual((fault.fault_name, fault.class_index, fault.frame_index), ("stub_defect", 0, 0))
+
+        detection = fault.detections.get()
+        self.assertEqual(detection.model_version, "stub")
+        self.assertAlmostEqual(detection.confidence, 0.9, places=5)
+        self.assertLess(detection.x1, detection.x2)
+        self.assertLess(detection.y1, detection.y2)
+
+        response = self.client.get("/api/faults/", {"class_index": 0, "min_confidence": 0.5})
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(len(response.json()[0]["detections"]), 1)
+        self.assertEqual(len(self.client.get("/api/faults/", {"min_confidence": 0.95}).json()), 0)
+
+    def test_overlay_is_rendered_on_demand_and_cached(self):
+        from . import detect_faults
+        from .overlays import overlay_path
+
+        with override_settings(MEDIA_ROOT=self.tmp), mock.patch.object(detect_faults, "output_dir", self.tmp), \
+                mock.patch.object(detect_faults.notify_fault, "delay"):
+            detect_faults.run_fault_detection(self.video, detector=StubDetector(), use_cache=False)
+            fault = FaultRecord.objects.order_by("frame_index").first()
+            path = overlay_path(fault.id)
+            self.assertFalse(os.path.exists(path))
+
+            response = self.client.get(f"/faults/{fault.id}/overlay.jpg")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "image/jpeg")
+            self.assertTrue(os.path.exists(path))
+
+            # The saved frame stays clean; only the overlay has the box drawn on
+            raw = cv2.imread(os.path.join(self.tmp, str(fault.image)))
+            overlay = cv2.imread(path)
+            self.assertGreater(np.abs(raw.astype(int) - overlay.astype(int)).sum(), 0)
+
+            fault.delete()
+            self.assertFalse(os.path.exists(path))
+
+from .models import LabelSuggestion
+from . import prelabel
+from . import labels
+
+class PrelabelTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.images = os.path.join(self.tmp, "images")
+        self.labels = os.path.join(self.tmp, "labels")
+        os.makedirs(self.images)
+        os.makedirs(self.labels)
+        frame = np.zeros((100, 200, 3), dtype=np.uint8)
+        frame[20:60, 50:90] = (0, 0, 255)
+        cv2.imwrite(os.path.join(self.images, "a.png"), frame)
+        cv2.imwrite(os.path.join(self.images, "b.png"), frame)
+        open(os.path.join(self.labels, "b.txt"), "w").close()  # labelled as background
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_unlabeled_images_get_cached_suggestions(self):
+        self.assertEqual(prelabel.unlabeled_images(self.images, self.labels), ["a.png"])
+        # The labels paired with the given images, not the default dataset's
+        self.assertEqual(prelabel.unlabeled_images(self.images), ["a.png"])
+        with override_settings(DATASET_ROOT=os.path.join(self.tmp, "elsewhere")):
+            self.assertEqual(prelabel.prelabel_images(images_dir=self.images, detector=StubDetector()), 1)
+        LabelSuggestion.objects.all().delete()
+
+        detector = StubDetector()
+        self.assertEqual(prelabel.prelabel_images(["a.png"], images_dir=self.images, detector=detector), 1)
+        with mock.patch.object(detector, "detect") as detect:
+            self.assertEqual(prelabel.prelabel_images(["a.png"], images_dir=self.images, detector=detector), 0)
+        detect.assert_not_called()
+
+        # The annotate window offers the stored boxes for unlabelled images only
+        labels.register_images(["a.png", "b.png"], self.images, self.labels)
+        with mock.patch("faults.labels.model_version", return_value="stub"):
+            window = {entry["name"]: entry for entry in labels.annotation_window(0, 10)}
+        self.assertTrue(window["a.png"]["suggested"])
+        self.assertFalse(window["b.png"]["suggested"])
+        (box,) = window["a.png"]["boxes"]
+        self.assertEqual(box["cls"], 0)
+        self.assertAlmostEqual(box["x_center"], 69.5 / 200)
+        self.assertAlmostEqual(box["height"], 39 / 100)
+        with mock.patch("faults.labels.model_version", return_value="retrained"):
+            window = {entry["name"]: entry for entry in labels.annotation_window(0, 10)}
+        self.assertFalse(window["a.png"]["suggested"])
+        self.assertEqual(window["a.png"]["boxes"], [])
+
+from . import train_cache
+
+class TrainingImageCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        for sub in ("images", "labels"):
+            os.makedirs(os.path.join(self.tmp, "dataset", "train", sub))
+        cv2.imwrite(self.image("a.jpg"), np.full((720, 1280, 3), 128, dtype=np.uint8))
+        with open(os.path.join(self.tmp, "dataset", "train", "labels", "a.txt"), "w") as f:
+            f.write("0 0.5 0.5 0.1 0.1\n")
+        with open(os.path.join(self.tmp, "dataset", "data.yaml"), "w") as f:
+            f.write("train: train/images\nval: val/images\nnc: 1\nnames: [crack]\n")
+        self.settings = override_settings(
+            BASE_DIR=self.tmp, DATASET_ROOT=os.path.join(self.tmp, "dataset"),
+            TRAINING_IMAGE_CACHE={"enabled": True, "dir": os.path.join(self.tmp, "cache"), "imgsz": 320},
+        )
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def image(self, name):
+        return os.path.join(self.tmp, "dataset", "train", "images", name)
+
+    def test_sync_resizes_incrementally_and_evicts(self):
+        data_yaml, stats = train_cache.sync_training_cache()
+        self.assertEqual(stats["cached"], 1)
+        cached = os.path.join(self.tmp, "cache", "320", "train", "images", "a.npy")
+        self.assertEqual(np.load(cached).shape, (180, 320, 3))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, "cache", "320", "train", "labels", "a.txt")))
+        self.assertEqual(os.path.dirname(data_yaml), os.path.join(self.tmp, "cache", "320"))
+
+        _, stats = train_cache.sync_training_cache()
+        self.assertEqual((stats["cached"], stats["unchanged"]), (0, 1))
+
+        os.remove(self.image("a.jpg"))
+        _, stats = train_cache.sync_training_cache()
+        self.assertEqual(stats["evicted"], 1)
+        self.assertFalse(os.path.exists(cached))
+
+import yaml
+from . import curation
+
+class CurationTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.images = os.path.join(self.tmp, "train", "images")
+        self.labels = os.path.join(self.tmp, "train", "labels")
+        os.makedirs(self.images)
+        os.makedirs(self.labels)
+        rng = np.random.default_rng(0)
+        scene = rng.integers(0, 255, (64, 64, 3), dtype=np.uint8)
+        for i in range(4):  # the same defect seen in four consecutive frames
+            self.add(f"crack_{i}.png", scene + i, "0 0.5 0.5 0.2 0.2\n" * (2 if i == 2 else 1))
+        self.add("crack_other.png", rng.integers(0, 255, (64, 64, 3), dtype=np.uint8), "0 0.5 0.5 0.2 0.2\n")
+        self.add("bg_0.png", scene, "")
+        self.add("bg_1.png", scene, "")
+        with open(os.path.join(self.tmp, "data.yaml"), "w") as f:
+            f.write("train: train/images\nval: val/images\nnc: 1\nnames: [crack]\n")
+        self.cache_dir = tempfile.mkdtemp()
+        self.settings = override_settings(TRAINING_IMAGE_CACHE={"enabled": False, "dir": self.cache_dir})
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def add(self, name, image, labels):
+        cv2.imwrite(os.path.join(self.images, name), image)
+        with open(os.path.join(self.labels, os.path.splitext(name)[0] + ".txt"), "w") as f:
+            f.write(labels)
+
+    def test_keeps_representatives_per_cluster_and_class(self):
+        kept, report = curation.curate(self.images, self.labels, max_per_cluster=1)
+        # Most-labelled frame of the duplicate run, the distinct frame, one background
+        self.assertEqual(kept, ["bg_0.png", "crack_2.png", "crack_other.png"])
+        self.assertEqual(report["classes"]["0"], {"images": 5, "clusters": 2, "kept": 2, "pruned": 3})
+        self.assertEqual(report["pruned_images"], 4)
+
+    def test_curated_yaml_lists_kept_images(self):
+        with override_settings(BASE_DIR=self.tmp, DATASET_ROOT=os.path.join(self.tmp, "dataset")):
+            curated_yaml, _ = curation.write_curated_dataset(
+                os.path.join(self.tmp, "data.yaml"), {"max_per_cluster": 1, "hamming_threshold": 8},
+            )
+        with open(curated_yaml) as f:
+            data = yaml.safe_load(f)
+        with open(data["train"]) as f:
+            self.assertEqual(len(f.read().split()), 3)
+        self.assertEqual(data["path"], self.tmp)
+        # Nothing is written into the dataset
+        self.assertTrue(curated_yaml.startswith(self.cache_dir))
+        self.assertNotIn("data_curated.yaml", os.listdir(self.tmp))
+        with open(os.path.join(os.path.dirname(curated_yaml), "curation_report.json")) as f:
+            self.assertEqual(json_lib.load(f)["kept_images"], 3)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, "faults", "runs")))
+        self.assertEqual(sorted(os.listdir(os.path.join(self.tmp, "train"))), ["images", "labels"])
+
+from django.core.cache import cache
+from .models import FaultClass
+from . import class_registry
+
+class ClassRegistryTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.tmp, "dataset", "train", "labels"))
+        with open(os.path.join(self.tmp, "dataset", "train", "labels", "classes.txt"), "w") as f:
+            f.write("crack\nOHE_wire\n")
+        self.settings = override_settings(BASE_DIR=self.tmp, DATASET_ROOT=os.path.join(self.tmp, "dataset"))
+        self.settings.enable()
+        cache.delete(class_registry.VERSION_KEY)
+
+    def tearDown(self):
+        self.settings.disable()
+        cache.delete(class_registry.VERSION_KEY)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_imports_classes_txt_and_serves_snapshot(self):
+        self.assertEqual(class_registry.get_classes(), ["crack", "OHE_wire"])
+        with self.assertNumQueries(0):
+            self.assertEqual(class_registry.get_classes(), ["crack", "OHE_wire"])
+
+    def test_add_class_regenerates_files_once(self):
+        added, names = class_registry.add_class("bolt_missing")
+        self.assertTrue(added)
+        self.assertEqual(names, ["crack", "OHE_wire", "bolt_missing"])
+        self.assertEqual(FaultClass.objects.get(name="bolt_missing").index, 2)
+
+        with open(class_registry.data_yaml()) as f:
+            data = yaml.safe_load(f)
+        self.assertEqual((data["nc"], data["names"][-1]), (3, "bolt_missing"))
+        with open(class_registry.classes_txt()) as f:
+            self.assertEqual(f.read().split(), names)
+
+        self.assertEqual(class_registry.add_class("crack"), (False, names))
+        self.assertFalse(class_registry.write_dataset_files())
+
+from django.db import connection
+from django.urls import reverse
+from .models import DatasetImage
+
+class BulkLabelSaveTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.images = os.path.join(self.tmp, "dataset", "train", "images")
+        self.labels = os.path.join(self.tmp, "dataset", "train", "labels")
+        os.makedirs(self.images)
+        os.makedirs(self.labels)
+        with open(os.path.join(self.labels, "classes.txt"), "w") as f:
+            f.write("crack\nOHE_wire\n")
+        for name in ("a.jpg", "b.jpg"):
+            open(os.path.join(self.images, name), "wb").close()
+        self.settings = override_settings(BASE_DIR=self.tmp, DATASET_ROOT=os.path.join(self.tmp, "dataset"))
+        self.settings.enable()
+        cache.delete(class_registry.VERSION_KEY)
+
+    def tearDown(self):
+        self.settings.disable()
+        cache.delete(class_registry.VERSION_KEY)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def post(self, items):
+        return self.client.post(reverse("faults:save_labels_bulk"), json_lib.dumps({"items": items}),
+                                content_type="application/json")
+
+    def test_batch_written_atomically_with_one_notification(self):
+        box = {"cls": 1, "x_center": 0.5, "y_center": 0.5, "width": 0.2, "height": 0.1}
+        with mock.patch("faults.views.notify_new_labels_for_training") as notify:
+            response = self.post([{"image_name": "a.jpg", "boxes": [box, box]}, {"image_name": "b.jpg", "boxes": []}])
+        self.assertEqual(response.json(), {"status": "saved", "saved": 2})
+        notify.assert_called_once()
+
+        with open(os.path.join(self.labels, "a.txt")) as f:
+            self.assertEqual(f.read(), "1 0.5 0.5 0.2 0.1\n" * 2)
+        self.assertEqual(os.path.getsize(os.path.join(self.labels, "b.txt")), 0)
+        self.assertFalse([n for n in os.listdir(self.labels) if n.endswith(".tmp")])
+        self.assertEqual(
+            dict(DatasetImage.objects.values_list("name", "box_count")), {"a.jpg": 2, "b.jpg": 0},
+        )
+
+    def test_invalid_batch_writes_nothing(self):
+        good = {"cls": 0, "x_center": 0.5, "y_center": 0.5, "width": 0.2, "height": 0.1}
+        with mock.patch("faults.views.notify_new_labels_for_training") as notify:
+            response = self.post([
+                {"image_name": "a.jpg", "boxes": [good]},
+                {"image_name": "b.jpg", "boxes": [dict(good, cls=7, width=1.5)]},
+                {"image_name": "../x.jpg", "boxes": []},
+            ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["errors"]
+        self.assertEqual(set(errors), {"b.jpg", "#2"})
+        self.assertEqual(len(errors["b.jpg"]), 2)
+        notify.assert_not_called()
+        self.assertFalse(os.path.exists(os.path.join(self.labels, "a.txt")))
+        self.assertFalse(DatasetImage.objects.exists())
+
+    def test_upsert_without_conflict_target_on_mysql(self):
+        # MySQL: supports_update_conflicts_with_target is False and unique_fields is refused
+        box = {"cls": 0, "x_center": 0.5, "y_center": 0.5, "width": 0.2, "height": 0.1}
+        with mock.patch.object(connection.features, "supports_update_conflicts_with_target", False), \
+                mock.patch.object(DatasetImage.objects, "bulk_create") as bulk_create:
+            labels.save_label_batch([{"image_name": "a.jpg", "boxes": [box]}])
+            labels.register_images(["b.jpg"])
+        self.assertEqual(bulk_create.call_count, 2)
+        for call in bulk_create.call_args_list:
+            self.assertTrue(call.kwargs["update_conflicts"])
+            self.assertNotIn("unique_fields", call.kwargs)
+
+    def test_window_reads_manifest_and_version_tracks_saves(self):
+        os.utime(os.path.join(self.images, "a.jpg"), (1, 1))
+        with open(os.path.join(self.labels, "b.txt"), "w") as f:
+            f.write("0 0.5 0.5 0.2 0.1\n")
+        self.assertEqual(labels.sync_manifest(), (2, 0))
+        self.assertEqual(labels.sync_manifest(), (0, 0))
+
+        url = reverse("faults:annotate_window")
+        with mock.patch("faults.labels.model_version", return_value="stub"):
+            data = self.client.get(url, {"idx": 0, "k": 5}).json()
+        self.assertEqual(data["total"], 2)
+        # Newest first; b.jpg's label file was parsed once, at sync time
+        self.assertEqual([(e["idx"], e["name"], e["labelled"]) for e in data["images"]],
+                         [(0, "b.jpg", True), (1, "a.jpg", False)])
+        self.assertEqual(data["images"][0]["boxes"][0]["cls"], 0)
+
+        box = {"cls": 1, "x_center": 0.5, "y_center": 0.5, "width": 0.2, "height": 0.1}
+        with mock.patch("faults.views.notify_new_labels_for_training"):
+            self.post([{"image_name": "a.jpg", "boxes": [box]}])
+        with mock.patch("faults.labels.model_version", return_value="stub"):
+            later = self.client.get(url, {"idx": 1, "k": 1}).json()
+        self.assertNotEqual(later["version"], data["version"])
+        self.assertEqual(later["images"][0]["boxes"], [box])
+
+class FileServingTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        with open(os.path.join(self.tmp, "clip.mp4"), "wb") as f:
+            f.write(bytes(range(100)))
+        os.makedirs(os.path.join(self.tmp, ".spill"))
+        open(os.path.join(self.tmp, ".spill", "x.jpg"), "wb").close()
+        self.settings = override_settings(MEDIA_ROOT=self.tmp, DATASET_ROOT=self.tmp, VIDEO_UPLOAD_DIR=self.tmp)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_etag_and_ranges(self):
+        response = self.client.get("/media/clip.mp4")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(100)))
+        # Frames are written once under unique names
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+        # Dataset files are edited in place
+        self.assertEqual(self.client.get("/dataset/clip.mp4")["Cache-Control"], "no-cache")
+        etag = response["ETag"]
+
+        self.assertEqual(self.client.get("/media/clip.mp4", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        partial = self.client.get("/media/clip.mp4", HTTP_RANGE="bytes=10-19")
+        self.assertEqual((partial.status_code, partial["Content-Range"]), (206, "bytes 10-19/100"))
+        self.assertEqual(b"".join(partial.streaming_content), bytes(range(10, 20)))
+        suffix = self.client.get("/media/clip.mp4", HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(suffix.streaming_content), bytes(range(95, 100)))
+        self.assertEqual(self.client.get("/media/clip.mp4", HTTP_RANGE="bytes=200-").status_code, 416)
+        # A stale If-Range gets the whole file
+        stale = self.client.get("/media/clip.mp4", HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+
+    def test_hidden_paths_and_accel(self):
+        self.assertEqual(self.client.get("/media/.spill/x.jpg").status_code, 404)
+        self.assertEqual(self.client.get("/media/../settings.py").status_code, 404)
+        # Recorded videos need a signed-in user
+        self.assertEqual(self.client.get("/videos/clip.mp4").status_code, 403)
+        self.client.force_login(User.objects.create_user("operator"))
+        video = self.client.get("/videos/clip.mp4", HTTP_RANGE="bytes=0-9")
+        self.assertEqual((video.status_code, video["Cache-Control"]), (206, "no-cache"))
+
+        accel = {"accel": "nginx", "internal_prefix": "/_protected/", "immutable_max_age": 60}
+        with override_settings(FILE_SERVING=accel):
+            response = self.client.get("/media/clip.mp4")
+        self.assertEqual(response["X-Accel-Redirect"], "/_protected/media/clip.mp4")
+        self.assertEqual(response.content, b"")
+
+from . import confirm
+
+class ConfirmFaultJobTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.media = os.path.join(self.tmp, "media")
+        os.makedirs(self.media)
+        frame = np.zeros((64, 64, 3), dtype=np.uint8)
+        frame[8:40, 8:40] = 255
+        for name in ("a.jpg", "b.jpg"):
+            cv2.imwrite(os.path.join(self.media, name), frame)
+        cv2.imwrite(os.path.join(self.media, "other.jpg"), np.tile(np.arange(64, dtype=np.uint8) * 4, (64, 1)))
+        self.faults = [FaultRecord.objects.create(image=name) for name in ("a.jpg", "b.jpg", "other.jpg")]
+        self.settings = override_settings(
+            BASE_DIR=self.tmp, DATASET_ROOT=os.path.join(self.tmp, "dataset"), MEDIA_ROOT=self.media,
+            TRAINING_IMAGE_CACHE={"enabled": False},
+        )
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_no_moves_duplicates_in_batches_and_reports_progress(self):
+        with mock.patch.object(confirm, "BATCH_SIZE", 1), mock.patch.object(confirm, "publish") as publish, \
+                mock.patch("faults.train_faults.notify_new_labels_for_training") as notify:
+            response = self.client.post(
+                reverse("faults:confirm_fault", args=[self.faults[0].id]), {"action": "no"},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.json()["job_id"])
+        result = response.json()["result"]
+        self.assertEqual(sorted(result["copied_ids"]), [self.faults[0].id, self.faults[1].id])
+        notify.assert_called_once()
+
+        events = [call.args[0] for call in publish.call_args_list]
+        self.assertEqual([e["event"] for e in events], ["confirm.progress"] * 3 + ["confirm.done"])
+        self.assertEqual([(e["done"], e["total"]) for e in events[1:3]], [(1, 2), (2, 2)])
+
+        # Moved, not copied: the media frames are gone, the records too
+        images = os.path.join(self.tmp, "dataset", "train", "images")
+        self.assertEqual(sorted(os.listdir(images)), ["a.jpg", "b.jpg"])
+        self.assertEqual(sorted(os.listdir(self.media)), ["other.jpg"])
+        self.assertEqual(list(FaultRecord.objects.values_list("image", flat=True)), ["other.jpg"])
+        self.assertEqual(os.path.getsize(os.path.join(self.tmp, "dataset", "train", "labels", "a.txt")), 0)
+        self.assertEqual(DatasetImage.objects.filter(labelled_at__isnull=False).count(), 2)
+
+    def test_invalid_action_is_rejected_before_queueing(self):
+        with mock.patch("faults.views.confirm_fault_job") as job:
+            response = self.client.post(
+                reverse("faults:confirm_fault", args=[self.faults[0].id]), {"action": "maybe"},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 400)
+        job.delay.assert_not_called()
+
+    def test_vanished_frame_is_skipped(self):
+        os.remove(os.path.join(self.media, "b.jpg"))
+        with mock.patch.object(confirm, "BATCH_SIZE", 3):
+            moved_ids, names = confirm.move_into_dataset(self.faults[:2], "no")
+        self.assertEqual((moved_ids, names), ([self.faults[0].id], ["a.jpg"]))
+        # Both rows are gone; the moved frame is in the dataset only
+        self.assertEqual(list(FaultRecord.objects.values_list("image", flat=True)), ["other.jpg"])
+        self.assertEqual(os.listdir(os.path.join(self.tmp, "dataset", "train", "images")), ["a.jpg"])
+        self.assertEqual(sorted(os.listdir(self.media)), ["other.jpg"])
+
+        # Nothing left to move is a 404
+        os.remove(os.path.join(self.media, "other.jpg"))
+        with self.assertRaises(confirm.ConfirmError) as raised:
+            confirm.move_into_dataset(self.faults[2:], "no")
+        self.assertEqual(raised.exception.status, 404)
+        self.assertFalse(FaultRecord.objects.exists())
+
+from datetime import timedelta
+from django.utils import timezone
+from .models import FaultCluster
+from . import clustering
+
+class FaultClusteringTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.media = os.path.join(self.tmp, "media")
+        os.makedirs(self.media)
+        square = np.zeros((64, 64, 3), dtype=np.uint8)
+        square[8:40, 8:40] = 255
+        gradient = np.tile(np.arange(64, dtype=np.uint8) * 4, (64, 1))
+        self.settings = override_settings(
+            BASE_DIR=self.tmp, DATASET_ROOT=os.path.join(self.tmp, "dataset"), MEDIA_ROOT=self.media,
+            TRAINING_IMAGE_CACHE={"enabled": False},
+            FAULT_CLUSTERING={"hamming_threshold": 8, "window_seconds": 600},
+        )
+        self.settings.enable()
+
+        now = timezone.now()
+        self.faults = {}
+        for name, frame, class_index, age in [
+            ("a", square, 0, 0), ("b", square, 0, 60), ("c", square, 0, 120),
+            ("gradient", gradient, 0, 30), ("other_class", square, 1, 30), ("next_day", square, 0, 86400),
+        ]:
+            cv2.imwrite(os.path.join(self.media, f"{name}.jpg"), frame)
+            fault = FaultRecord.objects.create(image=f"{name}.jpg", class_index=class_index)
+            FaultRecord.objects.filter(id=fault.id).update(timestamp=now - timedelta(seconds=age))
+            self.faults[name] = fault
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_clusters_by_hash_class_and_time(self):
+        self.assertEqual(clustering.run_clustering(), 6)
+        self.assertEqual(clustering.run_clustering(), 0)
+
+        clusters = {
+            frozenset(FaultRecord.objects.filter(cluster=c).values_list("image", flat=True)) for c in FaultCluster.objects.all()
+        }
+        self.assertEqual(clusters, {
+            frozenset({"a.jpg", "b.jpg", "c.jpg"}), frozenset({"gradient.jpg"}),
+            frozenset({"other_class.jpg"}), frozenset({"next_day.jpg"}),
+        })
+
+        data = self.client.get(reverse("faults:cluster_list")).json()
+        sizes = sorted((c["size"], c["representative"]["image"].rsplit("/", 1)[-1]) for c in data)
+        self.assertEqual(sizes[-1], (3, "c.jpg"))  # the oldest member represents the cluster
+
+    def test_overlapping_run_is_requeued(self):
+        from .tasks import cluster_faults
+
+        cache.add(clustering.LOCK_KEY, True, 60)
+        try:
+            with mock.patch.object(cluster_faults, "apply_async") as apply_async:
+                # Eager Celery (settings_bench) would re-enter under the lock: skipped
+                self.assertEqual(clustering.run_clustering(), 0)
+                apply_async.assert_not_called()
+                with mock.patch.object(clustering, "_eager", return_value=False):
+                    self.assertEqual(clustering.run_clustering(), 0)
+                apply_async.assert_called_once_with(countdown=clustering.QUEUE_DELAY)
+            self.assertFalse(FaultCluster.objects.exists())
+        finally:
+            cache.delete(clustering.LOCK_KEY)
+            cache.delete(clustering.QUEUED_KEY)
+        self.assertEqual(clustering.run_clustering(), 6)
+        self.assertIsNone(cache.get(clustering.LOCK_KEY))
+
+    def test_confirm_whole_cluster(self):
+        clustering.run_clustering()
+        cluster = FaultRecord.objects.get(id=self.faults["a"].id).cluster
+        with mock.patch("faults.train_faults.notify_new_labels_for_training"):
+            response = self.client.post(
+                reverse("faults:confirm_cluster", args=[cluster.id]), {"action": "no"}, content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["result"]["count"], 3)
+        self.assertFalse(FaultCluster.objects.filter(id=cluster.id).exists())
+        self.assertEqual(FaultRecord.objects.count(), 3)
+
+import time
+import tarfile
+from .models import ArchiveBatch, FaultDailySummary
+from . import retention
+
+class RetentionTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.media = os.path.join(self.tmp, "media")
+        self.videos = os.path.join(self.tmp, "videos")
+        os.makedirs(self.media)
+        os.makedirs(self.videos)
+        self.policy = {
+            "archive_dir": os.path.join(self.tmp, "archive"), "batch_size": 2, "max_batches": 5,
+            "faults": {"resolved": 30, "needs_feedback": None, "pending": None}, "videos_days": 14,
+        }
+        self.settings = override_settings(MEDIA_ROOT=self.media, VIDEO_UPLOAD_DIR=self.videos, RETENTION=self.policy)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def fault(self, name, status, age_days):
+        with open(os.path.join(self.media, name), "wb") as f:
+            f.write(b"jpeg")
+        fault = FaultRecord.objects.create(image=name, status=status, class_index=0, fault_name="crack")
+        FaultRecord.objects.filter(id=fault.id).update(timestamp=timezone.now() - timedelta(days=age_days))
+        return fault
+
+    def test_old_resolved_data_is_archived_in_batches(self):
+        for i in range(3):
+            self.fault(f"old{i}.jpg", "resolved", 40)
+        self.fault("old_pending.jpg", "pending", 40)
+        self.fault("recent.jpg", "resolved", 1)
+        old_video = os.path.join(self.videos, "old.mp4")
+        open(old_video, "wb").close()
+        os.utime(old_video, (time.time() - 20 * 86400,) * 2)
+        open(os.path.join(self.videos, "new.mp4"), "wb").close()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = retention.apply_retention()
+        self.assertEqual(stats["faults:resolved"], 3)
+        self.assertEqual(stats["videos"], 1)
+
+        self.assertEqual(sorted(FaultRecord.objects.values_list("image", flat=True)), ["old_pending.jpg", "recent.jpg"])
+        self.assertFalse(TaskStatus.objects.filter(fault__isnull=True).exists())
+        self.assertEqual(sorted(os.listdir(self.media)), ["old_pending.jpg", "recent.jpg"])
+        self.assertEqual(os.listdir(self.videos), ["new.mp4"])
+        self.assertEqual(FaultDailySummary.objects.get().count, 3)
+
+        batches = ArchiveBatch.objects.filter(kind="faults").order_by("id")
+        self.assertEqual([b.items for b in batches], [2, 1])
+        with tarfile.open(batches[0].path) as tar:
+            names = tar.getnames()
+            rows = tar.extractfile("rows.jsonl").read().decode().splitlines()
+        self.assertEqual(sorted(names), ["media/old0.jpg", "media/old1.jpg", "rows.jsonl"])
+        self.assertEqual(sum('"faults.taskstatus"' in row for row in rows), 2)
+
+    def test_unreviewed_faults_are_kept_and_frames_go_on_commit(self):
+        self.fault("unreviewed.jpg", "needs_feedback", 90)
+        self.fault("done.jpg", "resolved", 90)
+        with self.captureOnCommitCallbacks() as callbacks:
+            stats = retention.apply_retention()
+        self.assertEqual(stats, {"faults:resolved": 1, "videos": 0})
+        self.assertEqual(list(FaultRecord.objects.values_list("image", flat=True)), ["unreviewed.jpg"])
+        # The frame is only removed once the transaction commits
+        self.assertIn("done.jpg", os.listdir(self.media))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(os.listdir(self.media), ["unreviewed.jpg"])
+
+from . import view_cache
+
+class ViewCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_list_api_is_cached_until_a_fault_changes(self):
+        FaultRecord.objects.create(image="a.jpg", fault_name="crack", class_index=0)
+        url = reverse("faults:fault_list")
+        self.assertEqual(len(self.client.get(url).json()), 1)
+
+        # update() sends no signal: the cached list is served
+        FaultRecord.objects.update(fault_name="renamed")
+        self.assertEqual(self.client.get(url).json()[0]["fault_name"], "crack")
+
+        FaultRecord.objects.create(image="b.jpg", fault_name="crack", class_index=0)
+        body = self.client.get(url).json()
+        self.assertEqual(len(body), 2)
+        self.assertIn("renamed", [f["fault_name"] for f in body])
+
+    def test_concurrent_miss_waits_for_the_builder(self):
+        compute = mock.Mock(return_value=[1])
+        key = view_cache.entry_key("x", ("faults",), view_cache.generations(("faults",)))
+        cache.add(f"{key}:lock", True, 30)
+        with override_settings(VIEW_CACHE={"enabled": True, "timeout": 300, "lock_timeout": 30, "lock_wait": 0.1}):
+            # The builder never finishes: fall back to computing
+            self.assertEqual(view_cache.cached("test", "x", ("faults",), compute), [1])
+            cache.delete(f"{key}:lock")
+            view_cache.cached("test", "x", ("faults",), compute)
+            self.assertEqual(view_cache.cached("test", "x", ("faults",), compute), [1])
+        self.assertEqual(compute.call_count, 2)
+
+from . import loadtest
+
+class LoadTestTest(TransactionTestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    def test_seed_and_drive_views(self):
+        loadtest.seed_faults(45, images=3)
+        self.assertEqual(loadtest.seeded_count(), 45)
+        self.assertEqual(TaskStatus.objects.count(), 45)
+        self.assertEqual(len(os.listdir(os.path.join(self.media, loadtest.SEED_DIR))), 48)
+
+        results = loadtest.run_load_test(
+            ["dashboard", "fault_list", "confirm_fault"], requests=6, concurrency=2, use_cache=False,
+        )
+        for stats in results.values():
+            self.assertEqual(stats["requests"], 6)
+            self.assertEqual(stats["errors"], 0)
+            self.assertLessEqual(stats["p50_ms"], stats["p99_ms"])
+        self.assertGreater(results["dashboard"]["queries_max"], 0)
+        # confirm_fault jobs are only queued: the seeded faults are left alone
+        self.assertEqual(loadtest.seeded_count(), 45)
+
+class AsyncApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        fault = FaultRecord.objects.create(image="a.jpg", fault_name="crack", class_index=1, status="assigned")
+        Detection.objects.create(fault=fault, class_index=1, confidence=0.97, x1=0, y1=0, x2=5, y2=5)
+        FaultRecord.objects.create(image="b.jpg", fault_name="crack", class_index=0)
+
+    async def test_async_views_match_the_sync_ones(self):
+        for sync_name, async_name, query in (
+            ("faults:fault_list", "faults:fault_list_async", {"min_confidence": 0.9}),
+            ("faults:task_list", "faults:task_list_async", {}),
+            ("faults:fault_stats", "faults:fault_stats_async", {}),
+        ):
+            sync_response = await self.async_client.get(reverse(sync_name), query)
+            async_response = await self.async_client.get(reverse(async_name), query)
+            self.assertEqual(async_response.status_code, 200)
+            self.assertEqual(async_response.json(), sync_response.json())
+
+        stats = (await self.async_client.get(reverse("faults:fault_stats_async"))).json()
+        self.assertEqual(stats["faults"], {"total": 2, "pending": 1, "assigned": 1, "resolved": 0})
+        response = await self.async_client.post(reverse("faults:task_list_async"))
+        self.assertEqual(response.status_code, 405)
+
+    async def test_health_checks(self):
+        self.assertEqual((await self.async_client.get(reverse("faults:health_live"))).status_code, 200)
+        response = await self.async_client.get(reverse("faults:health_ready"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()["checks"]), {"database", "cache"})
+
+        with mock.patch("faults.async_views._ping_database", side_effect=RuntimeError("down")):
+            response = await self.async_client.get(reverse("faults:health_ready"))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["checks"]["database"]["error"], "down")
+
+from . import whatsapp
+
+class WhatsAppLoggingTest(SimpleTestCase):
+    def test_phone_number_is_masked_in_logs(self):
+        response = mock.Mock(status_code=200)
+        with override_settings(WHATSAPP_API_URL="https://example.invalid", WHATSAPP_ACCESS_TOKEN="t", SITE_URL=""), \
+                mock.patch.object(whatsapp.requests, "post", return_value=response), \
+                self.assertLogs("faults.whatsapp", "INFO") as logs:
+            self.assertTrue(whatsapp.send_whatsapp_message("919876543210", "fault"))
+        self.assertEqual(logs.records[0].recipient, "********3210")
+        self.assertNotIn("919876543210", str(logs.records[0].__dict__))
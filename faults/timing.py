@@ -0,0 +1,56 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Collects wall-clock durations per named stage of the detection path
+    (decode, infer, annotate, queue_wait, save). Safe to share between the
+    detection loop and the save queue threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self):
+        """Count, total and p50/p90/p99 in milliseconds for every stage."""
+        with self._lock:
+            samples = {k: sorted(v) for k, v in self.samples.items()}
+
+        report = {}
+        for stage, values in samples.items():
+            def pct(p):
+                return round(values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000, 3)
+
+            report[stage] = {
+                "count": len(values),
+                "total_s": round(sum(values), 4),
+                "p50_ms": pct(50),
+                "p90_ms": pct(90),
+                "p99_ms": pct(99),
+            }
+        return report
+
+
+@contextmanager
+def maybe_stage(timer, name):
+    """timer.stage(name) when a timer is given, otherwise a no-op."""
+    if timer is None:
+        yield
+    else:
+        with timer.stage(name):
+            yield
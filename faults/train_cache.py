@@ -0,0 +1,158 @@
+import os
+import time
+import shutil
+import logging
+import cv2
+import yaml
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+SPLITS = ("train", "val")
+
+
+# ----------------------------------------
+# Layout
+# ----------------------------------------
+# dataset/.cache/<imgsz>/ mirrors dataset/ with every image shrunk to the
+# training size. Next to each resized image sits an uncompressed .npy of
+# the same pixels: ultralytics loads an image's .npy instead of decoding
+# it when the .npy is newer, so epochs skip JPEG decoding and resizing.
+def dataset_root():
+    return str(settings.DATASET_ROOT)
+
+
+def cache_root(imgsz):
+    return os.path.join(str(settings.TRAINING_IMAGE_CACHE["dir"]), str(imgsz))
+
+
+def cached_data_yaml(imgsz):
+    return os.path.join(cache_root(imgsz), "data.yaml")
+
+
+def _is_stale(target, source):
+    return not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source)
+
+
+# ----------------------------------------
+# Images
+# ----------------------------------------
+def resize_for_training(image, imgsz):
+    """Scale so the long side is imgsz, the same resize ultralytics applies when loading."""
+    h, w = image.shape[:2]
+    r = imgsz / max(h, w)
+    if r == 1:
+        return image
+    interpolation = cv2.INTER_LINEAR if r > 1 else cv2.INTER_AREA
+    return cv2.resize(image, (min(imgsz, round(w * r)), min(imgsz, round(h * r))), interpolation=interpolation)
+
+
+def cache_image(source, target, imgsz):
+    """Write the resized image and its .npy; returns False if the source is unreadable."""
+    image = cv2.imread(source)
+    if image is None:
+        logger.warning("Could not read training image", extra={"image": source})
+        return False
+
+    resized = resize_for_training(image, imgsz)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    cv2.imwrite(target, resized, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    # Written after the image so the .npy is never older than it
+    np.save(os.path.splitext(target)[0] + ".npy", resized, allow_pickle=False)
+    return True
+
+
+def cache_images(names, imgsz=None, split="train"):
+    """Add or refresh specific images (e.g. right after confirm_fault copies them)."""
+    if not settings.TRAINING_IMAGE_CACHE.get("enabled"):
+        return 0
+    imgsz = imgsz or settings.TRAINING_IMAGE_CACHE["imgsz"]
+    source_dir = os.path.join(dataset_root(), split, "images")
+    target_dir = os.path.join(cache_root(imgsz), split, "images")
+    cached = 0
+    for name in names:
+        source = os.path.join(source_dir, name)
+        target = os.path.join(target_dir, name)
+        if os.path.exists(source) and _is_stale(target, source) and cache_image(source, target, imgsz):
+            cached += 1
+    return cached
+
+
+# ----------------------------------------
+# Sync
+# ----------------------------------------
+def _sync_split(split, imgsz, stats):
+    source_images = os.path.join(dataset_root(), split, "images")
+    source_labels = os.path.join(dataset_root(), split, "labels")
+    target_images = os.path.join(cache_root(imgsz), split, "images")
+    target_labels = os.path.join(cache_root(imgsz), split, "labels")
+    if not os.path.isdir(source_images):
+        return
+    os.makedirs(target_images, exist_ok=True)
+    os.makedirs(target_labels, exist_ok=True)
+
+    names = {n for n in os.listdir(source_images) if n.lower().endswith(IMAGE_EXTENSIONS)}
+    for name in names:
+        source = os.path.join(source_images, name)
+        target = os.path.join(target_images, name)
+        if not _is_stale(target, source):
+            stats["unchanged"] += 1
+        elif cache_image(source, target, imgsz):
+            stats["cached"] += 1
+
+    # Evict images removed from the dataset
+    for name in os.listdir(target_images):
+        stem, ext = os.path.splitext(name)
+        if ext == ".npy":
+            continue
+        if name not in names:
+            os.remove(os.path.join(target_images, name))
+            try:
+                os.remove(os.path.join(target_images, stem + ".npy"))
+            except FileNotFoundError:
+                pass
+            stats["evicted"] += 1
+
+    # Labels are normalized, so they are valid for the resized images as is
+    if os.path.isdir(source_labels):
+        label_names = {n for n in os.listdir(source_labels) if n.endswith(".txt")}
+        for name in label_names:
+            source = os.path.join(source_labels, name)
+            target = os.path.join(target_labels, name)
+            if _is_stale(target, source):
+                shutil.copy2(source, target)
+        for name in os.listdir(target_labels):
+            if name.endswith(".txt") and name not in label_names:
+                os.remove(os.path.join(target_labels, name))
+
+    # ultralytics keeps a labels .cache next to the labels dir; it revalidates
+    # it by file hash, so it can stay
+
+
+def sync_training_cache(imgsz=None, data_yaml=None):
+    """
+    Bring the resized mirror of the dataset up to date: cache new or changed
+    images, evict removed ones, copy labels, and write a data.yaml pointing
+    at the mirror. Returns (path of that data.yaml, stats).
+    """
+    imgsz = imgsz or settings.TRAINING_IMAGE_CACHE["imgsz"]
+    data_yaml = data_yaml or os.path.join(dataset_root(), "data.yaml")
+    started = time.perf_counter()
+    stats = {"cached": 0, "unchanged": 0, "evicted": 0}
+
+    for split in SPLITS:
+        _sync_split(split, imgsz, stats)
+
+    # Same splits and class names; relative paths now resolve inside the cache
+    with open(data_yaml, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    data.pop("path", None)
+    target_yaml = cached_data_yaml(imgsz)
+    with open(target_yaml, "w", encoding="utf-8") as f:
+        yaml.safe_dump(data, f, sort_keys=False)
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info("Training image cache synced", extra={"imgsz": imgsz, **stats})
+    return target_yaml, stats
@@ -1,16 +1,22 @@
 import os
+import time
+import logging
 import threading
 from django.conf import settings
 from ultralytics import YOLO
+from .inference import BEST_PT, load_detection_model, export_models, clear_detectors, model_version
+from .result_cache import invalidate_stale
+from .train_cache import sync_training_cache
+from .curation import write_curated_dataset
+from .class_registry import write_dataset_files
+from . import metrics
+
+logger = logging.getLogger(__name__)
 
 # ----------------------------------------
 # CONFIG
 # ----------------------------------------
-DATA_YAML = os.path.join(settings.BASE_DIR, "dataset", "data.yaml")
-BEST_PT = os.path.join(
-    settings.BASE_DIR,
-    "faults", "runs", "detect", "yolov8n-custom4", "weights", "best.pt"
-)
+DATA_YAML = os.path.join(settings.DATASET_ROOT, "data.yaml")
 
 AUTO_TRAIN_THRESHOLD = 1  # Train ONLY when total labels >= 1
 
@@ -25,8 +31,8 @@ class YoloTrainingManager:
     # Load latest model once
     # ----------------------------------------
     def _load_model(self):
-        print(f"[AutoTrain] Loading model: {BEST_PT}")
-        return YOLO(BEST_PT)
+        logger.info("Loading model: %s", BEST_PT)
+        return load_detection_model()
 
     # ----------------------------------------
     # Always get latest model for detection
@@ -39,49 +45,95 @@ class YoloTrainingManager:
     # Count REAL label files and trigger training
     # ----------------------------------------
     def check_label_threshold(self):
-        labels_dir = os.path.join(settings.BASE_DIR, "dataset", "train", "labels")
+        labels_dir = os.path.join(settings.DATASET_ROOT, "train", "labels")
         os.makedirs(labels_dir, exist_ok=True)
 
         label_files = [f for f in os.listdir(labels_dir) if f.endswith(".txt")]
         total_labels = len(label_files)
 
-        print(f"[AutoTrain] Label Count Now: {total_labels}")
+        logger.info("Label count now: %d", total_labels)
 
         if total_labels >= AUTO_TRAIN_THRESHOLD and not self.is_training:
-            print("🚀 Label threshold reached — starting training!")
+            logger.info("Label threshold reached, starting training")
             self.is_training = True
             threading.Thread(target=self._run_train, daemon=True).start()
 
+    # ----------------------------------------
+    # Epoch timing (compare runs with and without the image cache)
+    # ----------------------------------------
+    def _time_epochs(self, model, image_cache):
+        epoch_started = {}
+
+        def on_epoch_start(trainer):
+            epoch_started["t"] = time.perf_counter()
+
+        def on_epoch_end(trainer):
+            seconds = time.perf_counter() - epoch_started.pop("t", time.perf_counter())
+            metrics.TRAINING_EPOCH_SECONDS.labels(image_cache=image_cache).observe(seconds)
+            logger.info(
+                "Epoch done",
+                extra={"epoch": trainer.epoch + 1, "epoch_s": round(seconds, 2), "image_cache": image_cache},
+            )
+
+        model.add_callback("on_train_epoch_start", on_epoch_start)
+        model.add_callback("on_train_epoch_end", on_epoch_end)
+
     # ----------------------------------------
     # Silent background YOLO training
     # ----------------------------------------
     def _run_train(self):
+        started = time.perf_counter()
+        outcome = "failed"
         try:
-            print("🔧 Auto-Training started silently…")
+            logger.info("Auto-training started")
 
             model = YOLO(BEST_PT)
 
+            # No-op unless classes were added since data.yaml was last written
+            write_dataset_files()
+
+            imgsz = settings.TRAINING_IMAGE_CACHE["imgsz"]
+            data_yaml = DATA_YAML
+            cache_enabled = settings.TRAINING_IMAGE_CACHE.get("enabled")
+            if cache_enabled:
+                data_yaml, _ = sync_training_cache(imgsz, DATA_YAML)
+            if settings.TRAINING_CURATION.get("enabled"):
+                data_yaml, _ = write_curated_dataset(data_yaml)
+            self._time_epochs(model, "on" if cache_enabled else "off")
+
             model.train(
-                data=DATA_YAML,
+                data=data_yaml,
                 project=os.path.join(settings.BASE_DIR, "faults", "runs", "detect"),
                 name="yolov8n-custom4",
                 exist_ok=True,
                 epochs=30,
-                imgsz=640,
+                imgsz=imgsz,
                 batch=8,
                 device=0 if os.name != "nt" else "cpu"  # GPU if Linux
             )
 
-            print("🎯 Training complete — Reloading updated weights!")
+            logger.info("Exporting CPU runtime models")
+            export_models(BEST_PT)
+
+            logger.info("Training complete, reloading updated weights")
             with self.lock:
-                self.model = YOLO(BEST_PT)
+                self.model = load_detection_model()
+            clear_detectors()
+            # Cached detections of the old weights can never be hit again
+            invalidate_stale(model_version())
+            outcome = "succeeded"
 
-        except Exception as e:
-            print(f"❌ TRAINING ERROR: {e}")
+        except Exception:
+            logger.exception("Training error")
 
         finally:
             self.is_training = False
-            print("⏳ Training done — waiting for more labels…")
+            duration = time.perf_counter() - started
+            metrics.TRAINING_DURATION.labels(outcome=outcome).observe(duration)
+            logger.info(
+                "Training done, waiting for more labels",
+                extra={"outcome": outcome, "duration_s": round(duration, 1)},
+            )
 
 
 # ---------------------------------------------------
@@ -1,6 +1,7 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 from .views import annotate_view, save_labels, add_new_class
+from .metrics import metrics_view
 
 
 
@@ -17,6 +18,8 @@ urlpatterns = [
 
     path("annotate/", views.annotate_view, name="annotate"),
     path("save_labels/", views.save_labels, name="save_labels"),
+    path("api/labels/bulk/", views.save_labels_bulk, name="save_labels_bulk"),
+    path("api/annotate/window/", views.annotate_window_api, name="annotate_window"),
     path("add-class/", add_new_class, name="add_class"),
 
 
@@ -33,8 +36,25 @@ urlpatterns = [
     # Fault-related APIs
     path("api/faults/", views.FaultListView.as_view(), name="fault_list"),
     path("api/faults/<int:pk>/confirm/", views.confirm_fault, name="confirm_fault"),
+    path("api/confirm-jobs/<str:job_id>/", views.confirm_job_status, name="confirm_job"),
+    path("api/clusters/", views.FaultClusterListView.as_view(), name="cluster_list"),
+    path("api/clusters/<int:pk>/confirm/", views.confirm_cluster, name="confirm_cluster"),
+    path("faults/<int:pk>/overlay.jpg", views.fault_overlay, name="fault_overlay"),
 
 
     # Task-related APIs
     path("api/tasks/", views.TaskStatusListView.as_view(), name="task_list"),
+    path("api/stats/", views.fault_stats, name="fault_stats"),
+
+    # Async versions of the read-heavy APIs (ASGI)
+    path("api/async/faults/", async_views.fault_list, name="fault_list_async"),
+    path("api/async/tasks/", async_views.task_list, name="task_list_async"),
+    path("api/async/stats/", async_views.fault_stats, name="fault_stats_async"),
+
+    # Load balancer / orchestrator probes
+    path("health/live/", async_views.health_live, name="health_live"),
+    path("health/ready/", async_views.health_ready, name="health_ready"),
+
+    # Prometheus scrape endpoint
+    path("metrics", metrics_view, name="metrics"),
 ]
@@ -0,0 +1,202 @@
+import time
+import asyncio
+import hashlib
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Entries are keyed by the current generation of every scope ("faults",
+# "tasks") they were built from, so bumping a scope's generation (from the
+# model signals) orphans exactly those entries; they then expire on their
+# own.
+MISSING = object()
+POLL_INTERVAL = 0.05
+
+
+# ----------------------------------------
+# Generations
+# ----------------------------------------
+def _generation_key(scope):
+    return f"view_cache:generation:{scope}"
+
+
+def _new_generation():
+    # Time based, so a generation lost to eviction restarts above any
+    # generation old entries were stored under
+    return int(time.time() * 1000)
+
+
+def generations(scopes):
+    """Current generation of each scope, in one cache round trip."""
+    keys = {scope: _generation_key(scope) for scope in scopes}
+    found = cache.get_many(list(keys.values()))
+    current = {}
+    for scope, key in keys.items():
+        if key not in found:
+            cache.add(key, _new_generation(), None)
+            found[key] = cache.get(key, 0)
+        current[scope] = found[key]
+    return current
+
+
+def _bump(scope):
+    key = _generation_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, _new_generation(), None):
+            cache.incr(key)
+
+
+def invalidate(*scopes):
+    """
+    Orphan the entries built from `scopes`. Bumped now, for this process's
+    next read, and again on commit, so nothing read from the uncommitted
+    state by another request outlives the transaction.
+    """
+    if not settings.VIEW_CACHE["enabled"]:
+        return
+
+    def bump():
+        for scope in scopes:
+            try:
+                _bump(scope)
+            except Exception as e:
+                logger.warning("Could not invalidate the view cache: %s", e)
+
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+# ----------------------------------------
+# Lookup
+# ----------------------------------------
+def entry_key(name, scopes, generation):
+    digest = hashlib.md5(name.encode("utf-8")).hexdigest()
+    stamp = ".".join(str(generation[scope]) for scope in scopes)
+    return f"view_cache:{digest}:{stamp}"
+
+
+def cached(view, name, scopes, compute):
+    """
+    compute() through the cache, under `name` for the current generation
+    of `scopes`. On a miss, one caller computes while the others wait for
+    its result (up to lock_wait seconds) instead of all hitting the
+    database at once. Outcomes are counted per view in
+    faults_view_cache_requests_total.
+    """
+    options = settings.VIEW_CACHE
+    if not options["enabled"]:
+        return compute()
+
+    try:
+        key = entry_key(name, scopes, generations(scopes))
+        value = cache.get(key, MISSING)
+    except Exception as e:
+        logger.warning("View cache unavailable: %s", e)
+        metrics.VIEW_CACHE_REQUESTS.labels(view=view, result="error").inc()
+        return compute()
+
+    if value is not MISSING:
+        metrics.VIEW_CACHE_REQUESTS.labels(view=view, result="hit").inc()
+        return value
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, True, options["lock_timeout"]):
+        try:
+            value = compute()
+            cache.set(key, value, options["timeout"])
+        finally:
+            cache.delete(lock_key)
+        metrics.VIEW_CACHE_REQUESTS.labels(view=view, result="miss").inc()
+        return value
+
+    # Another request is building this entry
+    deadline = time.monotonic() + options["lock_wait"]
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = cache.get(key, MISSING)
+        if value is not MISSING:
+            metrics.VIEW_CACHE_REQUESTS.labels(view=view, result="wait").inc()
+            return value
+    metrics.VIEW_CACHE_REQUESTS.labels(view=view, result="timeout").inc()
+    return compute()
+
+
+async def agenerations(scopes):
+    keys = {scope: _generation_key(scope) for scope in scopes}
+    found = await cache.aget_many(list(keys.values()))
+    current = {}
+    for scope, key in keys.items():
+        if key not in found:
+            await cache.aadd(key, _new_generation(), None)
+            found[key] = await cache.aget(key, 0)
+        current[scope] = found[key]
+    return current
+
+
+async def acached(view, name, scopes, compute):
+    """cached() for async views; `compute` is a coroutine function."""
+    options = settings.VIEW_CACHE
+    if not options["enabled"]:
+        return await compute()
+
+    try:
+        key = entry_key(name, scopes, await agenerations(scopes))
+        value = await cache.aget(key, MISSING)
+    except Exception as e:
+        logger.warning("View cache unavailable: %s", e)
+        metrics.VIEW_CACHE_REQUESTS.labels(view=view, result="error").inc()
+        return await compute()
+
+    if value is not MISSING:
+        metrics.VIEW_CACHE_REQUESTS.labels(view=view, result="hit").inc()
+        return value
+
+    lock_key = f"{key}:lock"
+    if await cache.aadd(lock_key, True, options["lock_timeout"]):
+        try:
+            value = await compute()
+            await cache.aset(key, value, options["timeout"])
+        finally:
+            await cache.adelete(lock_key)
+        metrics.VIEW_CACHE_REQUESTS.labels(view=view, result="miss").inc()
+        return value
+
+    deadline = time.monotonic() + options["lock_wait"]
+    while time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        value = await cache.aget(key, MISSING)
+        if value is not MISSING:
+            metrics.VIEW_CACHE_REQUESTS.labels(view=view, result="wait").inc()
+            return value
+    metrics.VIEW_CACHE_REQUESTS.labels(view=view, result="timeout").inc()
+    return await compute()
+
+
+# ----------------------------------------
+# API views
+# ----------------------------------------
+class CachedListMixin:
+    """
+    Cache a ListAPIView's serialized data per absolute URL (host and query
+    string included: image URLs are absolute). Set cache_scopes to the
+    data the view reads.
+    """
+    cache_scopes = ("faults",)
+
+    def list(self, request, *args, **kwargs):
+        view = type(self).__name__
+
+        def build():
+            data = super(CachedListMixin, self).list(request, *args, **kwargs).data
+            # Plain containers: the DRF ReturnList holds on to its serializer
+            return list(data) if isinstance(data, list) else dict(data)
+
+        return Response(cached(view, f"api:{view}:{request.build_absolute_uri()}", self.cache_scopes, build))
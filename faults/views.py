@@ -1,7 +1,7 @@
 from .train_faults import notify_new_labels_for_training, get_detection_model
 from .detect_faults import run_fault_detection
 import threading
-from django.core.paginator import Paginator
+from django.core.paginator import Page, Paginator
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse
 from django.contrib import messages
@@ -9,72 +9,41 @@ from django.views.decorators.http import require_POST
 from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
-from .models import FaultRecord, TaskStatus
-from .serializers import FaultRecordSerializer, TaskStatusSerializer
+from .models import FaultRecord, FaultCluster, TaskStatus, DatasetImage
+from .serializers import FaultRecordSerializer, FaultClusterSerializer, TaskStatusSerializer
 from django.views.decorators.csrf import csrf_exempt
+from celery.result import AsyncResult, EagerResult
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 import os
-import yaml
 import subprocess
-import shutil
 import hashlib
 import sys
-import time
 import json
+import logging
+from collections import Counter
+from . import metrics
+from .overlays import render_overlay
+from .files import serve_path
+from .class_registry import add_class, get_classes
+from .labels import (
+    MAX_BATCH, validate_batch, save_label_batch, sync_manifest,
+    dataset_version, annotation_window,
+)
+from .tasks import confirm_fault_job, confirm_cluster_job
+from .clustering import cluster_queryset
+from .view_cache import CachedListMixin, cached
+from .queries import fault_queryset, task_queryset, status_counts, build_stats
 
-# perceptual hashing
-from PIL import Image
-import imagehash
+logger = logging.getLogger(__name__)
 
-# -----------------------------
-# Perceptual hash function
-# -----------------------------
-def compute_phash(filepath):
-    try:
-        return imagehash.phash(Image.open(filepath))
-    except:
-        return None
-
-
-
-
-# ------------------------------
-# Helper: Append classes + update data.yaml
-# ------------------------------
-def update_yaml_after_labeling():
-    base_dir = settings.BASE_DIR  # do NOT add "dataset" here
-    dataset_dir = os.path.join(base_dir, "dataset")
-
-    yaml_path = os.path.join(dataset_dir, "data.yaml")
-    classes_path = os.path.join(dataset_dir, "train", "labels", "classes.txt")
-
-    time.sleep(1)
 
-    if not os.path.exists(classes_path):
-        print("⚠️ classes.txt not found!")
-        return
-
-    with open(classes_path, "r", encoding="utf-8") as f:
-        classes = [line.strip() for line in f if line.strip()]
-
-    yaml_data = {
-        "train": "train/images",
-        "val": "val/images",
-        "nc": len(classes),
-        "names": classes
-    }
-
-    with open(yaml_path, "w", encoding="utf-8") as f:
-        yaml.safe_dump(yaml_data, f, sort_keys=False)
-
-    print("✅ data.yaml updated (relative paths)")
 
 
 # ---------------------- CUSTOM PATH -------------------------
 # Yaha apna dataset folder access ho raha hai
-DATASET_DIR = os.path.join(settings.BASE_DIR, "dataset", "train", "images")
-LABELS_DIR = os.path.join(settings.BASE_DIR, "dataset", "train", "labels")
+DATASET_DIR = os.path.join(settings.DATASET_ROOT, "train", "images")
+LABELS_DIR = os.path.join(settings.DATASET_ROOT, "train", "labels")
 
 os.makedirs(LABELS_DIR, exist_ok=True)
 
@@ -96,83 +65,62 @@ def add_new_class(request):
     if not new_class:
         return JsonResponse({"error": "Empty class name"}, status=400)
 
-    classes_file = os.path.join(LABELS_DIR, "classes.txt")
-
-    # Load existing classes
-    with open(classes_file, "r") as f:
-        classes = [line.strip() for line in f.readlines()]
-
-    if new_class in classes:
+    # The registry regenerates classes.txt and data.yaml when the list changes
+    added, classes = add_class(new_class)
+    if not added:
         return JsonResponse({"status": "exists", "classes": classes})
 
-    # Append new class
-    with open(classes_file, "a") as f:
-        f.write(new_class + "\n")
-
-    # Update data.yaml
-    update_yaml_after_labeling()
-
-    classes.append(new_class)
-
     return JsonResponse({"status": "added", "classes": classes})
 
 # -----------------------------
 # Annotate View (Updated)
 # -----------------------------
-def annotate_view(request):
-    images_dir = os.path.join(settings.BASE_DIR, "dataset/train/images")
-    labels_dir = os.path.join(settings.BASE_DIR, "dataset/train/labels")
+ANNOTATE_WINDOW = 5
 
-    images = sorted(os.listdir(images_dir), key=lambda x: os.path.getmtime(os.path.join(images_dir, x)), reverse=True)
 
-    total = len(images)
-    idx = int(request.GET.get("idx", 0))
+def annotate_view(request):
+    # One directory listing per page load; navigation after that goes
+    # through annotate_window_api
+    sync_manifest()
+    total = DatasetImage.objects.count()
+    idx = min(max(int(request.GET.get("idx", 0)), 0), max(total - 1, 0))
 
     if total == 0:
         return render(request, "annotate.html", {"no_images": True})
 
-    image_name = images[idx]
-    image_url = settings.DATASET_URL + f"train/images/{image_name}"
-
-    # ---- Load existing YOLO labels ----
-    label_file = os.path.splitext(image_name)[0] + ".txt"
-    label_path = os.path.join(labels_dir, label_file)
-
-    existing_boxes = []
-
-    if os.path.exists(label_path):
-        with open(label_path, "r") as f:
-            for line in f.readlines():
-                cls, xc, yc, w, h = map(float, line.split())
-                existing_boxes.append({
-                    "cls": int(cls),
-                    "x_center": xc,
-                    "y_center": yc,
-                    "width": w,
-                    "height": h
-                })
-
-    # ---- Load classes dynamically from file ----
-    classes_path = os.path.join(settings.BASE_DIR, "dataset", "train", "labels", "classes.txt")
-
-    labels_list = []
-    if os.path.exists(classes_path):
-        with open(classes_path, "r") as f:
-            labels_list = [line.strip() for line in f.readlines()]
+    entry = annotation_window(idx, 1)[0]
 
     context = {
-        "image_name": image_name,
-        "image_url": image_url,
+        "image_name": entry["name"],
+        "image_url": entry["url"],
         "idx": idx,
         "total": total,
-        "labels": labels_list,
-        "existing_boxes": json.dumps(existing_boxes),
+        "labels": get_classes(),
+        "existing_boxes": json.dumps(entry["boxes"]),
+        "suggested": entry["suggested"],
+        "dataset_version": dataset_version(),
+        "window_size": ANNOTATE_WINDOW,
         "no_images": False
     }
 
     return render(request, "annotate.html", context)
 
 
+def annotate_window_api(request):
+    """The next `k` images from `idx` with their boxes, for the annotate UI to prefetch."""
+    try:
+        idx = max(int(request.GET.get("idx", 0)), 0)
+        k = int(request.GET.get("k", ANNOTATE_WINDOW))
+    except ValueError:
+        return JsonResponse({"error": "idx and k must be integers"}, status=400)
+
+    return JsonResponse({
+        "version": dataset_version(),
+        "total": DatasetImage.objects.count(),
+        "images": annotation_window(idx, k),
+    })
+
+
 @csrf_exempt
 def save_labels(request):
     """Save YOLO style annotations (.txt)"""
@@ -183,17 +131,43 @@ def save_labels(request):
     image_name = data["image_name"]
     boxes = data["boxes"]
 
-    label_path = os.path.join(LABELS_DIR, os.path.splitext(image_name)[0] + ".txt")
-
-    with open(label_path, "w") as f:
-        for b in boxes:
-            f.write(f"{b['cls']} {b['x_center']} {b['y_center']} {b['width']} {b['height']}\n")
+    save_label_batch([{"image_name": image_name, "boxes": boxes}])
 
     notify_new_labels_for_training()
 
     return JsonResponse({"status": "saved"})
 
 
+@csrf_exempt
+def save_labels_bulk(request):
+    """
+    Save the labels of many images in one request:
+    {"items": [{"image_name": ..., "boxes": [...]}, ...]}. The whole batch
+    is validated first; nothing is written if any item is invalid.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=400)
+
+    try:
+        items = json.loads(request.body.decode("utf-8")).get("items")
+    except (ValueError, AttributeError):
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    if not isinstance(items, list) or not items:
+        return JsonResponse({"error": "items must be a non-empty list"}, status=400)
+    if len(items) > MAX_BATCH:
+        return JsonResponse({"error": f"At most {MAX_BATCH} items per batch"}, status=400)
+
+    errors = validate_batch(items)
+    if errors:
+        return JsonResponse({"status": "invalid", "errors": errors}, status=400)
+
+    saved = save_label_batch(items)
+    # One threshold check for the whole batch instead of one per image
+    notify_new_labels_for_training()
+
+    return JsonResponse({"status": "saved", "saved": saved})
+
+
 # ------------------------------
 # HOME & CONTROL VIEWS
 # ------------------------------
@@ -202,7 +176,11 @@ def home(request):
 
 
 def controls(request):
-    return render(request, "controls.html")
+    return render(request, "controls.html", {
+        "profiles": list(settings.INFERENCE_PROFILES),
+        "default_profile": settings.DEFAULT_INFERENCE_PROFILE,
+        "cameras": list(settings.CAMERA_ROIS),
+    })
 
 
 # ------------------------------
@@ -222,6 +200,8 @@ def start_capture(request):
 @require_POST
 def start_detect(request):
     video_file = request.FILES.get("video_file")
+    profile = request.POST.get("profile") or None
+    camera = request.POST.get("camera") or None
     video_path = None
 
     if video_file:
@@ -233,7 +213,7 @@ def start_detect(request):
                 f.write(chunk)
 
     try:
-        threading.Thread(target=run_fault_detection, args=(video_path,), daemon=True).start()
+        threading.Thread(target=run_fault_detection, args=(video_path, profile, camera), daemon=True).start()
         messages.success(request, "Fault detection started ✅")
     except Exception as e:
         messages.error(request, f"Failed to start detection: {e}")
@@ -248,66 +228,141 @@ def start_detect(request):
 # DASHBOARD & STATUS
 # ------------------------------
 def dashboard(request):
-    all_faults = FaultRecord.objects.filter(confirmed=False).order_by("-timestamp")
-    all_tasks = TaskStatus.objects.select_related("fault").all().order_by("-timestamp")
+    with metrics.observe(metrics.DASHBOARD_QUERY_SECONDS, view="dashboard"):
+        context = _dashboard_context(request)
+    return render(request, "dashboard.html", context)
+
+
+def _class_from_filename(file_path, known_classes):
+    """Guess the class of a legacy record from its image filename."""
+    fault_name = os.path.splitext(os.path.basename(file_path))[0]
+
+    # Try to find any known class name inside filename
+    for cls in known_classes:
+        if cls.lower() in fault_name.lower():
+            return cls
+
+    # If no match found, fallback to cleaned filename
+    # Remove numbers and extra underscores
+    fault_name_cleaned = "".join([ch for ch in fault_name if not ch.isdigit()])
+    parts = fault_name_cleaned.split("_")
+    return parts[-1] if len(parts) > 0 else "Unknown"
+
+
+def _page_number(request, param):
+    try:
+        return int(request.GET.get(param, 1))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _page_entry(paginator, number):
+    """What a cached page keeps: its items, not the whole object list."""
+    page = paginator.get_page(number)
+    return {"items": list(page.object_list), "number": page.number, "count": paginator.count}
+
 
-    # Load known fault class names from classes.txt
-    classes_file = os.path.join(settings.BASE_DIR, "dataset", "train", "labels", "classes.txt")
-    known_classes = []
-    if os.path.exists(classes_file):
-        with open(classes_file, "r") as f:
-            known_classes = [line.strip() for line in f if line.strip()]
+def _restore_page(entry, per_page):
+    return Page(entry["items"], entry["number"], Paginator(range(entry["count"]), per_page))
 
+
+def _fault_cards():
+    """Dashboard cards (one per cluster) and status counts of the pending faults on disk."""
+    all_faults = FaultRecord.objects.filter(confirmed=False).select_related("cluster").order_by("-timestamp")
+
+    known_classes = None
     valid_faults = []
     for fault in all_faults:
         if fault.image:
             file_path = os.path.join(settings.MEDIA_ROOT, str(fault.image))
             if os.path.exists(file_path):
-                filename = os.path.basename(file_path)
-                fault_name = os.path.splitext(filename)[0]
-
-                # Try to find any known class name inside filename
-                detected_class = None
-                for cls in known_classes:
-                    if cls.lower() in fault_name.lower():
-                        detected_class = cls
-                        break
-
-                # If no match found, fallback to cleaned filename
-                if not detected_class:
-                    # Remove numbers and extra underscores
-                    fault_name_cleaned = "".join([ch for ch in fault_name if not ch.isdigit()])
-                    parts = fault_name_cleaned.split("_")
-                    detected_class = parts[-1] if len(parts) > 0 else "Unknown"
-
-                fault.display_name = detected_class
+                if fault.fault_name:
+                    fault.display_name = fault.fault_name
+                else:
+                    # Records from before the detector stored the class
+                    if known_classes is None:
+                        known_classes = get_classes()
+                    fault.display_name = _class_from_filename(file_path, known_classes)
                 valid_faults.append(fault)
 
+    # One card per near-duplicate cluster: its representative (or, until
+    # clustering re-picks one, its newest member still on disk)
+    cluster_sizes = Counter(f.cluster_id for f in valid_faults if f.cluster_id)
+    representatives = {
+        f.cluster_id: f for f in valid_faults if f.cluster_id and f.cluster.representative_id == f.id
+    }
+    shown, seen_clusters = [], set()
+    for fault in valid_faults:
+        if fault.cluster_id is None:
+            fault.cluster_size = 1
+            shown.append(fault)
+        elif fault.cluster_id not in seen_clusters:
+            seen_clusters.add(fault.cluster_id)
+            card = representatives.get(fault.cluster_id, fault)
+            card.cluster_size = cluster_sizes[fault.cluster_id]
+            shown.append(card)
+
     # Count stats
-    total_count = len(valid_faults)
-    pending_count = len([f for f in valid_faults if f.status == "pending"])
-    assigned_count = len([f for f in valid_faults if f.status == "assigned"])
-    resolved_count = len([f for f in valid_faults if f.status == "resolved"])
-
-    # Paginate
-    fault_paginator = Paginator(valid_faults, 20)
-    faults = fault_paginator.get_page(request.GET.get("fault_page"))
-
-    task_paginator = Paginator(all_tasks, 10)
-    tasks = task_paginator.get_page(request.GET.get("task_page"))
-
-    return render(request, "dashboard.html", {
-        "faults": faults,
-        "tasks": tasks,
-        "total_count": total_count,
-        "pending_count": pending_count,
-        "assigned_count": assigned_count,
-        "resolved_count": resolved_count,
-    })
+    stats = {
+        "total_count": len(valid_faults),
+        "pending_count": len([f for f in valid_faults if f.status == "pending"]),
+        "assigned_count": len([f for f in valid_faults if f.status == "assigned"]),
+        "resolved_count": len([f for f in valid_faults if f.status == "resolved"]),
+    }
+    return shown, stats
+
+
+def _dashboard_context(request):
+    """Stats and pages come from the view cache; a miss builds the cards once for both."""
+    cards = []
+
+    def load():
+        if not cards:
+            cards.extend(_fault_cards())
+        return cards
+
+    fault_page = _page_number(request, "fault_page")
+    task_page = _page_number(request, "task_page")
+    stats = cached("dashboard", "dashboard:stats", ("faults",), lambda: load()[1])
+    faults = cached(
+        "dashboard", f"dashboard:faults:{fault_page}", ("faults",),
+        lambda: _page_entry(Paginator(load()[0], 20), fault_page),
+    )
+    tasks = cached(
+        "dashboard", f"dashboard:tasks:{task_page}", ("faults", "tasks"),
+        lambda: _page_entry(
+            Paginator(TaskStatus.objects.select_related("fault").all().order_by("-timestamp"), 10), task_page,
+        ),
+    )
+
+    return {
+        "faults": _restore_page(faults, 20),
+        "tasks": _restore_page(tasks, 10),
+        **stats,
+    }
 
 
 
+def fault_overlay(request, pk):
+    """The fault's frame with its detection boxes drawn on, rendered once and cached."""
+    fault = get_object_or_404(FaultRecord, pk=pk)
+    path = render_overlay(fault)
+    if path is None:
+        raise Http404("Image missing")
+    # Re-rendered in place when the frame changes, so revalidated by ETag
+    return serve_path(request, path, mount="media", relative=os.path.relpath(path, settings.MEDIA_ROOT))
+
+
 def task_status(request):
+    page = _page_number(request, "task_page")
+    entry = cached(
+        "task_status", f"task_status:{page}", ("faults", "tasks"),
+        lambda: _page_entry(Paginator(_task_rows(), 10), page),
+    )
+    return render(request, "task_status.html", {"tasks": _restore_page(entry, 10)})
+
+
+def _task_rows():
     all_tasks = TaskStatus.objects.select_related("fault").all().order_by("-timestamp")
     valid_tasks = []
 
@@ -325,116 +380,97 @@ def task_status(request):
         else:
             task.display_name = "Unknown"
             valid_tasks.append(task)
-
-    paginator = Paginator(valid_tasks, 10)
-    tasks = paginator.get_page(request.GET.get("task_page"))
-    return render(request, "task_status.html", {"tasks": tasks})
+    return valid_tasks
 
 # ------------------------------
 # API VIEWS
 # ------------------------------
-class FaultListView(generics.ListAPIView):
-    queryset = FaultRecord.objects.all().order_by("-timestamp")
+class FaultListView(CachedListMixin, generics.ListAPIView):
+    """
+    Faults, newest first. Optional filters: ?class_index=N and
+    ?min_confidence=0.8 (any detection of the fault at or above it).
+    """
     serializer_class = FaultRecordSerializer
 
+    def get_queryset(self):
+        return fault_queryset(self.request.query_params)
 
-class TaskStatusListView(generics.ListAPIView):
-    queryset = TaskStatus.objects.select_related("fault").all().order_by("-timestamp")
+
+class FaultClusterListView(CachedListMixin, generics.ListAPIView):
+    """Near-duplicate clusters of pending faults, newest first: one representative each, with the cluster size."""
+    serializer_class = FaultClusterSerializer
+
+    def get_queryset(self):
+        queryset = cluster_queryset().prefetch_related("representative__detections")
+        class_index = self.request.query_params.get("class_index")
+        if class_index not in (None, ""):
+            queryset = queryset.filter(class_index=class_index)
+        return queryset
+
+
+class TaskStatusListView(CachedListMixin, generics.ListAPIView):
+    cache_scopes = ("tasks",)
+    queryset = task_queryset()
     serializer_class = TaskStatusSerializer
 
 
+@api_view(["GET"])
+def fault_stats(request):
+    """Pending faults and tasks by status (the dashboard counters, from the DB alone)."""
+    def build():
+        faults, tasks = status_counts()
+        return build_stats(list(faults), list(tasks))
+
+    return Response(cached("fault_stats", "api:stats", ("faults", "tasks"), build))
+
+
 
 
 # -----------------------------
 # CONFIRM FAULT (YES / NO)
 # -----------------------------
+def _queue_confirm(job, target_id, action):
+    if action not in ("yes", "no"):
+        return Response({"error": "Invalid action"}, status=400)
+
+    try:
+        result = job.delay(target_id, action)
+    except Exception:
+        logger.exception("Could not queue fault confirmation", extra={"target_id": target_id})
+        return Response({"error": "Job queue unavailable"}, status=503)
+
+    body = {"job_id": result.id, "status_url": reverse("faults:confirm_job", args=[result.id])}
+    if isinstance(result, EagerResult):  # ran inline (CELERY_TASK_ALWAYS_EAGER)
+        body["result"] = result.result
+    return Response(body, status=202)
+
+
 @api_view(["POST"])
 def confirm_fault(request, pk):
+    """
+    Queue the YES/NO confirmation and return its job id at once. Progress
+    and the outcome are pushed over ws/faults/ and served at status_url.
+    """
+    get_object_or_404(FaultRecord, pk=pk)
+    return _queue_confirm(confirm_fault_job, pk, request.data.get("action"))
 
-    fault = get_object_or_404(FaultRecord, pk=pk)
-    action = request.data.get("action")
-
-    dataset_images = os.path.join(settings.BASE_DIR, "dataset", "train", "images")
-    dataset_labels = os.path.join(settings.BASE_DIR, "dataset", "train", "labels")
-    os.makedirs(dataset_images, exist_ok=True)
-    os.makedirs(dataset_labels, exist_ok=True)
-
-    # target image
-    target_path = os.path.join(settings.MEDIA_ROOT, str(fault.image))
-    if not os.path.exists(target_path):
-        fault.delete()
-        return Response({"error": "Image missing"}, status=404)
-
-    # compute perceptual hash
-    target_phash = compute_phash(target_path)
-    if target_phash is None:
-        return Response({"error": "Hash error"}, status=500)
-
-    # threshold for similarity (0-64)
-    SIMILARITY_THRESHOLD = 8
-
-    duplicate_records = []
-
-    # scan all records for visual duplicates
-    for rec in FaultRecord.objects.all():
-        img_path = os.path.join(settings.MEDIA_ROOT, str(rec.image))
-
-        if os.path.exists(img_path):
-            ph = compute_phash(img_path)
-            if ph is not None:
-                diff = target_phash - ph  # Hamming distance
-                if diff <= SIMILARITY_THRESHOLD:
-                    duplicate_records.append(rec)
-
-    if not duplicate_records:
-        return Response({"error": "No visually similar images found"}, status=404)
-
-    copied_ids = []
-    copied_count = 0
-
-    # copy matching images
-    for rec in duplicate_records:
-        src = os.path.join(settings.MEDIA_ROOT, str(rec.image))
-        dst = os.path.join(dataset_images, os.path.basename(src))
-
-        shutil.copy(src, dst)
-        copied_ids.append(rec.id)
-        copied_count += 1
-
-        if action == "no":
-            txt = os.path.splitext(os.path.basename(src))[0] + ".txt"
-            open(os.path.join(dataset_labels, txt), "w").close()
-
-    # delete all duplicates from DB
-    FaultRecord.objects.filter(id__in=copied_ids).delete()
-
-    # YES → annotation
-    if action == "yes":
-        #classes_txt = os.path.join(dataset_labels, "classes.txt")
-
-        # Run labelImg and wait for user to finish labeling
-        #process = subprocess.Popen(["labelImg", dataset_images, classes_txt], shell=True)
-        #process.wait()  # ⚠️ wait until annotation window is closed
-
-        # Now update YAML after labeling is done
-        #update_yaml_after_labeling()
-
-        #notify_new_labels_for_training()
-        return Response({
-            "message": f"{copied_count} visually similar images sent for annotation.",
-            "count": copied_count,
-            "copied_ids": copied_ids,
-            "redirect": "/annotate/?idx=0"
-        })
-
-    # NO → auto training
-    if action == "no":
-        notify_new_labels_for_training()
-
-        return Response({
-            "message": f"{copied_count} visually similar images auto-labeled as background.",
-            "count": copied_count,
-            "copied_ids": copied_ids
-        })
-
-    return Response({"error": "Invalid action"}, status=400)
\ No newline at end of file
+
+@api_view(["POST"])
+def confirm_cluster(request, pk):
+    """confirm_fault for every pending member of a near-duplicate cluster."""
+    get_object_or_404(FaultCluster, pk=pk)
+    return _queue_confirm(confirm_cluster_job, pk, request.data.get("action"))
+
+
+@api_view(["GET"])
+def confirm_job_status(request, job_id):
+    """Polling fallback for clients without the WebSocket."""
+    job = AsyncResult(job_id)
+    body = {"job_id": job_id, "state": job.state}
+    if job.state == "PROGRESS":
+        body.update(job.info or {})
+    elif job.successful():
+        body["result"] = job.result
+    elif job.failed():
+        body["error"] = "Job failed"
+    return Response(body)
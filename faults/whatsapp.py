@@ -1,5 +1,16 @@
+import logging
 import requests
 from django.conf import settings
+from faults import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def mask_phone(phone_number) -> str:
+    """Keep only the last 4 digits, so logs identify the recipient without exposing the number."""
+    digits = str(phone_number or "")
+    return "*" * max(len(digits) - 4, 0) + digits[-4:]
+
 
 def send_whatsapp_message(phone_number: str = None, message: str = "", image_path: str = None) -> bool:
     """
@@ -19,7 +30,7 @@ def send_whatsapp_message(phone_number: str = None, message: str = "", image_pat
         if phone_number is None:
             phone_number = getattr(settings, "WHATSAPP_DEFAULT_NUMBER", None)
             if not phone_number:
-                print("❌ No phone number provided and WHATSAPP_DEFAULT_NUMBER not set in settings.")
+                logger.error("No phone number provided and WHATSAPP_DEFAULT_NUMBER not set in settings.")
                 return False
 
         # Construct API request
@@ -46,15 +57,19 @@ def send_whatsapp_message(phone_number: str = None, message: str = "", image_pat
             payload["type"] = "text"
             payload["text"] = {"body": message}
 
-        response = requests.post(url, headers=headers, json=payload)
+        with metrics.observe(metrics.NOTIFICATION_LATENCY, channel="whatsapp"):
+            response = requests.post(url, headers=headers, json=payload)
 
         if response.status_code in [200, 201]:
-            print(f"✅ WhatsApp message sent to {phone_number}")
+            logger.info("WhatsApp message sent", extra={"recipient": mask_phone(phone_number)})
             return True
         else:
-            print(f"❌ Failed to send message to {phone_number}: {response.status_code}, {response.text}")
+            logger.error(
+                "Failed to send WhatsApp message",
+                extra={"recipient": mask_phone(phone_number), "status_code": response.status_code, "response": response.text},
+            )
             return False
 
-    except Exception as e:
-        print(f"❌ Exception occurred while sending WhatsApp message: {str(e)}")
+    except Exception:
+        logger.exception("Exception occurred while sending WhatsApp message")
         return False
@@ -5,6 +5,8 @@ from django.core.asgi import get_asgi_application
 import faults.routing
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "railway_faults.settings")
+# See DATABASES in settings: no persistent connections under ASGI
+os.environ.setdefault("DB_CONN_MAX_AGE", "0")
 
 django_asgi_app = get_asgi_application()
 
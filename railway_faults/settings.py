@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from celery.schedules import crontab
 
 # --------------------
 # BASE SETTINGS
@@ -22,6 +23,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django_extensions",
+    "django_celery_beat",
 
     # Third-party
     "rest_framework",
@@ -72,6 +74,11 @@ ASGI_APPLICATION = "railway_faults.asgi.application"
 # --------------------
 # DATABASE (MySQL)
 # --------------------
+# Connections are kept open for DB_CONN_MAX_AGE seconds and re-checked
+# before reuse, so each gunicorn/Celery thread doesn't reconnect per
+# request. asgi.py defaults it to 0: under ASGI every request runs its
+# queries on a thread of its own, which would strand persistent
+# connections (put a pooler such as ProxySQL in front instead).
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.mysql",
@@ -80,6 +87,8 @@ DATABASES = {
         "PASSWORD": "pass123",
         "HOST": "localhost",
         "PORT": "3306",
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
         "OPTIONS": {
             "init_command": "SET sql_mode='STRICT_TRANS_TABLES'",
         },
@@ -114,13 +123,137 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
-DATASET_ROOT = os.path.join(BASE_DIR, 'dataset')
+DATASET_ROOT = os.getenv("DATASET_ROOT", os.path.join(BASE_DIR, 'dataset'))
 DATASET_URL = '/dataset/'
 
+# /media/, /dataset/ and /videos/ are served by faults/files.py with ETags,
+# conditional requests and byte ranges. Fault frames get unique names and
+# are never rewritten, so they are cached for immutable_max_age; dataset
+# files, overlays and videos are revalidated every time (a cheap 304).
+# /videos/ needs a signed-in user. Behind nginx set FILE_SERVING_ACCEL=nginx
+# and map internal_prefix/<media|dataset|videos>/ to the directories with
+# an `internal` location; "sendfile" emits X-Sendfile (Apache, lighttpd).
+FILE_SERVING = {
+    "accel": os.getenv("FILE_SERVING_ACCEL", ""),
+    "internal_prefix": os.getenv("FILE_SERVING_INTERNAL_PREFIX", "/_protected/"),
+    "immutable_max_age": 365 * 24 * 3600,
+}
+
 
 # Video upload directory
 VIDEO_UPLOAD_DIR = BASE_DIR / "faults" / "video_feed"
 os.makedirs(VIDEO_UPLOAD_DIR, exist_ok=True)
+VIDEO_URL = "/videos/"
+
+# --------------------
+# DETECTION INFERENCE
+# --------------------
+# "auto" picks the fastest exported runtime that passed the parity check
+# (openvino > onnx > pytorch). Set to force one backend.
+DETECTION_BACKEND = os.getenv("DETECTION_BACKEND", "auto")
+# Formats exported after every training run (skipped when the runtime is missing)
+DETECTION_EXPORT_FORMATS = os.getenv("DETECTION_EXPORT_FORMATS", "onnx,openvino,int8").split(",")
+
+# Named speed/accuracy trade-offs, selectable per detection job.
+# Compare them with: python manage.py evaluate_profiles
+INFERENCE_PROFILES = {
+    "default": {"imgsz": 640},
+    "fast": {"imgsz": 416},
+    "int8": {"imgsz": 640, "int8": True},
+    # Low-res pass on every frame, full-res re-check of candidate frames only
+    "cascade": {"imgsz": 320, "confirm_imgsz": 640, "candidate_conf": 0.25},
+}
+DEFAULT_INFERENCE_PROFILE = os.getenv("INFERENCE_PROFILE", "default")
+# Frames decoded and sent to the model per call for video files
+DETECTION_BATCH_SIZE = int(os.getenv("DETECTION_BATCH_SIZE", "8"))
+# Detection jobs persist progress every N frames so a restart can resume
+DETECTION_CHECKPOINT_EVERY = int(os.getenv("DETECTION_CHECKPOINT_EVERY", "250"))
+# Processes that detect one video file in parallel, each on its own
+# DETECTION_SEGMENT_FRAMES-long segments (1 = a single sequential loop)
+DETECTION_WORKERS = int(os.getenv("DETECTION_WORKERS", "1"))
+DETECTION_SEGMENT_FRAMES = int(os.getenv("DETECTION_SEGMENT_FRAMES", "500"))
+
+# Detections of already processed videos, keyed by content hash, model
+# version and detection settings. Re-running a cached video only replays
+# the save/notify steps. Least recently used entries are evicted past max_bytes.
+DETECTION_RESULT_CACHE = {
+    "enabled": os.getenv("DETECTION_RESULT_CACHE", "True") == "True",
+    "dir": BASE_DIR / "faults" / "runs" / "detection_cache",
+    "max_bytes": 256 * 1024 * 1024,
+}
+
+# Bounded queue between the detection loop and the JPEG/MySQL writers.
+# policy: "block" (wait), "drop_lowest" (drop lowest confidence) or
+# "spill" (park encoded JPEGs in spill_dir instead of memory; still at
+# most max_items queued)
+DETECTION_SAVE_QUEUE = {
+    "policy": os.getenv("DETECTION_SAVE_POLICY", "block"),
+    "workers": 2,
+    "max_items": 32,
+    "max_bytes": 64 * 1024 * 1024,
+    "spill_dir": MEDIA_ROOT / ".spill",
+}
+
+# Per-camera region of interest, as fractions of the frame.
+#   roi:     [x1, y1, x2, y2] rectangle that is cropped before inference
+#   polygon: [[x, y], ...] outline; with mode "mask" pixels outside it are blacked out
+#   tile:    split the ROI into overlapping tiles (for high-resolution cameras)
+CAMERA_ROIS = {
+    "default": {},
+    "track_band": {"roi": [0.0, 0.4, 1.0, 1.0], "mode": "crop"},
+    "track_band_hd": {
+        "roi": [0.0, 0.4, 1.0, 1.0],
+        "mode": "crop",
+        "tile": {"size": 640, "overlap": 0.2},
+    },
+}
+
+# Retention: rows and files older than the given number of days are moved
+# into .tar.gz archives under archive_dir (rows as JSON lines, plus frames)
+# with an ArchiveBatch row each; archived faults are also counted in
+# FaultDailySummary. None keeps that status forever: only reviewed
+# faults are archived. A fault's tasks and detections go into the same
+# archive (they cascade with it). Each run archives at most
+# max_batches * batch_size faults per status.
+RETENTION = {
+    "archive_dir": Path(os.getenv("RETENTION_ARCHIVE_DIR", BASE_DIR / "archive")),
+    "batch_size": 500,
+    "max_batches": 20,
+    "faults": {"resolved": 30, "needs_feedback": None, "assigned": None, "pending": None},
+    "videos_days": 14,
+}
+
+# Unconfirmed faults are grouped into near-duplicate clusters (same class,
+# perceptual hash within hamming_threshold, seen within window_seconds of
+# the cluster's newest member) so the dashboard shows one card per cluster.
+FAULT_CLUSTERING = {
+    "hamming_threshold": int(os.getenv("FAULT_CLUSTER_HAMMING", "8")),
+    "window_seconds": int(os.getenv("FAULT_CLUSTER_WINDOW_SECONDS", "600")),
+}
+
+# Training reads a mirror of dataset/ with images pre-resized to imgsz and
+# stored as .npy next to them, so CPU epochs skip JPEG decoding/resizing.
+# Disable to train from the original images (e.g. to compare epoch times).
+TRAINING_IMAGE_CACHE = {
+    "enabled": os.getenv("TRAINING_IMAGE_CACHE", "True") == "True",
+    "dir": Path(DATASET_ROOT) / ".cache",
+    "imgsz": 640,
+}
+
+# Before each training run, near-duplicate images (perceptual hash within
+# hamming_threshold) of the same class are clustered and only
+# max_per_cluster per cluster (and max_per_class per class, if set) are
+# trained on. The report is written as curation_report.json next to
+# data_curated.yaml in the training image cache's curation dir.
+TRAINING_CURATION = {
+    "enabled": os.getenv("TRAINING_CURATION", "True") == "True",
+    "max_per_cluster": 3,
+    "hamming_threshold": 8,
+    "max_per_class": None,
+}
+
+# Offline benchmark results (JSON, one file per run) — see faults/benchmarks.py
+BENCHMARK_RESULTS_DIR = BASE_DIR / "benchmarks" / "results"
 
 # --------------------
 # DJANGO REST FRAMEWORK
@@ -145,6 +278,39 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "Asia/Kolkata"
 
+# Periodic jobs; django-celery-beat keeps them in the DB so intervals can
+# be changed from the admin (run: celery -A railway_faults beat)
+CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+CELERY_BEAT_SCHEDULE = {
+    "apply-retention": {
+        "task": "faults.tasks.apply_retention",
+        "schedule": crontab(hour=2, minute=30),
+    },
+}
+
+# --------------------
+# CACHE (Redis)
+# --------------------
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"redis://{os.getenv('REDIS_HOST', '127.0.0.1')}:6379/1",
+        "KEY_PREFIX": "railway_faults",
+    },
+}
+
+# Dashboard stats/pages and the list APIs are cached (faults/view_cache.py)
+# and dropped by the FaultRecord/TaskStatus signals. timeout bounds how
+# long a page may show a frame deleted outside the app; on a miss one
+# request rebuilds the entry and the others wait up to lock_wait seconds
+# for it (lock_timeout covers a worker dying mid-build).
+VIEW_CACHE = {
+    "enabled": os.getenv("VIEW_CACHE", "True") == "True",
+    "timeout": 300,
+    "lock_timeout": 30,
+    "lock_wait": 5,
+}
+
 # --------------------
 # CHANNELS (WebSocket + Redis)
 # --------------------
@@ -165,6 +331,39 @@ WHATSAPP_ACCESS_TOKEN = "YOUR_WHATSAPP_TOKEN"
 WHATSAPP_DEFAULT_NUMBER = "+91 9690112362"
 SITE_URL = "http://127.0.0.1:8000"
 
+# --------------------
+# METRICS (Prometheus, multiprocess)
+# --------------------
+# Opt-in: export PROMETHEUS_MULTIPROC_DIR (the same path for the web and
+# Celery services) and every process writes its samples there for /metrics
+# to aggregate. Without it each process only reports its own metrics.
+# The directory must be empty whenever the services start, or samples of
+# dead processes are summed forever: use a tmpfs path (e.g.
+# /run/railway_faults/prometheus) and clear it in the service unit before
+# starting (ExecStartPre=/bin/rm -rf <dir>). Exited Celery workers are
+# dropped by railway_faults/celery.py; for gunicorn, call
+# faults.metrics.mark_process_dead(worker.pid) from its child_exit hook.
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+# --------------------
+# LOGGING (structured JSON on stdout)
+# --------------------
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "faults.log_format.JsonFormatter"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "json"},
+    },
+    "root": {"handlers": ["console"], "level": os.getenv("LOG_LEVEL", "INFO")},
+    "loggers": {
+        "django": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
 # --------------------
 # CORS
 # --------------------
@@ -0,0 +1,40 @@
+"""
+Settings for offline benchmarks and load tests.
+
+Uses SQLite, an in-memory channel layer and eager Celery tasks so the
+detection path can be measured without MySQL or Redis:
+
+    python manage.py bench_detection --settings=railway_faults.settings_bench
+    python manage.py load_test --faults 100000 --settings=railway_faults.settings_bench
+"""
+import os
+import tempfile
+from .settings import *  # noqa: F401,F403
+
+BENCH_DIR = os.getenv("BENCH_DIR", os.path.join(tempfile.gettempdir(), "railway_faults_bench"))
+os.makedirs(BENCH_DIR, exist_ok=True)
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BENCH_DIR, "bench.sqlite3"),
+        # The save queue writes from several threads: wait for the lock
+        # instead of failing, and test on a file rather than shared-cache
+        # memory, where concurrent writers get "table is locked" at once
+        "OPTIONS": {"timeout": 20},
+        "TEST": {"NAME": os.path.join(BENCH_DIR, "test_bench.sqlite3")},
+    }
+}
+
+MEDIA_ROOT = os.path.join(BENCH_DIR, "media")
+os.makedirs(MEDIA_ROOT, exist_ok=True)
+DETECTION_SAVE_QUEUE = {**DETECTION_SAVE_QUEUE, "spill_dir": os.path.join(MEDIA_ROOT, ".spill")}  # noqa: F405
+DETECTION_RESULT_CACHE = {**DETECTION_RESULT_CACHE, "dir": os.path.join(BENCH_DIR, "detection_cache")}  # noqa: F405
+
+# Notifications run inline against SQLite instead of going through Redis
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_TASK_EAGER_PROPAGATES = False
+EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+
+CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
@@ -14,11 +14,11 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
-import os
+from faults import files
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -27,8 +27,14 @@ urlpatterns = [
 
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-
-# Serve training dataset for annotation tool
-urlpatterns += static(settings.DATASET_URL, document_root=settings.DATASET_ROOT)
\ No newline at end of file
+# Fault images, the training dataset (annotation tool) and recorded
+# videos (signed-in users only), with ETags, byte ranges and
+# X-Accel-Redirect/X-Sendfile hand-off
+for url, mount in (
+    (settings.MEDIA_URL, "media"),
+    (settings.DATASET_URL, "dataset"),
+    (settings.VIDEO_URL, "videos"),
+):
+    urlpatterns.append(
+        re_path(rf"^{re.escape(url.lstrip('/'))}(?P<path>.*)$", files.serve, {"mount": mount}, name=f"files_{mount}")
+    )
@@ -1,11 +1,14 @@
 // ---- Global Django variables loaded from annotate.html ----
 const imageUrl = window.imageUrl;
-const imageName = window.imageName;
-const idx = window.idx;
-const total = window.total;
-const saveUrl = window.saveUrl;
+let imageName = window.imageName;
+let idx = window.idx;
+let total = window.total;
+const bulkSaveUrl = window.bulkSaveUrl;
 const annotateBase = window.annotateBase;
-const existingBoxes = window.existingBoxes || [];
+const windowUrl = window.windowUrl;
+const windowSize = window.windowSize;
+let datasetVersion = window.datasetVersion;
+let existingBoxes = window.existingBoxes || [];
 
 // ---- Canvas ----
 const canvas = document.getElementById("canvas");
@@ -336,7 +339,64 @@ function refreshList() {
 }
 
 
-// ---- Save ----
+// ---- Save (batched) ----
+// Saves are queued in sessionStorage and sent to the bulk endpoint in one
+// request every SAVE_BATCH images, after SAVE_IDLE_MS without a new save,
+// or when the page is left, so annotating over a slow link costs one round
+// trip per batch instead of one per image.
+const SAVE_BATCH = 10;
+const SAVE_IDLE_MS = 5000;
+const PENDING_KEY = "pendingLabels";
+let flushTimer = null;
+
+function pendingLabels() {
+    return JSON.parse(sessionStorage.getItem(PENDING_KEY) || "{}");
+}
+
+function setPending(pending) {
+    sessionStorage.setItem(PENDING_KEY, JSON.stringify(pending));
+    const n = Object.keys(pending).length;
+    document.getElementById("statusMsg").innerText = n ? `⏳ ${n} unsent` : "";
+}
+
+function flushLabels() {
+    clearTimeout(flushTimer);
+    const pending = pendingLabels();
+    const items = Object.entries(pending).map(([image_name, boxes]) => ({ image_name, boxes }));
+    if (!items.length) return Promise.resolve();
+
+    return fetch(bulkSaveUrl, {
+        method: "POST",
+        headers: {"Content-Type": "application/json", "X-CSRFToken": getCookie("csrftoken")},
+        body: JSON.stringify({ items })
+    }).then(r => r.json().then(data => ({ ok: r.ok, data })))
+    .then(({ ok, data }) => {
+        if (!ok) {
+            document.getElementById("statusMsg").innerText = "⚠ Save failed: " + JSON.stringify(data.errors || data.error);
+            return;
+        }
+        // Keep anything re-saved while the request was in flight
+        const latest = pendingLabels();
+        items.forEach(({ image_name, boxes }) => {
+            if (JSON.stringify(latest[image_name]) === JSON.stringify(boxes)) delete latest[image_name];
+        });
+        setPending(latest);
+        document.getElementById("statusMsg").innerText = `✔ Saved ${data.saved} image(s)`;
+    });
+}
+
+// Best effort on navigation: sendBeacon survives the page unloading
+window.addEventListener("pagehide", () => {
+    const pending = pendingLabels();
+    const items = Object.entries(pending).map(([image_name, boxes]) => ({ image_name, boxes }));
+    if (items.length && navigator.sendBeacon(bulkSaveUrl, new Blob([JSON.stringify({ items })], { type: "application/json" }))) {
+        sessionStorage.removeItem(PENDING_KEY);
+    }
+});
+
+// Anything left over from a previous page goes out now
+flushLabels();
+
 document.getElementById("saveBtn").onclick = () => {
     const p = boxes.map(b => ({
         cls: b.cls,
@@ -346,11 +406,15 @@ document.getElementById("saveBtn").onclick = () => {
         height: +(((b.y2 - b.y1) / canvas.height).toFixed(6))
     }));
 
-    fetch(saveUrl, {
-        method: "POST",
-        headers: {"Content-Type": "application/json", "X-CSRFToken": getCookie("csrftoken")},
-        body: JSON.stringify({ image_name: imageName, boxes: p })
-    }).then(r => r.json()).then(() => alert("✔ Saved"));
+    const pending = pendingLabels();
+    pending[imageName] = p;
+    setPending(pending);
+    if (windowCache[idx]) Object.assign(windowCache[idx], { boxes: p, suggested: false });
+    document.getElementById("suggestedMsg").style.display = "none";
+
+    clearTimeout(flushTimer);
+    if (Object.keys(pending).length >= SAVE_BATCH) flushLabels();
+    else flushTimer = setTimeout(flushLabels, SAVE_IDLE_MS);
 };
 
 
@@ -364,12 +428,78 @@ document.getElementById("deleteBtn").onclick = () => {
 };
 
 
-// ---- Navigation ----
-document.getElementById("nextBtn").onclick = () =>
-    window.location = `${annotateBase}?idx=${Math.min(idx + 1, total - 1)}`;
+// ---- Navigation (prefetched) ----
+// Entries of upcoming images come from the window API a few at a time and
+// their images are preloaded, so Next/Prev swap the canvas in place
+// instead of loading a new page.
+let windowCache = {};
+let windowRequests = {};
+const preloaded = [];
+
+function fetchWindow(start) {
+    if (windowRequests[start]) return windowRequests[start];
+    windowRequests[start] = fetch(`${windowUrl}?idx=${start}&k=${windowSize}`)
+        .then(r => r.json())
+        .then(data => {
+            if (data.version !== datasetVersion) {
+                // Images were added, removed or relabelled: drop stale entries
+                datasetVersion = data.version;
+                windowCache = {};
+            }
+            total = data.total;
+            data.images.forEach(entry => {
+                windowCache[entry.idx] = entry;
+                const image = new Image();
+                image.src = entry.url;
+                preloaded.push(image);
+            });
+            if (preloaded.length > 4 * windowSize) preloaded.splice(0, preloaded.length - 4 * windowSize);
+        })
+        .finally(() => { delete windowRequests[start]; });
+    return windowRequests[start];
+}
+
+function prefetchAround(i) {
+    for (let j = i + 1; j <= Math.min(i + windowSize, total - 1); j++) {
+        if (!windowCache[j]) return fetchWindow(j);
+    }
+    if (i > 0 && !windowCache[i - 1]) return fetchWindow(Math.max(i - windowSize, 0));
+}
+
+function showEntry(entry) {
+    imageName = entry.name;
+    idx = entry.idx;
+    // Boxes saved here but not sent yet win over the cached copy
+    existingBoxes = pendingLabels()[entry.name] || entry.boxes;
+
+    boxes = [];
+    selectedIndex = -1;
+    zoom = 1;
+    offsetX = 0;
+    offsetY = 0;
+    img.src = entry.url;
+
+    document.getElementById("imageTitle").innerText = entry.name;
+    document.getElementById("imageCounter").innerText = `Image ${idx + 1} / ${total}`;
+    document.getElementById("suggestedMsg").style.display = entry.suggested && !pendingLabels()[entry.name] ? "" : "none";
+    history.replaceState(null, "", `${annotateBase}?idx=${idx}`);
+    refreshList();
+    prefetchAround(idx);
+}
+
+function goTo(target) {
+    target = Math.max(0, Math.min(target, total - 1));
+    if (target === idx) return;
+    if (windowCache[target]) return showEntry(windowCache[target]);
+    fetchWindow(target).then(() => {
+        if (windowCache[target]) showEntry(windowCache[target]);
+    });
+}
+
+document.getElementById("nextBtn").onclick = () => goTo(idx + 1);
+document.getElementById("prevBtn").onclick = () => goTo(idx - 1);
 
-document.getElementById("prevBtn").onclick = () =>
-    window.location = `${annotateBase}?idx=${Math.max(idx - 1, 0)}`;
+prefetchAround(idx);
 
 
 // ---- Class Add ----
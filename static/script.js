@@ -56,7 +56,8 @@ document.addEventListener("DOMContentLoaded", () => {
         otherBtn.disabled = true;
 
         try {
-            const res = await fetch(`/api/faults/${faultId}/confirm/`, {
+            // A card stands for a single fault or a whole near-duplicate cluster
+            const res = await fetch(activeBtn.dataset.url || `/api/faults/${faultId}/confirm/`, {
                 method: "POST",
                 headers: {
                     "Content-Type": "application/json",
@@ -65,9 +66,22 @@ document.addEventListener("DOMContentLoaded", () => {
                 body: JSON.stringify({ action: type }),
             });
 
-            const data = await res.json();
+            let data = await res.json();
+            if (res.status === 202) {
+                // Confirmation runs as a background job
+                data = data.result || await waitForJob(data.job_id, data.status_url, progress => {
+                    activeBtn.textContent = progress.total
+                        ? `Processing ${progress.done}/${progress.total}...`
+                        : "Scanning...";
+                });
+            }
             console.log("⚙️ Backend Response:", data);
 
+            if (data.error) {
+                alert(`⚠️ ${data.error}`);
+                return;
+            }
+
             const count = data.count || 1;
 
             if (type === "yes") {
@@ -111,6 +125,64 @@ document.addEventListener("DOMContentLoaded", () => {
 
 
 
+    // --------------------------------------
+    // CONFIRM JOB PROGRESS
+    // --------------------------------------
+    // Events come over ws/faults/ (FaultsConsumer); the job status URL is
+    // polled only while the socket is down.
+    const jobWaiters = {};
+    let socket = null;
+
+    function openSocket() {
+        const scheme = location.protocol === "https:" ? "wss" : "ws";
+        socket = new WebSocket(`${scheme}://${location.host}/ws/faults/`);
+        socket.onmessage = e => {
+            const data = JSON.parse(e.data);
+            const waiter = data.job_id && jobWaiters[data.job_id];
+            if (waiter) waiter(data);
+        };
+        socket.onclose = () => { socket = null; };
+    }
+    openSocket();
+
+    function socketOpen() {
+        return socket && socket.readyState === WebSocket.OPEN;
+    }
+
+    function waitForJob(jobId, statusUrl, onProgress) {
+        return new Promise(resolve => {
+            let poll = null;
+
+            const finish = result => {
+                delete jobWaiters[jobId];
+                clearInterval(poll);
+                resolve(result);
+            };
+
+            const checkStatus = async () => {
+                try {
+                    const status = await (await fetch(statusUrl)).json();
+                    if (status.result) finish(status.result);
+                    else if (status.error) finish({ error: status.error });
+                    else if (status.state === "PROGRESS") onProgress(status);
+                } catch (e) {
+                    console.warn("Job status unavailable", e);
+                }
+            };
+
+            jobWaiters[jobId] = data => {
+                if (data.event === "confirm.progress") onProgress(data);
+                else if (data.event === "confirm.done") finish(data);
+            };
+
+            // Covers a job that finished before we started listening
+            checkStatus();
+            poll = setInterval(() => { if (!socketOpen()) checkStatus(); }, 3000);
+        });
+    }
+
+
+
     // --------------------------------------
     // Fade-out animation
     // --------------------------------------